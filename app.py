@@ -1,9 +1,11 @@
 import os
-import pandas as pd
+import time
+# Boot timer: phases are reported in STARTUP_TIMINGS
+_BOOT_STARTED = time.perf_counter()
 import uuid
 import zipfile
-import shutil
 import json
+import hashlib
 import threading
 import random
 from datetime import datetime, timedelta
@@ -11,35 +13,53 @@ import functools
 import click
 from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, abort, after_this_request, flash, session
 from flask_login import current_user, login_required
-from services.classifier import classify_mentions
-from services.file_loader import detect_format, read_full_as_tsv
+from services.uploads import SpooledUpload
+from services.shared_state import SQLiteStore
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
 from babel.dates import format_datetime
-from sqlalchemy import inspect, text, event
+from sqlalchemy import inspect, text, event, func
 from dotenv import load_dotenv
 from flask_talisman import Talisman
 
 from blueprints.auth import auth
-from blueprints.admin import admin_bp, log_activity
+from blueprints.admin import admin_bp, log_activity, init_activity_log_buffer, dashboard_stats_cache, user_options_cache
 from blueprints.tasks import tasks_bp
 
 
 from extensions import db, login_manager, csrf, limiter
-from models import User, Report, ActivityLog, ClassificationPreset, Task, TempArtifact
-from services import calculation as report
-from services.groq_analysis import construir_prompt, llamar_groq, extraer_json, formatear_analisis_social_listening
-from pptx_builder import engine as ppt_engine
-from pptx_builder import native_charts
-from pptx_builder.engine import set_text_style
-from services.csv_analysis import analyze_csv, generate_summary_csv
+from models import User, Report, ActivityLog, ClassificationPreset, Task, TempArtifact, AppMeta, user_state_cache, invalidate_user_state
+from services.search_index import SEARCHABLE_COLUMNS, ensure_search_indexes
+from services import scratch_storage
+from services.lazy import lazy_callable, lazy_module
+
+# Heavy dependencies (pandas, python-pptx, the analysis services and the Groq
+# client) load on first use by the tool that needs them, so workers boot
+# without them. babel is not among them: Flask-WTF's i18n loads it at boot.
+pd = lazy_module('pandas')
+report = lazy_module('services.calculation')
+csv_analysis = lazy_module('services.csv_analysis')
+ppt_engine = lazy_module('pptx_builder.engine')
+native_charts = lazy_module('pptx_builder.native_charts')
+Presentation = lazy_callable('pptx', 'Presentation')
+Inches = lazy_callable('pptx.util', 'Inches')
+Pt = lazy_callable('pptx.util', 'Pt')
+RGBColor = lazy_callable('pptx.dml.color', 'RGBColor')
+classify_mentions = lazy_callable('services.classifier', 'classify_mentions')
+detect_format = lazy_callable('services.file_loader', 'detect_format')
+write_full_as_tsv = lazy_callable('services.file_loader', 'write_full_as_tsv')
+analyze_csv = lazy_callable('services.csv_analysis', 'analyze_csv')
+generate_summary_csv = lazy_callable('services.csv_analysis', 'generate_summary_csv')
+construir_prompt = lazy_callable('services.groq_analysis', 'construir_prompt')
+llamar_groq = lazy_callable('services.groq_analysis', 'llamar_groq')
+extraer_json = lazy_callable('services.groq_analysis', 'extraer_json')
+formatear_analisis_social_listening = lazy_callable('services.groq_analysis', 'formatear_analisis_social_listening')
 
 # Load environment variables
 load_dotenv()
 
+STARTUP_TIMINGS = {'imports': time.perf_counter() - _BOOT_STARTED}
+
 
 def _env_bool(name, default=False):
     raw = os.environ.get(name)
@@ -94,6 +114,7 @@ if not app.config['SECRET_KEY']:
     raise RuntimeError("SECRET_KEY must be set in .env file. Generate one with: python -c 'import secrets; print(secrets.token_hex(32))'")
 
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200 MB upload limit
+app.config['CSV_SAMPLE_THRESHOLD_MB'] = _env_float('CSV_SAMPLE_THRESHOLD_MB', 50.0)
 app.config['SQLALCHEMY_DATABASE_URI'] = _resolve_database_uri()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['ALLOW_SELF_REGISTRATION'] = _env_bool('ALLOW_SELF_REGISTRATION', False)
@@ -112,11 +133,31 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=8)
 if _is_production_mode():
     app.config['SESSION_COOKIE_SECURE'] = True
 
+# Shared state for rate-limit counters and the user-state cache. 'sqlite' keeps
+# them in one file every worker on the host uses; 'memory' is per process.
+SHARED_STATE_BACKEND = (os.environ.get('SHARED_STATE_BACKEND')
+                        or ('sqlite' if _is_production_mode() else 'memory')).strip().lower()
+shared_state = None
+if SHARED_STATE_BACKEND == 'sqlite':
+    shared_state_path = os.path.abspath(
+        os.environ.get('SHARED_STATE_PATH') or os.path.join(app.instance_path, 'shared_state.db')
+    )
+    os.makedirs(os.path.dirname(shared_state_path), exist_ok=True)
+    shared_state = SQLiteStore(shared_state_path)
+    app.config['RATELIMIT_STORAGE_URI'] = f'sqlite:///{shared_state_path}'
+else:
+    app.config['RATELIMIT_STORAGE_URI'] = 'memory://'
+
 # ─────────────────────────────────────────────────────────────
 # Initialize extensions
 # ─────────────────────────────────────────────────────────────
 db.init_app(app)
 login_manager.init_app(app)
+# Seconds a logged-in user's state is reused before load_user queries again (0 = always query)
+user_state_cache.ttl = max(0.0, _env_float('USER_STATE_CACHE_TTL', 5.0))
+user_state_cache.store = shared_state
+dashboard_stats_cache.store = shared_state
+user_options_cache.store = shared_state
 csrf.init_app(app)
 limiter.init_app(app)
 
@@ -151,6 +192,15 @@ app.register_blueprint(auth)
 app.register_blueprint(admin_bp)
 app.register_blueprint(tasks_bp)
 
+# Audit log rows are bulk-inserted by a background thread instead of one commit per request
+if _env_bool('ACTIVITY_LOG_ASYNC', True):
+    init_activity_log_buffer(
+        app,
+        batch_size=max(1, _env_int('ACTIVITY_LOG_BATCH_SIZE', 200)),
+        flush_interval_ms=max(1, _env_int('ACTIVITY_LOG_FLUSH_MS', 500)),
+        max_pending=max(1, _env_int('ACTIVITY_LOG_QUEUE_SIZE', 10000)),
+    )
+
 # ─────────────────────────────────────────────────────────────
 # Force-logout check (session kick feature)
 # ─────────────────────────────────────────────────────────────
@@ -159,27 +209,23 @@ from flask_login import logout_user
 @app.before_request
 def check_force_logout():
     """If admin has flagged this user for forced logout, log them out immediately."""
-    session_user_id = session.get('_user_id')
-    if session_user_id:
-        try:
-            session_user = db.session.get(User, int(session_user_id))
-        except (TypeError, ValueError):
-            session_user = None
-        if session_user and not session_user.is_active:
-            logout_user()
-            session.pop('_user_id', None)
-            session.pop('_fresh', None)
-            flash('Tu cuenta está inactiva. Contacta al administrador.', 'warning')
-            return redirect(url_for('auth.login'))
-
-    if current_user.is_authenticated and not current_user.is_active:
+    # current_user comes from load_user's state cache, so this costs no query
+    # on most requests; admin changes invalidate the cached state right away.
+    # (is_anonymous, not is_authenticated: an inactive user is not authenticated.)
+    if current_user.is_anonymous:
+        return None
+
+    if not current_user.is_active:
         logout_user()
+        session.pop('_fresh', None)
         flash('Tu cuenta está inactiva. Contacta al administrador.', 'warning')
         return redirect(url_for('auth.login'))
 
-    if current_user.is_authenticated and getattr(current_user, 'force_logout', False):
+    if current_user.force_logout:
+        user_id = current_user.id
         current_user.force_logout = False
         db.session.commit()
+        invalidate_user_state(user_id)
         logout_user()
         flash('Tu sesion ha sido terminada por un administrador.', 'warning')
         return redirect(url_for('auth.login'))
@@ -325,53 +371,125 @@ def ensure_reports_schema():
                     except Exception as e:
                         print(f"[migration] Aviso al agregar tasks.{col_name}: {e}")
 
+        if 'temp_artifacts' in tables:
+            artifact_cols = {c['name'] for c in insp.get_columns('temp_artifacts')}
+            new_artifact_cols = {
+                'size_bytes': 'BIGINT NOT NULL DEFAULT 0',
+                'last_access_at': 'DATETIME',
+            }
+            for col_name, col_type in new_artifact_cols.items():
+                if col_name not in artifact_cols:
+                    try:
+                        db.session.execute(text(f"ALTER TABLE temp_artifacts ADD COLUMN {col_name} {col_type}"))
+                        db.session.commit()
+                        print(f"[migration] Added column temp_artifacts.{col_name}")
+                    except Exception as e:
+                        print(f"[migration] Aviso al agregar temp_artifacts.{col_name}: {e}")
+            if 'last_access_at' not in artifact_cols:
+                # Existing artifacts count as last used when created
+                db.session.execute(text(
+                    "UPDATE temp_artifacts SET last_access_at = created_at WHERE last_access_at IS NULL"))
+                db.session.commit()
+
+        ensure_model_indexes(insp)
+        ensure_search_indexes()
+
         ensure_default_admin()
 
 
+def ensure_model_indexes(insp=None):
+    """
+    Create indexes declared on the models that an existing database lacks.
+    create_all() only builds indexes together with new tables, so databases
+    created before an index was added never get it otherwise.
+    """
+    insp = insp or inspect(db.engine)
+    tables = set(insp.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {ix['name'] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(db.engine, checkfirst=True)
+                created.append(index.name)
+                print(f"[migration] Added index {index.name}")
+            except Exception as e:
+                print(f"[migration] Aviso al crear indice {index.name}: {e}")
+    return created
+
+
 ACTIVITY_LOG_RETENTION_DAYS = max(1, _env_int('ACTIVITY_LOG_RETENTION_DAYS', 90))
 ACTIVITY_LOG_MAX_ROWS = max(1000, _env_int('ACTIVITY_LOG_MAX_ROWS', 100000))
 REPORT_METADATA_RETENTION_DAYS = max(1, _env_int('REPORT_METADATA_RETENTION_DAYS', 180))
+ACTIVITY_LOG_PRUNE_BATCH = max(100, _env_int('ACTIVITY_LOG_PRUNE_BATCH', 5000))
+MAINTENANCE_INTERVAL_MINUTES = max(1, _env_int('MAINTENANCE_INTERVAL_MINUTES', 360))
+SCRATCH_QUOTA_MB = max(1, _env_int('SCRATCH_QUOTA_MB', 2048))
+SCRATCH_TTL_MINUTES = max(1, _env_int('SCRATCH_TTL_MINUTES', 60))
+SCRATCH_SWEEP_INTERVAL_MINUTES = max(1, _env_int('SCRATCH_SWEEP_INTERVAL_MINUTES', 10))
+
+
+def _delete_in_id_ranges(model, upper_id, batch_size, *criteria):
+    """
+    Delete rows with id <= upper_id (and matching `criteria`) one bounded id
+    range at a time, committing after each range so writers are never held
+    off for long. Yields (last id covered, rows deleted) per range.
+    """
+    low = db.session.query(func.min(model.id)).scalar()
+    while low is not None and low <= upper_id:
+        high = min(low + batch_size, upper_id + 1)
+        deleted = (
+            model.query
+            .filter(model.id >= low, model.id < high, *criteria)
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+        yield high - 1, deleted
+        # Skip id gaps left by earlier prunes instead of walking empty ranges
+        low = db.session.query(func.min(model.id)).filter(model.id >= high).scalar()
+
 
+def prune_activity_logs(retention_days=ACTIVITY_LOG_RETENTION_DAYS, max_rows=ACTIVITY_LOG_MAX_ROWS,
+                        batch_size=ACTIVITY_LOG_PRUNE_BATCH, progress=None):
+    """
+    Prune old activity logs by retention and hard row cap, in batches.
+
+    Each batch deletes a range of at most `batch_size` ids in its own short
+    transaction. `progress(phase, last_id, stats)` is called after each batch.
+    """
+    stats = {'deleted_by_age': 0, 'deleted_by_cap': 0, 'batches': 0}
 
-def prune_activity_logs(retention_days=ACTIVITY_LOG_RETENTION_DAYS, max_rows=ACTIVITY_LOG_MAX_ROWS):
-    """Prune old activity logs by retention and hard row cap."""
-    deleted_by_age = 0
-    deleted_by_cap = 0
+    def run(phase, upper_id, *criteria):
+        for last_id, deleted in _delete_in_id_ranges(ActivityLog, upper_id, batch_size, *criteria):
+            stats[f'deleted_by_{phase}'] += deleted
+            stats['batches'] += 1
+            if progress:
+                progress(phase, last_id, stats)
 
     cutoff = datetime.utcnow() - timedelta(days=retention_days)
-    deleted_by_age = (
-        ActivityLog.query
+    age_upper = (
+        db.session.query(func.max(ActivityLog.id))
         .filter(ActivityLog.timestamp < cutoff)
-        .delete(synchronize_session=False)
+        .scalar()
     )
-    db.session.commit()
-
-    total_rows = ActivityLog.query.count()
-    overflow = max(0, total_rows - max_rows)
-    if overflow > 0:
-        ids_to_delete = [
-            row.id
-            for row in (
-                ActivityLog.query
-                .with_entities(ActivityLog.id)
-                .order_by(ActivityLog.timestamp.asc())
-                .limit(overflow)
-                .all()
-            )
-        ]
-        if ids_to_delete:
-            deleted_by_cap = (
-                ActivityLog.query
-                .filter(ActivityLog.id.in_(ids_to_delete))
-                .delete(synchronize_session=False)
-            )
-            db.session.commit()
+    if age_upper is not None:
+        run('age', age_upper, ActivityLog.timestamp < cutoff)
+
+    # Newest id that falls outside the cap; everything up to it goes
+    cap_boundary = (
+        db.session.query(ActivityLog.id)
+        .order_by(ActivityLog.id.desc())
+        .offset(max_rows)
+        .limit(1)
+        .scalar()
+    )
+    if cap_boundary is not None:
+        run('cap', cap_boundary)
 
-    return {
-        'deleted_by_age': deleted_by_age,
-        'deleted_by_cap': deleted_by_cap,
-        'remaining_rows': ActivityLog.query.count(),
-    }
+    return stats
 
 
 def prune_report_metadata(retention_days=REPORT_METADATA_RETENTION_DAYS):
@@ -394,38 +512,88 @@ def _scratch_path(filename):
     return os.path.join(app.config['UPLOAD_FOLDER'], filename)
 
 
+def _spool_upload(file_storage):
+    """Spool an uploaded file to scratch once; services read it through its mmap buffer."""
+    return SpooledUpload.from_storage(file_storage, app.config['UPLOAD_FOLDER'])
+
+
+def _store_detect_upload(file_storage, fmt_detector):
+    """
+    Keep an upload from /clasificacion/detect in scratch under a token, with
+    its detected format in a JSON sidecar, so /clasificacion/upload can reuse
+    both instead of receiving and detecting the file again.
+    Returns (token, fmt); token is None when detection failed.
+    """
+    token = uuid.uuid4().hex
+    upload = SpooledUpload.from_storage(file_storage, app.config['UPLOAD_FOLDER'],
+                                        prefix='detect', token=token, keep=True)
+    with upload:
+        fmt = fmt_detector(upload.buffer, upload.filename)
+    if fmt.get('error'):
+        os.remove(upload.path)
+        return None, fmt
+
+    with open(_scratch_path(f"detect_{token}.json"), 'w', encoding='utf-8') as f:
+        json.dump({'filename': upload.filename, 'format': fmt}, f)
+    _register_temp_artifact('detect', token, os.path.basename(upload.path))
+    return token, fmt
+
+
+def _load_detect_upload(token):
+    """
+    Resolve a detect token owned by the current user.
+    Returns (SpooledUpload, fmt) or (None, None) when it expired, is unknown
+    or belongs to someone else.
+    """
+    safe_token = secure_filename(token or '')
+    if not safe_token or safe_token != token:
+        return None, None
+    artifact = TempArtifact.query.filter_by(kind='detect', file_id=safe_token).first()
+    if artifact is None or artifact.user_id != current_user.id:
+        return None, None
+
+    path = _scratch_path(artifact.storage_name)
+    meta_path = _scratch_path(f"detect_{safe_token}.json")
+    if not os.path.exists(path) or not os.path.exists(meta_path):
+        return None, None
+    scratch_storage.touch(artifact)
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    return SpooledUpload(path, meta['filename'], keep=True), meta['format']
+
+
 def _register_temp_artifact(kind, file_id, storage_name, user_id=None):
-    """Create/update ownership metadata for temporary downloadable files."""
+    """
+    Index a file just written to scratch (owner, size, access time) and, if
+    scratch is now over its quota, evict the least recently used artifacts.
+    """
     safe_file_id = secure_filename(file_id)
     if not safe_file_id:
         raise ValueError('file_id invalido')
 
-    owner_id = user_id or current_user.id
-    artifact = TempArtifact.query.filter_by(kind=kind, file_id=safe_file_id).first()
-    if artifact is None:
-        artifact = TempArtifact(
-            kind=kind,
-            file_id=safe_file_id,
-            storage_name=storage_name,
-            user_id=owner_id,
-        )
-        db.session.add(artifact)
-    else:
-        artifact.storage_name = storage_name
-        artifact.user_id = owner_id
-
-    db.session.commit()
+    folder = app.config['UPLOAD_FOLDER']
+    artifact = scratch_storage.register(folder, kind, safe_file_id, storage_name,
+                                        user_id or current_user.id)
+    evicted = scratch_storage.enforce_quota(folder, SCRATCH_QUOTA_MB * 1024 * 1024)
+    if evicted['evicted']:
+        app.logger.info(f"[scratch] Quota exceeded, evicted {evicted}")
     return artifact
 
 
+def _discard_temp_artifact(kind, file_id):
+    """Delete a temporary artifact's files and metadata as soon as it is done with."""
+    return scratch_storage.discard_by_id(app.config['UPLOAD_FOLDER'], kind, secure_filename(file_id))
+
+
 def _get_owned_artifact_or_403(kind, file_id):
-    """Load artifact metadata and enforce owner-or-admin access."""
+    """Load artifact metadata, enforce owner-or-admin access and record the use."""
     safe_file_id = secure_filename(file_id)
     artifact = TempArtifact.query.filter_by(kind=kind, file_id=safe_file_id).first()
     if artifact is None:
         abort(404)
     if not current_user.is_admin and artifact.user_id != current_user.id:
         abort(403)
+    scratch_storage.touch(artifact)
     return artifact
 
 
@@ -442,29 +610,142 @@ def prune_database_storage():
 @app.cli.command('maintenance-prune')
 def maintenance_prune_command():
     """Prune DB metadata tables to control storage usage."""
+    def report(phase, last_id, stats):
+        click.echo(f"  [{phase}] hasta id {last_id}: {stats['deleted_by_' + phase]} registros eliminados")
+
     with app.app_context():
-        stats = prune_database_storage()
+        stats = {
+            'activity_logs': prune_activity_logs(progress=report),
+            'reports': prune_report_metadata(),
+        }
     click.echo(f"Activity logs pruned: {stats['activity_logs']}")
     click.echo(f"Reports metadata pruned: {stats['reports']}")
 
 
-# Ejecutar guardado de esquema al iniciar
-ensure_reports_schema()
+def _run_scheduled_maintenance():
+    """One pruning pass, skipped when another worker already ran it this interval."""
+    if shared_state is not None:
+        # Atomic across workers: only the first to arrive in each interval gets 1
+        if shared_state.incr('maintenance:prune', ttl=MAINTENANCE_INTERVAL_MINUTES * 60) != 1:
+            return None
+    with app.app_context():
+        stats = prune_database_storage()
+    app.logger.info(f"[maintenance] DB pruning completed: {stats}")
+    return stats
 
-if _env_bool('RUN_STARTUP_MAINTENANCE', True):
-    try:
-        with app.app_context():
-            stats = prune_database_storage()
-        app.logger.info(f"[startup] DB pruning completed: {stats}")
-    except Exception as e:
-        app.logger.warning(f"[startup] DB pruning warning: {e}")
 
-try:
+def _schedule_background_maintenance(first_delay=60):
+    """Prune the database in a background thread: shortly after boot, then every interval."""
+    def _run():
+        import time
+        time.sleep(first_delay)
+        while True:
+            try:
+                # Test suites own their database; never prune it underneath them
+                if not app.testing:
+                    _run_scheduled_maintenance()
+            except Exception as e:
+                app.logger.warning(f"[maintenance] DB pruning warning: {e}")
+            time.sleep(MAINTENANCE_INTERVAL_MINUTES * 60)
+    t = threading.Thread(target=_run, name='db-maintenance', daemon=True)
+    t.start()
+
+
+# ─────────────────────────────────────────────────────────────
+# Startup: schema migrations run once per schema change, not once per worker
+# ─────────────────────────────────────────────────────────────
+
+# Bump for migrations the models do not describe (data fixes, renamed columns)
+MIGRATIONS_REVISION = 1
+
+
+def _schema_fingerprint():
+    """Hash of the tables, columns, indexes and search indexes the code expects."""
+    parts = [f'rev{MIGRATIONS_REVISION}']
+    for table in db.metadata.sorted_tables:
+        columns = ','.join(sorted(c.name for c in table.columns))
+        indexes = ','.join(sorted(ix.name for ix in table.indexes if ix.name))
+        parts.append(f'{table.name}({columns})[{indexes}]')
+    parts.extend(f'fts:{model.__tablename__}.{column}' for model, column in SEARCHABLE_COLUMNS)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+SCHEMA_FINGERPRINT = _schema_fingerprint()
+
+
+def _schema_is_current():
+    """One primary-key lookup: has this schema already been migrated to?"""
     with app.app_context():
+        try:
+            row = db.session.get(AppMeta, 'schema_fingerprint')
+            return row is not None and row.value == SCHEMA_FINGERPRINT
+        except Exception:
+            db.session.rollback()  # app_meta missing: never migrated
+            return False
+
+
+def run_startup_migrations():
+    """Create/upgrade tables, indexes and the default admin, then record the schema (idempotent)."""
+    ensure_reports_schema()
+    with app.app_context():
+        db.session.merge(AppMeta(key='schema_fingerprint', value=SCHEMA_FINGERPRINT))
+        db.session.commit()
         app.logger.info(f"[startup] Database URL: {db.engine.url.render_as_string(hide_password=True)}")
         app.logger.info(f"[startup] Admin users: {User.query.filter_by(role='admin').count()}")
-except Exception as e:
-    app.logger.warning(f"[startup] DB diagnostics warning: {e}")
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Migrate the schema once before starting workers (use with STARTUP_MIGRATIONS=skip)."""
+    run_startup_migrations()
+    click.echo(f"Schema up to date ({SCHEMA_FINGERPRINT}).")
+
+
+# auto:   migrate only when the recorded fingerprint differs; with the shared
+#         store a lock lets one worker do it while the others wait for it
+# always: migrate on every boot (previous behaviour)
+# skip:   never at import; deployments run `flask --app app init-db` first
+STARTUP_MIGRATIONS = (os.environ.get('STARTUP_MIGRATIONS') or 'auto').strip().lower()
+# Seconds a worker waits for the lock holder before migrating itself
+STARTUP_MIGRATION_WAIT = max(0.0, _env_float('STARTUP_MIGRATION_WAIT', 60.0))
+
+
+def _await_schema_migration(timeout, poll_interval=0.25):
+    """Poll until another worker has recorded the current schema; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while not _schema_is_current():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+    return True
+
+
+def _migrate_at_startup(mode):
+    """Bring the schema up to date before serving. Returns True when this worker migrated."""
+    if mode == 'skip' or (mode == 'auto' and _schema_is_current()):
+        return False
+    if (mode == 'always' or shared_state is None
+            or shared_state.incr(f'startup:migrate:{SCHEMA_FINGERPRINT}', ttl=300) == 1):
+        run_startup_migrations()
+        return True
+
+    # Never serve on a stale schema: wait for the lock holder, and take over
+    # if it died or is stuck (the migrations are idempotent)
+    app.logger.info("[startup] Another worker is migrating the schema; waiting for it")
+    if _await_schema_migration(STARTUP_MIGRATION_WAIT):
+        return False
+    app.logger.warning(f"[startup] Schema still stale after {STARTUP_MIGRATION_WAIT:.0f}s; migrating here")
+    run_startup_migrations()
+    return True
+
+
+_migrations_started = time.perf_counter()
+STARTUP_TIMINGS['migrated'] = _migrate_at_startup(STARTUP_MIGRATIONS)
+STARTUP_TIMINGS['migrations'] = time.perf_counter() - _migrations_started
+
+# Pruning runs off the boot path so workers start serving immediately
+if _env_bool('RUN_STARTUP_MAINTENANCE', True):
+    _schedule_background_maintenance()
 
 
 # ─────────────────────────────────────────────────────────────
@@ -492,38 +773,44 @@ def template_path_from_name(template_name):
 
 
 def clean_scratch_folder():
-    """Clean only old files (>1 hour) to prevent race conditions.
-    Runs in a background thread — never blocks user requests."""
-    folder = app.config['UPLOAD_FOLDER']
+    """
+    Sweep scratch/: expire artifacts idle for SCRATCH_TTL_MINUTES, delete
+    untracked files older than that, then evict least recently used artifacts
+    until the folder fits SCRATCH_QUOTA_MB. Returns the sweep stats.
+    """
     try:
-        import time
-        current_time = time.time()
-        one_hour_ago = current_time - 3600
-        
-        for file in os.listdir(folder):
-            file_path = os.path.join(folder, file)
-            try:
-                # Only delete files/folders older than 1 hour
-                if os.path.getmtime(file_path) < one_hour_ago:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-            except Exception:
-                continue
+        stats = scratch_storage.sweep(app.config['UPLOAD_FOLDER'],
+                                      ttl_seconds=SCRATCH_TTL_MINUTES * 60,
+                                      quota_bytes=SCRATCH_QUOTA_MB * 1024 * 1024)
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error al limpiar la carpeta scratch: {e}")
+        return None
+    app.logger.info(f"[scratch] Sweep completed: {stats}")
+    return stats
+
+
+def _run_scheduled_scratch_sweep():
+    """One scratch sweep, skipped when another worker already ran it this interval."""
+    if shared_state is not None:
+        # Same election as the DB maintenance: the first worker in each interval sweeps
+        if shared_state.incr('maintenance:scratch', ttl=SCRATCH_SWEEP_INTERVAL_MINUTES * 60) != 1:
+            return None
+    with app.app_context():
+        return clean_scratch_folder()
 
 
 def _schedule_background_cleanup():
-    """Start a background thread that cleans scratch/ every 30 minutes."""
+    """Start a background thread that sweeps scratch/ every SCRATCH_SWEEP_INTERVAL_MINUTES."""
     def _run():
         while True:
-            import time
-            time.sleep(1800)  # 30 minutes
-            with app.app_context():
-                clean_scratch_folder()
-    t = threading.Thread(target=_run, daemon=True)
+            time.sleep(SCRATCH_SWEEP_INTERVAL_MINUTES * 60)
+            try:
+                if not app.testing:
+                    _run_scheduled_scratch_sweep()
+            except Exception as e:
+                app.logger.warning(f"[scratch] Sweep warning: {e}")
+    t = threading.Thread(target=_run, name='scratch-cleaner', daemon=True)
     t.start()
 
 _schedule_background_cleanup()
@@ -698,112 +985,6 @@ def process_report(csv_path, wordcloud_path, unique_id, template_filename, repor
 
     prs = Presentation(tpl_path)
 
-    # --- OPTIMIZED: Single-pass placeholder indexing (P3) ---
-    # Build index once instead of scanning slides multiple times
-    placeholder_index = {}
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            try:
-                if shape.has_text_frame and shape.text.strip():
-                    placeholder_index[shape.text.strip()] = (slide, shape)
-            except Exception:
-                continue
-
-    def find_shape_for_key(key):
-        """Fast lookup using pre-built index"""
-        return placeholder_index.get(key, (None, None))
-
-    # Reemplazo de textos genéricos
-    text_mapping = {
-        "REPORT_CLIENT": client_name,
-        "REPORT_DATE": current_date,
-        "NUMB_MENTIONS": str(total_mentions),
-        "NUMB_ACTORS": str(count_of_authors),
-        "EST_REACH": estimated_reach
-    }
-
-    # Apply text replacements using index
-    found_text_keys = set()
-    for key, value in text_mapping.items():
-        slide, shape = find_shape_for_key(key)
-        if shape:
-            try:
-                # Custom color for REPORT_DATE (white)
-                text_color = RGBColor(255, 255, 255) if key == "REPORT_DATE" else RGBColor(0, 0, 0)
-                set_text_style(shape, str(value), 'Effra Heavy', Pt(28), 
-                               False if key not in ("NUMB_MENTIONS", "NUMB_ACTORS", "EST_REACH") else True,
-                               color=text_color)
-                found_text_keys.add(key)
-            except Exception:
-                pass
-    
-    for key in text_mapping.keys():
-        if key not in found_text_keys:
-            missing_fields.append(key)
-
-    # Charts / imágenes: buscar placeholder y añadir imagen en la ubicación del placeholder
-    def place_image_at_placeholder(key, image_path, default_size=None):
-        slide, shape = find_shape_for_key(key)
-        if slide and shape:
-            try:
-                left = shape.left
-                top = shape.top
-                width = shape.width
-                height = shape.height
-                # eliminar texto para evitar superposición
-                try:
-                    shape.text = ""
-                except Exception:
-                    pass
-                if default_size:
-                    width, height = default_size
-                slide.shapes.add_picture(image_path, left, top, width=width, height=height)
-                return True
-            except Exception:
-                return False
-        return False
-
-    # Conversación (native line chart)
-    conv_slide, conv_shape = find_shape_for_key('CONVERSATION_CHART')
-    if conv_slide and conv_shape:
-        try:
-            native_charts.add_native_line_chart(
-                conv_slide, conv_shape,
-                evolution_data['labels'], evolution_data['values'],
-                width=Inches(9.07), height=Inches(5.15)
-            )
-        except Exception:
-            missing_fields.append('CONVERSATION_CHART')
-    else:
-        missing_fields.append('CONVERSATION_CHART')
-
-    # Sentiment pie (native pie chart)
-    sent_slide, sent_shape = find_shape_for_key('SENTIMENT_PIE')
-    if sent_slide and sent_shape:
-        try:
-            native_charts.add_native_pie_chart(sent_slide, sent_shape, sentiment_data, width=Inches(5.75), height=Inches(5.09))
-        except Exception:
-            missing_fields.append('SENTIMENT_PIE')
-    else:
-        missing_fields.append('SENTIMENT_PIE')
-
-    # Wordcloud
-    wc_added = False
-    if wordcloud_path and os.path.exists(wordcloud_path):
-        wc_added = place_image_at_placeholder('WORDCLOUD', wordcloud_path, default_size=(Inches(4.2), Inches(2.66)))
-    if not wc_added:
-        missing_fields.append('WORDCLOUD')
-
-    # Top news (texto grande)
-    topnews_slide, topnews_shape = find_shape_for_key('TOP_NEWS')
-    if topnews_shape:
-        try:
-            set_text_style(topnews_shape, "\n".join(top_sentences), 'Effra Light', Pt(12), False)
-        except Exception:
-            missing_fields.append('TOP_NEWS')
-    else:
-        missing_fields.append('TOP_NEWS')
-
     # Análisis Groq
     analisis_texto = "No disponible"
     try:
@@ -817,79 +998,68 @@ def process_report(csv_path, wordcloud_path, unique_id, template_filename, repor
     except Exception:
         analisis_texto = "No disponible"
 
-    analisis_slide, analisis_shape = find_shape_for_key('CONVERSATION_ANALISIS')
-    if analisis_shape:
-        try:
-            set_text_style(analisis_shape, analisis_texto, 'Effra Light', Pt(11), False)
-        except Exception:
-            missing_fields.append('CONVERSATION_ANALISIS')
-    else:
-        missing_fields.append('CONVERSATION_ANALISIS')
-
-    # KPI NUMB_PRENSA / NUMB_REDES and tables: localizar placeholder y ubicar tabla
-    prensa_shape_key = 'NUMB_PRENSA'
-    prensa_slide, prensa_shape = find_shape_for_key(prensa_shape_key)
-    if prensa_shape:
-        try:
-            set_text_style(prensa_shape, str(platform_counts.get('Prensa Digital', 0)), font_size=Pt(28))
-        except Exception:
-            missing_fields.append(prensa_shape_key)
-    else:
-        missing_fields.append(prensa_shape_key)
-
-    try:
-        table_added = False
-        slide_for_table, shape_for_table = find_shape_for_key('TOP_INFLUENCERS_PRENSA_TABLE')
-        if slide_for_table and shape_for_table:
-            left, top, width, height = shape_for_table.left, shape_for_table.top, shape_for_table.width, shape_for_table.height
-            try:
-                ppt_engine.add_dataframe_as_table(slide_for_table, top_influencers_prensa, left, top, width, height)
-                table_added = True
-            except Exception:
-                table_added = False
-        if not table_added:
-            missing_fields.append('TOP_INFLUENCERS_PRENSA_TABLE')
-    except Exception:
-        missing_fields.append('TOP_INFLUENCERS_PRENSA_TABLE')
-
-    redes_shape_key = 'NUMB_REDES'
-    redes_slide, redes_shape = find_shape_for_key(redes_shape_key)
-    if redes_shape:
-        try:
-            set_text_style(redes_shape, str(platform_counts.get('Redes Sociales', 0)), font_size=Pt(28))
-        except Exception:
-            missing_fields.append(redes_shape_key)
-    else:
-        missing_fields.append(redes_shape_key)
-
-    # Two tables for redes (posts and reach)
-    try:
-        table1_added = False
-        slide_t1, shape_t1 = find_shape_for_key('TOP_INFLUENCERS_REDES_POSTS_TABLE')
-        if slide_t1 and shape_t1:
-            try:
-                ppt_engine.add_dataframe_as_table(slide_t1, top_influencers_redes_posts, shape_t1.left, shape_t1.top, shape_t1.width, shape_t1.height)
-                table1_added = True
-            except Exception:
-                table1_added = False
-        if not table1_added:
-            missing_fields.append('TOP_INFLUENCERS_REDES_POSTS_TABLE')
-    except Exception:
-        missing_fields.append('TOP_INFLUENCERS_REDES_POSTS_TABLE')
-
-    try:
-        table2_added = False
-        slide_t2, shape_t2 = find_shape_for_key('TOP_INFLUENCERS_REDES_REACH_TABLE')
-        if slide_t2 and shape_t2:
-            try:
-                ppt_engine.add_dataframe_as_table(slide_t2, top_influencers_redes_reach, shape_t2.left, shape_t2.top, shape_t2.width, shape_t2.height)
-                table2_added = True
-            except Exception:
-                table2_added = False
-        if not table2_added:
-            missing_fields.append('TOP_INFLUENCERS_REDES_REACH_TABLE')
-    except Exception:
-        missing_fields.append('TOP_INFLUENCERS_REDES_REACH_TABLE')
+    # Reemplazo de textos genéricos
+    text_mapping = {
+        "REPORT_CLIENT": client_name,
+        "REPORT_DATE": current_date,
+        "NUMB_MENTIONS": str(total_mentions),
+        "NUMB_ACTORS": str(count_of_authors),
+        "EST_REACH": estimated_reach
+    }
+    handlers = {}
+    for key, value in text_mapping.items():
+        # Custom color for REPORT_DATE (white)
+        text_color = RGBColor(255, 255, 255) if key == "REPORT_DATE" else RGBColor(0, 0, 0)
+        handlers[key] = ppt_engine.text_placeholder(
+            str(value), font_name='Effra Heavy', font_size=Pt(28),
+            bold=key in ("NUMB_MENTIONS", "NUMB_ACTORS", "EST_REACH"), color=text_color)
+
+    platform_texts = {
+        'NUMB_PRENSA': str(platform_counts.get('Prensa Digital', 0)),
+        'NUMB_REDES': str(platform_counts.get('Redes Sociales', 0)),
+    }
+    for key, value in platform_texts.items():
+        handlers[key] = ppt_engine.text_placeholder(value, font_size=Pt(28))
+
+    handlers['TOP_NEWS'] = ppt_engine.text_placeholder(
+        "\n".join(top_sentences), font_name='Effra Light', font_size=Pt(12), bold=False)
+    handlers['CONVERSATION_ANALISIS'] = ppt_engine.text_placeholder(
+        analisis_texto, font_name='Effra Light', font_size=Pt(11), bold=False)
+
+    # Charts nativos
+    handlers['CONVERSATION_CHART'] = lambda slide, shape: native_charts.add_native_line_chart(
+        slide, shape, evolution_data['labels'], evolution_data['values'],
+        width=Inches(9.07), height=Inches(5.15))
+    handlers['SENTIMENT_PIE'] = lambda slide, shape: native_charts.add_native_pie_chart(
+        slide, shape, sentiment_data, width=Inches(5.75), height=Inches(5.09))
+
+    # Wordcloud: imagen en la ubicación del placeholder
+    if wordcloud_path and os.path.exists(wordcloud_path):
+        def place_wordcloud(slide, shape):
+            left, top = shape.left, shape.top
+            # eliminar texto para evitar superposición
+            shape.text = ""
+            slide.shapes.add_picture(wordcloud_path, left, top, width=Inches(4.2), height=Inches(2.66))
+        handlers['WORDCLOUD'] = place_wordcloud
+
+    # Tablas de influenciadores en la ubicación del placeholder
+    def table_at_placeholder(df):
+        return lambda slide, shape: ppt_engine.add_dataframe_as_table(
+            slide, df, shape.left, shape.top, shape.width, shape.height)
+
+    handlers['TOP_INFLUENCERS_PRENSA_TABLE'] = table_at_placeholder(top_influencers_prensa)
+    handlers['TOP_INFLUENCERS_REDES_POSTS_TABLE'] = table_at_placeholder(top_influencers_redes_posts)
+    handlers['TOP_INFLUENCERS_REDES_REACH_TABLE'] = table_at_placeholder(top_influencers_redes_reach)
+
+    # Una sola pasada por las formas de la plantilla; {{TOKEN}} dentro de
+    # otros textos se sustituye con los mismos valores
+    filled = ppt_engine.apply_placeholders(prs, handlers,
+                                           inline_values={**text_mapping, **platform_texts},
+                                           raise_errors=False)
+    expected = [*text_mapping, 'CONVERSATION_CHART', 'SENTIMENT_PIE', 'WORDCLOUD', 'TOP_NEWS',
+                'CONVERSATION_ANALISIS', 'NUMB_PRENSA', 'TOP_INFLUENCERS_PRENSA_TABLE', 'NUMB_REDES',
+                'TOP_INFLUENCERS_REDES_POSTS_TABLE', 'TOP_INFLUENCERS_REDES_REACH_TABLE']
+    missing_fields.extend(key for key in expected if key not in filled)
 
     # Guardado de archivos
     safe_title = secure_filename(report_title) if report_title else f"Reporte_{unique_id}"
@@ -902,6 +1072,7 @@ def process_report(csv_path, wordcloud_path, unique_id, template_filename, repor
     with zipfile.ZipFile(zip_path, 'w') as zipf:
         zipf.write(pptx_path, arcname=pptx_filename)
         zipf.write(processed_csv_path, arcname=os.path.basename(processed_csv_path))
+    _register_temp_artifact('report', zip_filename, zip_filename)
 
     # Persistencia del reporte con plantilla usada
     new_report = Report(
@@ -939,10 +1110,9 @@ def download_file(filename):
     if not os.path.exists(full_path):
         abort(404)
 
-    @after_this_request
-    def cleanup(response):
-        clean_scratch_folder()
-        return response
+    artifact = TempArtifact.query.filter_by(kind='report', file_id=safe_filename).first()
+    if artifact is not None:
+        scratch_storage.touch(artifact)
 
     log_activity('download_report', f'Descarga: {safe_filename}')
     return send_file(full_path, as_attachment=True)
@@ -1059,16 +1229,33 @@ def clasificacion():
 @app.route('/clasificacion/detect', methods=['POST'])
 @tool_required('classification')
 def clasificacion_detect():
-    """Auto-detect format + return column list and preview rows."""
+    """
+    Auto-detect format + return column list and preview rows.
+    The upload stays in scratch under the returned `token` so the upload step
+    does not need the file again. Posting `token` instead of a file re-runs
+    detection on the stored copy.
+    """
     file = request.files.get('csv_file')
-    if not file:
+    token = (request.form.get('token') or '').strip()
+    if not file and not token:
         return jsonify({'success': False, 'error': 'No se recibio ningun archivo.'}), 400
     try:
-        raw = file.read()
-        result = detect_format(raw, file.filename)
+        if file:
+            token, result = _store_detect_upload(file, detect_format)
+        else:
+            upload, _ = _load_detect_upload(token)
+            if upload is None:
+                return jsonify({'success': False, 'expired': True,
+                                'error': 'El archivo ya no esta disponible. Vuelve a seleccionarlo.'}), 404
+            with upload:
+                result = detect_format(upload.buffer, upload.filename)
+            if not result.get('error'):
+                with open(_scratch_path(f"detect_{token}.json"), 'w', encoding='utf-8') as f:
+                    json.dump({'filename': upload.filename, 'format': result}, f)
         if result.get('error'):
             return jsonify({'success': False, 'error': result['error']}), 400
         return jsonify({'success': True,
+                        'token': token,
                         'columns': result['columns'],
                         'preview': result['preview'],
                         'encoding': result.get('encoding'),
@@ -1090,45 +1277,52 @@ def clasificacion_upload():
     Receive the full file, read it properly (respecting encoding/sep overrides),
     convert to UTF-8 TSV, store in a session temp file, and return chunk metadata.
     This avoids using the browser's file.text() API which always decodes as UTF-8.
+    Accepts either the file itself or the `token` returned by /clasificacion/detect,
+    in which case the stored upload and its detected format are reused.
     """
-    from services.file_loader import detect_format as _detect_fmt, read_full_as_tsv as _read_tsv
-
     file = request.files.get('csv_file')
-    if not file:
+    token = (request.form.get('token') or '').strip()
+    if not file and not token:
         return jsonify({'success': False, 'error': 'No se recibio ningun archivo.'}), 400
 
     try:
-        raw = file.read()
-
-        # Auto-detect format first
-        fmt = _detect_fmt(raw, file.filename)
-        if fmt.get('error'):
-            return jsonify({'success': False, 'error': fmt['error']}), 400
-
-        # Apply manual overrides if provided
-        manual_encoding = (request.form.get('encoding') or '').strip() or None
-        manual_sep      = (request.form.get('sep') or '').strip() or None
-
-        if manual_encoding:
-            fmt['encoding'] = manual_encoding
-        if manual_sep:
-            fmt['sep'] = manual_sep
+        if file:
+            upload, fmt = _spool_upload(file), None
+        else:
+            upload, fmt = _load_detect_upload(token)
+            if upload is None:
+                return jsonify({'success': False, 'expired': True,
+                                'error': 'El archivo ya no esta disponible. Vuelve a seleccionarlo.'}), 404
+
+        with upload:
+            # Auto-detect format first (already known for a detect token)
+            if fmt is None:
+                fmt = detect_format(upload.buffer, upload.filename)
+            if fmt.get('error'):
+                return jsonify({'success': False, 'error': fmt['error']}), 400
+
+            # Apply manual overrides if provided
+            manual_encoding = (request.form.get('encoding') or '').strip() or None
+            manual_sep      = (request.form.get('sep') or '').strip() or None
+
+            if manual_encoding:
+                fmt['encoding'] = manual_encoding
+            if manual_sep:
+                fmt['sep'] = manual_sep
+
+            # Convert to a UTF-8 TSV session file for the chunk endpoint to use
+            session_id = uuid.uuid4().hex
+            session_file = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{session_id}.tsv")
+            header, total_rows = write_full_as_tsv(upload.buffer, fmt, session_file)
 
-        # Read full file as UTF-8 TSV using the correct encoding/format
-        header, body = _read_tsv(raw, fmt)
         if not header:
+            if os.path.exists(session_file):
+                os.remove(session_file)
             return jsonify({'success': False, 'error': 'No se pudo leer el archivo con el formato indicado.'}), 400
-
-        # Count data rows
-        data_lines = [l for l in body.split('\n') if l.strip()]
-        total_rows = len(data_lines)
-
-        # Store TSV in a session temp file for the chunk endpoint to use
-        session_id = uuid.uuid4().hex
-        session_file = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{session_id}.tsv")
-        with open(session_file, 'w', encoding='utf-8') as f:
-            f.write(header)
-            f.write(body)
+        _register_temp_artifact('upload', session_id, os.path.basename(session_file))
+        if not file:
+            # The TSV now holds the data; drop the raw detect spool and its sidecar
+            _discard_temp_artifact('detect', token)
 
         CHUNK_SIZE = 2000
         total_chunks = max(1, -(-total_rows // CHUNK_SIZE))  # ceiling division
@@ -1161,7 +1355,8 @@ def clasificacion_upload_body(session_id):
     safe_sid = secure_filename(session_id)
     if not safe_sid or safe_sid != session_id:
         abort(400)
-    session_file = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{safe_sid}.tsv")
+    artifact = _get_owned_artifact_or_403('upload', safe_sid)
+    session_file = _scratch_path(artifact.storage_name)
     if not os.path.exists(session_file):
         abort(404)
     try:
@@ -1375,6 +1570,8 @@ def clasificacion_finalize():
         output_path = os.path.join(app.config['UPLOAD_FOLDER'], f"classified_{safe_sid}.csv")
         os.replace(session_file, output_path)
         _register_temp_artifact('classified', safe_sid, f"classified_{safe_sid}.csv")
+        # The TSV the chunks were cut from is no longer needed
+        _discard_temp_artifact('upload', safe_sid)
 
         log_activity('classify_data',
                      f'Clasificacion (chunked): {safe_orig} ({len(df_full)} filas, {len(stats)} categorias)')
@@ -1439,8 +1636,8 @@ def union_detect():
     if not file:
         return jsonify({'success': False, 'error': 'No se recibio ningun archivo.'}), 400
     try:
-        raw = file.read()
-        result = detect_format(raw, file.filename)
+        with _spool_upload(file) as upload:
+            result = detect_format(upload.buffer, file.filename)
         if result.get('error'):
             return jsonify({'success': False, 'error': result['error']}), 400
         return jsonify({
@@ -1483,10 +1680,9 @@ def union_merge():
             enc_b = request.form.get('encoding_b') or None
             sep_b = request.form.get('sep_b') or None
 
-            raw_a = file_a.read()
-            raw_b = file_b.read()
-            df_a = read_file(raw_a, file_a.filename, encoding=enc_a, sep=sep_a)
-            df_b = read_file(raw_b, file_b.filename, encoding=enc_b, sep=sep_b)
+            with _spool_upload(file_a) as upload_a, _spool_upload(file_b) as upload_b:
+                df_a = read_file(upload_a.buffer, file_a.filename, encoding=enc_a, sep=sep_a)
+                df_b = read_file(upload_b.buffer, file_b.filename, encoding=enc_b, sep=sep_b)
 
             merged = merge_advanced(df_a, df_b, mapping)
 
@@ -1502,6 +1698,7 @@ def union_merge():
                     merged[col_name] = ec.get('value', '')
 
             files_merged = 2
+            duplicates_dropped = 0
             detail = f'Union avanzada: {file_a.filename} + {file_b.filename} ({len(merged)} filas)'
 
         else:
@@ -1522,16 +1719,28 @@ def union_merge():
             dataframes = []
             filenames = []
             for i, f in enumerate(files):
-                raw = f.read()
                 enc = encodings[i] if i < len(encodings) and encodings[i] else None
                 sep = seps[i] if i < len(seps) and seps[i] else None
-                df = read_file(raw, f.filename, encoding=enc, sep=sep)
+                with _spool_upload(f) as upload:
+                    df = read_file(upload.buffer, f.filename, encoding=enc, sep=sep)
                 dataframes.append(df)
                 filenames.append(f.filename)
 
-            merged = merge_default(dataframes)
+            # Optional dedup stage: JSON list of key columns (empty = disabled)
+            try:
+                dedup_columns = json.loads(request.form.get('dedup_columns', '[]'))
+            except json.JSONDecodeError:
+                return jsonify({'success': False, 'error': 'Columnas de deduplicacion invalidas.'}), 400
+            if not isinstance(dedup_columns, list):
+                dedup_columns = []
+            dedup_columns = [str(c).strip() for c in dedup_columns if str(c).strip()]
+
+            merged = merge_default(dataframes, dedup_columns=dedup_columns or None)
+            duplicates_dropped = merged.attrs.get('duplicates_dropped', 0)
             files_merged = len(files)
             detail = f'Union predeterminada: {", ".join(filenames)} ({len(merged)} filas)'
+            if dedup_columns:
+                detail += f', {duplicates_dropped} duplicados eliminados'
 
         # Save result
         unique_id = uuid.uuid4().hex[:10]
@@ -1547,6 +1756,7 @@ def union_merge():
             'total_rows': len(merged),
             'total_columns': len(merged.columns),
             'files_merged': files_merged,
+            'duplicates_dropped': duplicates_dropped,
         })
 
     except ValueError as e:
@@ -1581,9 +1791,12 @@ def analisis_csv():
         file = request.files.get('csv_file')
         encoding = request.form.get('encoding', 'utf-8')
         separator = request.form.get('separator', ',')
+        mode = request.form.get('mode', 'auto')
         
         if not file:
             return jsonify({'success': False, 'error': 'No se proporcionó ningún archivo'}), 400
+        if mode not in csv_analysis.ANALYSIS_MODES:
+            return jsonify({'success': False, 'error': 'Modo de analisis invalido.'}), 400
         
         # Save file temporarily
         unique_id = str(uuid.uuid4())
@@ -1593,7 +1806,11 @@ def analisis_csv():
         
         try:
             # Run analysis
-            result = analyze_csv(file_path, encoding, separator)
+            result = analyze_csv(
+                file_path, encoding, separator,
+                mode=mode,
+                sample_threshold_mb=app.config['CSV_SAMPLE_THRESHOLD_MB'],
+            )
 
             if result['success']:
                 log_activity('csv_analysis', f'Análisis CSV: {file.filename}')
@@ -1644,9 +1861,8 @@ def download_csv_summary(file_id):
     @after_this_request
     def cleanup(response):
         try:
-            if os.path.exists(file_path):
-                # Delete file after download
-                os.remove(file_path)
+            # Delete file after download (send_file already holds it open)
+            _discard_temp_artifact('csv_summary', safe_id)
         except Exception as e:
             app.logger.error(f"Error limpiando archivo de resumen: {e}")
         return response
@@ -1800,6 +2016,9 @@ def generate_pptx_route():
         app.logger.error(f"ERROR GENERANDO PPT: {e}")
         return "Error generando el reporte. Por favor intenta nuevamente.", 500
 
+STARTUP_TIMINGS['total'] = time.perf_counter() - _BOOT_STARTED
+
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     debug_mode = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
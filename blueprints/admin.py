@@ -1,11 +1,18 @@
 import os
+import atexit
 import functools
 import secrets
+from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, session
 from flask_login import login_required, current_user, login_user
+from sqlalchemy import case, event, func, select, tuple_
+from sqlalchemy.orm import joinedload
 from werkzeug.security import generate_password_hash
 from extensions import db
-from models import User, ActivityLog, Role, Area
+from models import User, ActivityLog, Role, Area, invalidate_user_state
+from services.search_index import substring_filter
+from services.activity_buffer import ActivityLogBuffer
+from services.ttl_cache import TTLCache
 
 # The default admin email — this account is fully protected
 DEFAULT_ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@dataintel.com')
@@ -33,19 +40,47 @@ def is_default_admin(user):
     return user.email == DEFAULT_ADMIN_EMAIL
 
 
+_activity_buffer = None
+
+
+def init_activity_log_buffer(app, batch_size=200, flush_interval_ms=500, max_pending=10_000):
+    """Route log_activity() through a background bulk writer (see services/activity_buffer.py)."""
+    global _activity_buffer
+
+    def write_rows(rows):
+        with app.app_context():
+            db.session.execute(db.insert(ActivityLog), rows)
+            db.session.commit()
+
+    _activity_buffer = ActivityLogBuffer(
+        write_rows,
+        batch_size=batch_size,
+        flush_interval=flush_interval_ms / 1000,
+        max_pending=max_pending,
+    )
+    atexit.register(_activity_buffer.close)
+    return _activity_buffer
+
+
 def log_activity(action, detail="", user_id=None):
     """Log an action to the activity_logs table."""
     uid = user_id or (current_user.id if current_user.is_authenticated else None)
     if uid is None:
         return
+    row = {
+        'user_id': uid,
+        'action': action,
+        'detail': detail[:500] if detail else "",
+        'ip_address': request.remote_addr if request else None,
+        'timestamp': datetime.utcnow(),
+    }
+
+    if _activity_buffer is not None:
+        _activity_buffer.submit(row)
+        return
+
     try:
-        log = ActivityLog(
-            user_id=uid,
-            action=action,
-            detail=detail[:500] if detail else "",
-            ip_address=request.remote_addr if request else None,
-        )
-        db.session.add(log)
+        db.session.add(ActivityLog(**row))
         db.session.commit()
     except Exception:
         db.session.rollback()
@@ -55,35 +90,66 @@ def log_activity(action, detail="", user_id=None):
 # Dashboard
 # ─────────────────────────────────────────────────────────────
 
+# Dashboard counters, reused for a few seconds; user/role/area changes call
+# invalidate_dashboard_stats(). app.py attaches the shared store when configured.
+dashboard_stats_cache = TTLCache(ttl=10.0, namespace='admin_dashboard')
+
+
+def invalidate_dashboard_stats():
+    dashboard_stats_cache.delete('stats')
+
+
+# A recreated users table means none of the cached totals apply
+event.listen(User.__table__, 'after_create', lambda *args, **kw: dashboard_stats_cache.clear())
+
+
+def _dashboard_stats():
+    """User, role, area and log totals in a fixed number of queries, whatever the role count."""
+    stats = dashboard_stats_cache.get('stats')
+    if stats is not None:
+        return stats
+
+    per_role = (db.session.query(
+                    User.role,
+                    func.count(User.id),
+                    func.coalesce(func.sum(case((User.is_active.is_(True), 1), else_=0)), 0))
+                .group_by(User.role)
+                .all())
+    users_by_role = {role: count for role, count, _ in per_role}
+
+    role_codes = [code for (code,) in db.session.query(Role.code).order_by(Role.code)]
+    total_logs, total_areas = db.session.execute(select(
+        select(func.count(ActivityLog.id)).scalar_subquery(),
+        select(func.count(Area.id)).scalar_subquery(),
+    )).one()
+
+    # Roles from the Role table (zero when unused); always include 'admin'
+    roles_count = {code: users_by_role.get(code, 0) for code in role_codes}
+    roles_count.setdefault('admin', users_by_role.get('admin', 0))
+
+    stats = {
+        'total_users': sum(users_by_role.values()),
+        'active_users': sum(int(active) for _, _, active in per_role),
+        'roles_count': roles_count,
+        'total_logs': total_logs,
+        'total_roles': len(role_codes),
+        'total_areas': total_areas,
+    }
+    dashboard_stats_cache.set('stats', stats)
+    return stats
+
+
 @admin_bp.route('/')
 @admin_required
 def dashboard():
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    # Dynamic role counts
-    all_roles = Role.query.order_by(Role.code).all()
-    roles_count = {}
-    for r in all_roles:
-        roles_count[r.code] = User.query.filter_by(role=r.code).count()
-    # Always include 'admin' even if not in Role table
-    if 'admin' not in roles_count:
-        roles_count['admin'] = User.query.filter_by(role='admin').count()
-    total_logs = ActivityLog.query.count()
-    total_roles = Role.query.count()
-    total_areas = Area.query.count()
-
     recent_logs = (ActivityLog.query
+                   .options(joinedload(ActivityLog.user))
                    .order_by(ActivityLog.timestamp.desc())
                    .limit(10)
                    .all())
     return render_template('admin_dashboard.html',
-                           total_users=total_users,
-                           active_users=active_users,
-                           roles_count=roles_count,
-                           total_logs=total_logs,
-                           total_roles=total_roles,
-                           total_areas=total_areas,
-                           recent_logs=recent_logs)
+                           recent_logs=recent_logs,
+                           **_dashboard_stats())
 
 
 # ─────────────────────────────────────────────────────────────
@@ -160,6 +226,8 @@ def user_create():
 
         db.session.add(new_user)
         db.session.commit()
+        invalidate_dashboard_stats()
+        invalidate_user_options()
 
         log_activity('admin_create_user', f'Creo usuario: {username} ({email}) con rol {role}')
         flash(f'Usuario "{username}" creado exitosamente.', 'success')
@@ -232,6 +300,9 @@ def user_edit(user_id):
             changes.append(f'permisos actualizados')
 
         db.session.commit()
+        invalidate_user_state(user.id)
+        invalidate_dashboard_stats()
+        invalidate_user_options()
         log_activity('admin_edit_user', f'Edito usuario #{user_id}: {", ".join(changes) if changes else "sin cambios"}')
         flash(f'Usuario "{user.username}" actualizado.', 'success')
         return redirect(url_for('admin.users_list'))
@@ -263,6 +334,8 @@ def user_toggle(user_id):
 
     user.is_active = not user.is_active
     db.session.commit()
+    invalidate_user_state(user.id)
+    invalidate_dashboard_stats()
 
     status = 'activado' if user.is_active else 'desactivado'
     log_activity('admin_toggle_user', f'Usuario #{user_id} ({user.username}) {status}')
@@ -289,6 +362,8 @@ def user_delete(user_id):
 
     user.is_active = False
     db.session.commit()
+    invalidate_user_state(user.id)
+    invalidate_dashboard_stats()
 
     log_activity('admin_delete_user', f'Desactivó usuario #{user_id} ({user.username})')
     flash(f'Usuario "{user.username}" desactivado.', 'warning')
@@ -299,6 +374,114 @@ def user_delete(user_id):
 # Activity Log
 # ─────────────────────────────────────────────────────────────
 
+ACTIVITY_PAGE_SIZE = 50
+# Filtered totals count at most this many rows, then show "N+"
+ACTIVITY_COUNT_CAP = 10_000
+
+# (id, username) pairs for the user filter; create/edit call invalidate_user_options()
+user_options_cache = TTLCache(ttl=60.0, namespace='admin_user_options')
+
+
+def invalidate_user_options():
+    user_options_cache.delete('all')
+
+
+event.listen(User.__table__, 'after_create', lambda *args, **kw: user_options_cache.clear())
+
+
+def _user_options():
+    options = user_options_cache.get('all')
+    if options is None:
+        options = [{'id': uid, 'username': username}
+                   for uid, username in (db.session.query(User.id, User.username)
+                                         .order_by(User.username))]
+        user_options_cache.set('all', options)
+    return options
+
+
+def _apply_activity_date_filters(query, date_from, date_to):
+    if date_from:
+        try:
+            query = query.filter(ActivityLog.timestamp >= datetime.strptime(date_from, '%Y-%m-%d'))
+        except ValueError:
+            pass
+    if date_to:
+        try:
+            dt_to = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
+            query = query.filter(ActivityLog.timestamp < dt_to)
+        except ValueError:
+            pass
+    return query
+
+
+def _encode_activity_cursor(log):
+    return f'{log.timestamp.isoformat()}_{log.id}'
+
+
+def _decode_activity_cursor(raw_cursor):
+    """Parse a '<timestamp>_<id>' keyset cursor. Returns None when invalid."""
+    ts_raw, _, id_raw = str(raw_cursor).rpartition('_')
+    try:
+        return datetime.fromisoformat(ts_raw), int(id_raw)
+    except ValueError:
+        return None
+
+
+def _activity_total_label(query, filtered):
+    """
+    Total shown above the table, at a cost that does not grow with the log:
+    the id span when unfiltered (rows are pruned oldest-first, so it is close),
+    otherwise a count that stops at ACTIVITY_COUNT_CAP.
+    """
+    if not filtered:
+        low, high = db.session.query(func.min(ActivityLog.id), func.max(ActivityLog.id)).one()
+        return f'~{high - low + 1}' if high is not None else '0'
+    capped = query.order_by(None).with_entities(ActivityLog.id).limit(ACTIVITY_COUNT_CAP + 1).subquery()
+    total = db.session.query(func.count()).select_from(capped).scalar()
+    return f'{ACTIVITY_COUNT_CAP}+' if total > ACTIVITY_COUNT_CAP else str(total)
+
+
+def _activity_page(query, filtered):
+    """
+    One page of logs, newest first, keyset-paged on (timestamp, id).
+
+    `after` moves to older entries, `before` to newer ones; every page costs
+    the same regardless of depth. Returns the template variables.
+    """
+    after = _decode_activity_cursor(request.args['after']) if request.args.get('after') else None
+    before = _decode_activity_cursor(request.args['before']) if request.args.get('before') else None
+    key = tuple_(ActivityLog.timestamp, ActivityLog.id)
+
+    page_query = query.options(joinedload(ActivityLog.user))
+    if before:
+        rows = (page_query.filter(key > tuple_(*before))
+                .order_by(ActivityLog.timestamp.asc(), ActivityLog.id.asc())
+                .limit(ACTIVITY_PAGE_SIZE + 1).all())
+        has_newer = len(rows) > ACTIVITY_PAGE_SIZE
+        logs = list(reversed(rows[:ACTIVITY_PAGE_SIZE]))
+        has_older = True
+    else:
+        if after:
+            page_query = page_query.filter(key < tuple_(*after))
+        rows = (page_query
+                .order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc())
+                .limit(ACTIVITY_PAGE_SIZE + 1).all())
+        has_older = len(rows) > ACTIVITY_PAGE_SIZE
+        logs = rows[:ACTIVITY_PAGE_SIZE]
+        has_newer = after is not None
+
+    def page_url(**cursor):
+        args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+        return url_for(request.endpoint, **(request.view_args or {}), **args, **cursor)
+
+    return {
+        'logs': logs,
+        'prev_url': page_url(before=_encode_activity_cursor(logs[0])) if logs and has_newer else None,
+        'next_url': page_url(after=_encode_activity_cursor(logs[-1])) if logs and has_older else None,
+        'total_label': _activity_total_label(query, filtered),
+    }
+
+
 @admin_bp.route('/activity')
 @admin_required
 def activity_log():
@@ -306,46 +489,30 @@ def activity_log():
     action_filter = request.args.get('action', '').strip()
     date_from = request.args.get('date_from', '').strip()
     date_to = request.args.get('date_to', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = 50
 
     query = ActivityLog.query
+    filtered = False
 
     if user_filter:
         try:
             query = query.filter_by(user_id=int(user_filter))
+            filtered = True
         except ValueError:
             pass
     if action_filter:
-        query = query.filter(ActivityLog.action.ilike(f'%{action_filter}%'))
-    
-    if date_from:
-        try:
-            from datetime import datetime as dt
-            df = dt.strptime(date_from, '%Y-%m-%d')
-            query = query.filter(ActivityLog.timestamp >= df)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            from datetime import datetime as dt, timedelta
-            dt_to = dt.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-            query = query.filter(ActivityLog.timestamp < dt_to)
-        except ValueError:
-            pass
+        query = query.filter(substring_filter(ActivityLog, 'action', action_filter))
+        filtered = True
+    if date_from or date_to:
+        query = _apply_activity_date_filters(query, date_from, date_to)
+        filtered = True
 
-    logs = (query
-            .order_by(ActivityLog.timestamp.desc())
-            .paginate(page=page, per_page=per_page, error_out=False))
-
-    users = User.query.order_by(User.username).all()
     return render_template('admin_activity.html',
-                           logs=logs,
-                           users=users,
+                           users=_user_options(),
                            user_filter=user_filter,
                            action_filter=action_filter,
                            date_from=date_from,
-                           date_to=date_to)
+                           date_to=date_to,
+                           **_activity_page(query, filtered))
 
 
 @admin_bp.route('/activity/<int:user_id>')
@@ -355,38 +522,18 @@ def user_activity(user_id):
 
     date_from = request.args.get('date_from', '').strip()
     date_to = request.args.get('date_to', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = 50
 
     query = ActivityLog.query.filter_by(user_id=user_id)
-    
-    if date_from:
-        try:
-            from datetime import datetime as dt
-            df = dt.strptime(date_from, '%Y-%m-%d')
-            query = query.filter(ActivityLog.timestamp >= df)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            from datetime import datetime as dt, timedelta
-            dt_to = dt.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-            query = query.filter(ActivityLog.timestamp < dt_to)
-        except ValueError:
-            pass
-
-    logs = (query
-            .order_by(ActivityLog.timestamp.desc())
-            .paginate(page=page, per_page=per_page, error_out=False))
+    query = _apply_activity_date_filters(query, date_from, date_to)
 
     return render_template('admin_activity.html',
-                           logs=logs,
                            users=[user],
                            user_filter=str(user_id),
                            action_filter='',
                            date_from=date_from,
                            date_to=date_to,
-                           single_user=user)
+                           single_user=user,
+                           **_activity_page(query, filtered=True))
 
 
 # ─────────────────────────────────────────────────────────────
@@ -403,6 +550,7 @@ def user_kick(user_id):
         return redirect(url_for('admin.users_list'))
     user.force_logout = True
     db.session.commit()
+    invalidate_user_state(user.id)
     log_activity('user_kick', f'Sesion terminada para {user.username}')
     flash(f'Sesion de {user.username} terminada.', 'success')
     return redirect(url_for('admin.users_list'))
@@ -463,6 +611,7 @@ def role_create():
     role = Role(code=code, display_name=display_name, description=description)
     db.session.add(role)
     db.session.commit()
+    invalidate_dashboard_stats()
     log_activity('role_create', f'Rol creado: {code}')
     flash(f'Rol "{display_name}" creado.', 'success')
     return redirect(url_for('admin.roles_list'))
@@ -491,6 +640,7 @@ def role_delete(role_id):
         return redirect(url_for('admin.roles_list'))
     db.session.delete(role)
     db.session.commit()
+    invalidate_dashboard_stats()
     log_activity('role_delete', f'Rol eliminado: {role.code}')
     flash('Rol eliminado.', 'success')
     return redirect(url_for('admin.roles_list'))
@@ -521,6 +671,7 @@ def area_create():
     area = Area(name=name, description=description)
     db.session.add(area)
     db.session.commit()
+    invalidate_dashboard_stats()
     log_activity('area_create', f'Area creada: {name}')
     flash(f'Area "{name}" creada.', 'success')
     return redirect(url_for('admin.areas_list'))
@@ -548,6 +699,7 @@ def area_delete(area_id):
         return redirect(url_for('admin.areas_list'))
     db.session.delete(area)
     db.session.commit()
+    invalidate_dashboard_stats()
     log_activity('area_delete', f'Area eliminada: {area.name}')
     flash('Area eliminada.', 'success')
     return redirect(url_for('admin.areas_list'))
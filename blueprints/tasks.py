@@ -4,10 +4,13 @@ import io
 import re
 import unicodedata
 from datetime import datetime, timedelta, date
-from flask import Blueprint, render_template, request, jsonify, Response, abort
+from flask import Blueprint, render_template, request, jsonify, Response, abort, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import and_, func, insert, or_
+from sqlalchemy.orm import joinedload, selectinload
 from extensions import db
 from models import User, Task, Area
+from services.search_index import substring_filter
 
 tasks_bp = Blueprint('tasks', __name__)
 
@@ -111,6 +114,11 @@ def _assignee_in_current_unit(assignee):
     return assignee.role == current_user.role
 
 
+def _with_task_people(query):
+    """Eager-load creator and assignee in the same SELECT so to_dict() issues no extra queries."""
+    return query.options(joinedload(Task.creator), joinedload(Task.assignee))
+
+
 def _task_area_key_for_user(user):
     """Return canonical task.area value for a given user."""
     if user.area and user.area.name:
@@ -280,32 +288,49 @@ def _parse_csv_flexible_date(raw_value):
     return None, None
 
 
-def _resolve_assignee_user(raw_value, users):
+def _build_assignee_index(users):
+    """
+    Normalize every user's email and username once per import, so each CSV
+    row costs one normalization plus dict lookups instead of a scan of all users.
+    """
+    index = {'by_email': {}, 'by_username': {}, 'entries': [], 'partial': {}}
+    for user in users:
+        email = _normalize_lookup(user.email)
+        username = _normalize_lookup(user.username)
+        # First user wins, as in the original top-to-bottom scan
+        index['by_email'].setdefault(email, user)
+        index['by_username'].setdefault(username, user)
+        index['entries'].append((user, username, email))
+    return index
+
+
+def _partial_assignee_matches(index, lookup):
+    # A token prefix is also a substring, so one containment test covers both rules.
+    # Assignee values repeat a lot in a CSV; each distinct one is scanned once.
+    matches = index['partial'].get(lookup)
+    if matches is None:
+        matches = [
+            user for user, username, email in index['entries']
+            if lookup in username or lookup in email
+        ]
+        index['partial'][lookup] = matches
+    return matches
+
+
+def _resolve_assignee_user(raw_value, assignee_index):
     lookup = _normalize_lookup(raw_value)
     if not lookup:
         return None, {'status': 'empty', 'candidates': []}
 
-    for user in users:
-        if _normalize_lookup(user.email) == lookup:
-            return user, {'status': 'exact_email', 'candidates': []}
+    user = assignee_index['by_email'].get(lookup)
+    if user is not None:
+        return user, {'status': 'exact_email', 'candidates': []}
 
-    for user in users:
-        if _normalize_lookup(user.username) == lookup:
-            return user, {'status': 'exact_username', 'candidates': []}
+    user = assignee_index['by_username'].get(lookup)
+    if user is not None:
+        return user, {'status': 'exact_username', 'candidates': []}
 
-    partial_matches = []
-    for user in users:
-        user_name = _normalize_lookup(user.username)
-        user_email = _normalize_lookup(user.email)
-        tokens = user_name.split()
-        if (
-            lookup in user_name
-            or lookup in user_email
-            or any(token.startswith(lookup) for token in tokens)
-        ):
-            partial_matches.append(user)
-
-    unique_matches = {u.id: u for u in partial_matches}
+    unique_matches = {u.id: u for u in _partial_assignee_matches(assignee_index, lookup)}
     if len(unique_matches) == 1:
         user = next(iter(unique_matches.values()))
         return user, {'status': 'partial_unique', 'candidates': [user.username]}
@@ -394,7 +419,7 @@ def _extract_task_csv_rows(decoded_text):
     return rows, None
 
 
-def _validate_task_csv_row(row_fields, users):
+def _validate_task_csv_row(row_fields, assignee_index):
     fields = {
         key: str((row_fields or {}).get(key, '') or '')
         for key, _label in TASK_CSV_FIELD_DEFS
@@ -421,7 +446,7 @@ def _validate_task_csv_row(row_fields, users):
     if not clean_fields['requested_by']:
         add_issue('warning', 'requested_by', 'recommended', 'Se recomienda indicar quién solicitó la tarea.')
 
-    assignee, assignee_match = _resolve_assignee_user(clean_fields['assignee'], users)
+    assignee, assignee_match = _resolve_assignee_user(clean_fields['assignee'], assignee_index)
     if assignee_match['status'] == 'empty':
         add_issue('error', 'assignee', 'required', 'Debes indicar a quién asignar la tarea.')
     elif assignee_match['status'] == 'not_found':
@@ -516,6 +541,7 @@ def _validate_task_csv_row(row_fields, users):
 
 
 def _build_csv_preview_rows(rows, users):
+    assignee_index = _build_assignee_index(users)
     preview_rows = []
     ok_rows = 0
     warning_rows = 0
@@ -525,7 +551,7 @@ def _build_csv_preview_rows(rows, users):
     for row in rows:
         row_number = int(row.get('row_number') or 0)
         fields = row.get('fields') or {}
-        validation = _validate_task_csv_row(fields, users)
+        validation = _validate_task_csv_row(fields, assignee_index)
 
         preview_row = {
             'row_number': row_number,
@@ -564,36 +590,69 @@ def _build_csv_preview_rows(rows, users):
     }
 
 
-def _create_tasks_from_validated_csv(validation):
+def _users_by_id(raw_ids):
+    """Load every referenced user (and its area) with one IN query."""
+    ids = set()
+    for raw_id in raw_ids:
+        try:
+            ids.add(int(raw_id))
+        except (ValueError, TypeError):
+            continue
+    if not ids:
+        return {}
+    users = User.query.options(selectinload(User.area)).filter(User.id.in_(ids)).all()
+    return {user.id: user for user in users}
+
+
+def _new_task_row(assignee, **fields):
+    """Column values for one new task, ready for _bulk_insert_tasks()."""
+    row = {
+        'description': '', 'client': '', 'start_date': None, 'end_date': None,
+        'directorate': '', 'requested_by': '', 'budget_type': '',
+        'status': 'Pendiente', 'is_recurrent': False, 'recurrence_type': None,
+        'parent_task_id': None,
+    }
+    row.update(fields)
+    row.update({
+        'created_at': datetime.utcnow(),
+        'area': _task_area_key_for_user(assignee),
+        'creator_id': current_user.id,
+        'assignee_id': assignee.id,
+    })
+    return row
+
+
+def _bulk_insert_tasks(rows, returning=False):
+    """
+    Insert task rows with a single executemany INSERT instead of one ORM
+    flush per object. With returning=True the created Task objects come back
+    in input order (needed for ids and to_dict()).
+    """
+    if not rows:
+        return []
+    stmt = insert(Task)
+    if returning:
+        return db.session.scalars(stmt.returning(Task, sort_by_parameter_order=True), rows).all()
+    db.session.execute(stmt, rows)
+    return []
+
+
+def _task_row_from_validated_csv(validation):
     parsed = validation['parsed']
     clean = validation['clean_fields']
 
-    assignee = parsed['assignee']
-    due_date = parsed['due_date']
-    start_date = parsed['start_date']
-    end_date = parsed['end_date']
-
-    area = _task_area_key_for_user(assignee)
-    task = Task(
+    return _new_task_row(
+        parsed['assignee'],
         title=clean['title'],
         description=clean['description'],
         client=clean['client'],
-        start_date=start_date,
-        end_date=end_date,
+        start_date=parsed['start_date'],
+        end_date=parsed['end_date'],
         directorate=clean['directorate'],
         requested_by=clean['requested_by'],
         budget_type=clean['budget_type'],
-        due_date=due_date,
-        status='Pendiente',
-        is_recurrent=False,
-        recurrence_type=None,
-        area=area,
-        creator_id=current_user.id,
-        assignee_id=assignee.id,
+        due_date=parsed['due_date'],
     )
-    db.session.add(task)
-
-    return 1
 
 
 # ─────────────────────────────────────────────────────────────
@@ -634,7 +693,7 @@ def api_tasks_list():
     client = request.args.get('client', '').strip()
     area = request.args.get('area', '').strip()
 
-    query = _apply_unit_scope(Task.query)
+    query = _with_task_people(_apply_unit_scope(Task.query))
 
     if status and status in Task.VALID_STATUSES:
         query = query.filter_by(status=status)
@@ -646,7 +705,7 @@ def api_tasks_list():
             pass
 
     if client:
-        query = query.filter(Task.client.ilike(f'%{client}%'))
+        query = query.filter(substring_filter(Task, 'client', client))
     if area:
         query = query.filter_by(area=area)
 
@@ -790,32 +849,25 @@ def api_tasks_create():
         if len(dates) > 365:
             return jsonify({'success': False, 'error': 'La recurrencia genera demasiadas tareas (máx. 365).'}), 400
 
-        # Create the parent task first
-        parent = Task(
+        recurrent_fields = dict(
             title=title, description=description, client=client,
             start_date=start_date_value, end_date=end_date_value,
             directorate=directorate, requested_by=requested_by, budget_type=budget_type,
-            due_date=dates[0], status=initial_status,
-            is_recurrent=True, recurrence_type=recurrence_type,
-            area=area, creator_id=current_user.id, assignee_id=assignee.id,
+            status=initial_status, is_recurrent=True, recurrence_type=recurrence_type,
+        )
+
+        # Insert the parent first to get its id, then all children in one statement
+        parent = _bulk_insert_tasks(
+            [_new_task_row(assignee, due_date=dates[0], **recurrent_fields)], returning=True,
+        )[0]
+        children = _bulk_insert_tasks(
+            [
+                _new_task_row(assignee, due_date=d, parent_task_id=parent.id, **recurrent_fields)
+                for d in dates[1:]
+            ],
+            returning=True,
         )
-        db.session.add(parent)
-        db.session.flush()  # get parent.id
-
-        created_tasks.append(parent)
-
-        for d in dates[1:]:
-            child = Task(
-                title=title, description=description, client=client,
-                start_date=start_date_value, end_date=end_date_value,
-                directorate=directorate, requested_by=requested_by, budget_type=budget_type,
-                due_date=d, status=initial_status,
-                is_recurrent=True, recurrence_type=recurrence_type,
-                parent_task_id=parent.id,
-                area=area, creator_id=current_user.id, assignee_id=assignee.id,
-            )
-            db.session.add(child)
-            created_tasks.append(child)
+        created_tasks = [parent, *children]
     else:
         task = Task(
             title=title, description=description, client=client,
@@ -852,8 +904,9 @@ def api_tasks_bulk_create():
     if len(raw_tasks) > 500:
         return jsonify({'success': False, 'error': 'Puedes pegar hasta 500 tareas por lote.'}), 400
 
-    created_tasks = []
+    task_rows = []
     failures = []
+    users = _users_by_id(item.get('assignee_id') for item in raw_tasks if isinstance(item, dict))
 
     for idx, item in enumerate(raw_tasks):
         if not isinstance(item, dict):
@@ -889,7 +942,7 @@ def api_tasks_bulk_create():
             continue
 
         try:
-            assignee = User.query.get(int(assignee_id))
+            assignee = users.get(int(assignee_id))
         except (ValueError, TypeError):
             assignee = None
 
@@ -900,8 +953,8 @@ def api_tasks_bulk_create():
             failures.append({'index': idx, 'error': 'Solo puedes asignar tareas a usuarios de tu unidad.'})
             continue
 
-        area = _task_area_key_for_user(assignee)
-        task = Task(
+        task_rows.append(_new_task_row(
+            assignee,
             title=title,
             description=(item.get('description') or '').strip(),
             client=(item.get('client') or '').strip(),
@@ -911,15 +964,9 @@ def api_tasks_bulk_create():
             requested_by=(item.get('requested_by') or '').strip(),
             budget_type=(item.get('budget_type') or '').strip(),
             due_date=due_date_value,
-            status='Pendiente',
-            is_recurrent=False,
-            area=area,
-            creator_id=current_user.id,
-            assignee_id=assignee.id,
-        )
-        db.session.add(task)
-        created_tasks.append(task)
+        ))
 
+    created_tasks = _bulk_insert_tasks(task_rows, returning=True)
     if created_tasks:
         db.session.commit()
 
@@ -1204,7 +1251,7 @@ def _apply_admin_task_filters(query, args):
     if status and status in Task.VALID_STATUSES:
         query = query.filter_by(status=status)
     if client:
-        query = query.filter(Task.client.ilike(f'%{client}%'))
+        query = query.filter(substring_filter(Task, 'client', client))
     if assignee_id:
         try:
             query = query.filter_by(assignee_id=int(assignee_id))
@@ -1235,70 +1282,171 @@ def tasks_dashboard():
     return render_template('tasks_dashboard.html')
 
 
+ADMIN_TASKS_PAGE_SIZE = 100
+ADMIN_TASKS_MAX_PAGE_SIZE = 500
+
+
+def _task_status_stats():
+    """Dashboard status counters from a single GROUP BY query."""
+    counts = dict(
+        db.session.query(Task.status, func.count(Task.id)).group_by(Task.status).all()
+    )
+    return {
+        'total': sum(counts.values()),
+        'pendiente': counts.get('Pendiente', 0),
+        'en_progreso': counts.get('En Progreso', 0),
+        'completado': counts.get('Completado', 0),
+    }
+
+
+def _task_distribution(query, group_by, limit=5):
+    """Top groups of a filtered task query for the dashboard bar chart."""
+    if group_by == 'assignee':
+        # Outer join: tasks whose assignee no longer exists still count towards the total
+        query = query.outerjoin(User, User.id == Task.assignee_id)
+        column = func.coalesce(User.username, 'Sin Asignar')
+    elif group_by == 'area':
+        column = func.coalesce(Task.area, '')
+    else:
+        column = func.coalesce(Task.client, '')
+
+    count = func.count(Task.id)
+    rows = (
+        query.order_by(None)
+        .with_entities(column, count)
+        .group_by(column)
+        .order_by(count.desc(), column)
+        .limit(limit)
+        .all()
+    )
+    return [{'label': label, 'count': total} for label, total in rows]
+
+
+def _encode_task_cursor(task):
+    return f'{task.due_date.isoformat()}_{task.id}'
+
+
+def _decode_task_cursor(raw_cursor):
+    """Parse a '<due_date>_<id>' keyset cursor. Returns None when invalid."""
+    due_raw, _, id_raw = str(raw_cursor).partition('_')
+    try:
+        return date.fromisoformat(due_raw), int(id_raw)
+    except ValueError:
+        return None
+
+
 @tasks_bp.route('/api/admin/tasks')
 @login_required
 def api_admin_tasks():
-    """Admin endpoint: all tasks with optional filters."""
+    """
+    Admin endpoint: one page of tasks with optional filters.
+
+    Tasks are ordered by (due_date, id) descending and paged with a keyset
+    cursor: pass back `next_cursor` as `cursor` to get the following page.
+    """
     if not current_user.is_admin:
         return jsonify({'success': False, 'error': 'Acceso denegado.'}), 403
 
-    query = _apply_admin_task_filters(Task.query, request.args)
+    try:
+        limit = int(request.args.get('limit', ADMIN_TASKS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Límite inválido.'}), 400
+    limit = max(1, min(limit, ADMIN_TASKS_MAX_PAGE_SIZE))
+
+    cursor_raw = request.args.get('cursor', '').strip()
+    cursor = _decode_task_cursor(cursor_raw) if cursor_raw else None
+    if cursor_raw and cursor is None:
+        return jsonify({'success': False, 'error': 'Cursor inválido.'}), 400
 
-    tasks = query.order_by(Task.due_date.desc()).all()
+    filtered = _apply_admin_task_filters(Task.query, request.args)
 
-    # Summary stats
-    all_tasks = Task.query.all()
-    stats = {
-        'total': len(all_tasks),
-        'pendiente': sum(1 for t in all_tasks if t.status == 'Pendiente'),
-        'en_progreso': sum(1 for t in all_tasks if t.status == 'En Progreso'),
-        'completado': sum(1 for t in all_tasks if t.status == 'Completado'),
-    }
+    page_query = _with_task_people(filtered)
+    if cursor:
+        cursor_due, cursor_id = cursor
+        page_query = page_query.filter(or_(
+            Task.due_date < cursor_due,
+            and_(Task.due_date == cursor_due, Task.id < cursor_id),
+        ))
+    tasks = page_query.order_by(Task.due_date.desc(), Task.id.desc()).limit(limit + 1).all()
 
-    return jsonify({
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+
+    response = {
         'success': True,
         'tasks': [t.to_dict() for t in tasks],
-        'stats': stats,
-    })
+        'next_cursor': _encode_task_cursor(tasks[-1]) if has_more else None,
+    }
 
+    # Counters and chart data don't depend on the page, so only the first page computes them
+    if not cursor:
+        response['stats'] = _task_status_stats()
+        response['total_filtered'] = filtered.order_by(None).count()
+        response['distribution'] = _task_distribution(filtered, request.args.get('group_by', 'client'))
 
-@tasks_bp.route('/api/admin/tasks/export-csv')
-@login_required
-def api_admin_tasks_export_csv():
-    """Export filtered admin tasks to CSV using the required schema."""
-    if not current_user.is_admin:
-        return jsonify({'success': False, 'error': 'Acceso denegado.'}), 403
+    return jsonify(response)
 
-    tasks = _apply_admin_task_filters(Task.query, request.args).order_by(Task.due_date.desc()).all()
 
+TASK_CSV_EXPORT_BATCH = 1000
+
+
+def _iter_task_csv(rows):
+    """Yield the export as CSV text, one piece per TASK_CSV_EXPORT_BATCH rows."""
     buffer = io.StringIO()
     writer = csv.writer(buffer)
     writer.writerow(TASK_CSV_COLUMNS)
 
-    for task in tasks:
+    for count, (start_date, end_date, due_date, directorate, client, title, requested_by,
+                assignee_name, description, budget_type, is_recurrent, recurrence_type) in enumerate(rows, 1):
         writer.writerow([
-            _format_mmddyyyy(task.start_date),
-            _format_mmddyyyy(task.end_date),
-            _format_mmddyyyy(task.due_date),
-            task.directorate or '',
-            task.client or '',
-            task.title or '',
-            task.requested_by or '',
-            task.assignee.username if task.assignee else '',
-            task.description or '',
-            task.budget_type or '',
-            task.recurrence_type if task.is_recurrent and task.recurrence_type else 'No',
+            _format_mmddyyyy(start_date),
+            _format_mmddyyyy(end_date),
+            _format_mmddyyyy(due_date),
+            directorate or '',
+            client or '',
+            title or '',
+            requested_by or '',
+            assignee_name or '',
+            description or '',
+            budget_type or '',
+            recurrence_type if is_recurrent and recurrence_type else 'No',
         ])
+        if count % TASK_CSV_EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
 
-    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    csv_content = buffer.getvalue()
-    buffer.close()
+    yield buffer.getvalue()
+
+
+@tasks_bp.route('/api/admin/tasks/export-csv')
+@login_required
+def api_admin_tasks_export_csv():
+    """Export filtered admin tasks to CSV using the required schema."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Acceso denegado.'}), 403
 
+    # Only the exported columns, with the assignee name joined in SQL
+    query = (
+        _apply_admin_task_filters(Task.query, request.args)
+        .outerjoin(User, User.id == Task.assignee_id)
+        .with_entities(
+            Task.start_date, Task.end_date, Task.due_date, Task.directorate, Task.client,
+            Task.title, Task.requested_by, User.username, Task.description, Task.budget_type,
+            Task.is_recurrent, Task.recurrence_type,
+        )
+        .order_by(Task.due_date.desc(), Task.id.desc())
+        .execution_options(yield_per=TASK_CSV_EXPORT_BATCH)
+    )
+
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
     return Response(
-        csv_content,
+        stream_with_context(_iter_task_csv(query)),
         mimetype='text/csv; charset=utf-8',
         headers={
-            'Content-Disposition': f'attachment; filename=tareas_admin_{timestamp}.csv'
+            'Content-Disposition': f'attachment; filename=tareas_admin_{timestamp}.csv',
+            # Let a reverse proxy pass chunks through instead of buffering the whole export
+            'X-Accel-Buffering': 'no',
         },
     )
 
@@ -1371,17 +1519,19 @@ def api_admin_tasks_import_csv_commit():
             'fields': fields,
         })
 
-    users = User.query.filter_by(is_active=True).all()
+    users = User.query.options(selectinload(User.area)).filter_by(is_active=True).all()
+    assignee_index = _build_assignee_index(users)
     total_rows = len(normalized_rows)
     imported_rows = 0
     failed_rows = 0
     created_tasks = 0
     errors = []
     remaining_rows = []
+    valid_rows = []
 
     for row in normalized_rows:
         row_number = row['row_number']
-        validation = _validate_task_csv_row(row['fields'], users)
+        validation = _validate_task_csv_row(row['fields'], assignee_index)
         row_errors = [issue for issue in validation['issues'] if issue['severity'] == 'error']
 
         if row_errors:
@@ -1403,35 +1553,48 @@ def api_admin_tasks_import_csv_commit():
                 })
             continue
 
-        try:
-            created_in_row = _create_tasks_from_validated_csv(validation)
-            db.session.commit()
-            imported_rows += 1
-            created_tasks += created_in_row
-        except Exception:
-            db.session.rollback()
-            failed_rows += 1
-            db_issue = {
-                'severity': 'error',
-                'column': 'General',
-                'code': 'db_error',
-                'message': 'No se pudo guardar la fila por un error de base de datos.',
-                'value': '',
-            }
-            remaining_rows.append({
-                'row_number': row_number,
-                'fields': validation['fields'],
-                'status': 'error',
-                'issues': validation['issues'] + [db_issue],
-                'parsed': validation['preview'],
-            })
-            errors.append({
-                'row': row_number,
-                'column': 'General',
-                'value': '',
-                'code': 'db_error',
-                'message': 'No se pudo guardar la fila por un error de base de datos.',
-            })
+        valid_rows.append((row_number, validation, _task_row_from_validated_csv(validation)))
+
+    try:
+        _bulk_insert_tasks([task_row for _, _, task_row in valid_rows])
+        db.session.commit()
+        imported_rows += len(valid_rows)
+        created_tasks += len(valid_rows)
+    except Exception:
+        db.session.rollback()
+        # Retry row by row so one bad row does not discard the whole batch
+        for row_number, validation, task_row in valid_rows:
+            try:
+                _bulk_insert_tasks([task_row])
+                db.session.commit()
+                imported_rows += 1
+                created_tasks += 1
+            except Exception:
+                db.session.rollback()
+                failed_rows += 1
+                db_issue = {
+                    'severity': 'error',
+                    'column': 'General',
+                    'code': 'db_error',
+                    'message': 'No se pudo guardar la fila por un error de base de datos.',
+                    'value': '',
+                }
+                remaining_rows.append({
+                    'row_number': row_number,
+                    'fields': validation['fields'],
+                    'status': 'error',
+                    'issues': validation['issues'] + [db_issue],
+                    'parsed': validation['preview'],
+                })
+                errors.append({
+                    'row': row_number,
+                    'column': 'General',
+                    'value': '',
+                    'code': 'db_error',
+                    'message': 'No se pudo guardar la fila por un error de base de datos.',
+                })
+        remaining_rows.sort(key=lambda r: r['row_number'])
+        errors.sort(key=lambda e: e['row'])
 
     from blueprints.admin import log_activity
     log_activity(
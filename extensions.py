@@ -17,8 +17,8 @@ login_manager.login_message_category = "warning"
 csrf = CSRFProtect()
 
 # Rate Limiting (global, initialized in app.py via limiter.init_app)
+# Storage comes from RATELIMIT_STORAGE_URI, set in app.py (memory:// or the shared SQLite store)
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["200 per day", "60 per hour"],
-    storage_uri="memory://",
 )
\ No newline at end of file
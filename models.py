@@ -1,7 +1,10 @@
 # models.py
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 from extensions import db
 from extensions import login_manager
+from services.ttl_cache import TTLCache
 from datetime import datetime
 import json
 
@@ -119,6 +122,11 @@ class ActivityLog(db.Model):
 
     user = db.relationship('User', backref='activity_logs')
 
+    __table_args__ = (
+        # Per-user activity view: filter by user, newest first
+        db.Index('ix_activity_logs_user_timestamp', 'user_id', 'timestamp'),
+    )
+
     def __repr__(self):
         return f"<ActivityLog {self.action} by user_id={self.user_id}>"
 
@@ -146,7 +154,10 @@ class ClassificationPreset(db.Model):
 
 
 class TempArtifact(db.Model):
-    """Ownership metadata for temporary downloadable artifacts."""
+    """
+    Ownership metadata for temporary files in scratch/, and the index the
+    scratch cleaner evicts from (see services/scratch_storage.py).
+    """
     __tablename__ = 'temp_artifacts'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -155,6 +166,8 @@ class TempArtifact(db.Model):
     storage_name = db.Column(db.String(255), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    last_access_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     user = db.relationship('User', backref='temp_artifacts')
 
@@ -166,6 +179,17 @@ class TempArtifact(db.Model):
         return f"<TempArtifact {self.kind}:{self.file_id} user={self.user_id}>"
 
 
+class AppMeta(db.Model):
+    """Facts about the database itself, e.g. the schema fingerprint last migrated to."""
+    __tablename__ = 'app_meta'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255), nullable=False)
+
+    def __repr__(self):
+        return f"<AppMeta {self.key}={self.value}>"
+
+
 class Task(db.Model):
     """Task management model for area-based task assignment."""
     __tablename__ = 'tasks'
@@ -197,6 +221,15 @@ class Task(db.Model):
     assignee = db.relationship('User', foreign_keys=[assignee_id], backref='assigned_tasks')
     children = db.relationship('Task', backref=db.backref('parent', remote_side=[id]), lazy='dynamic')
 
+    # Matched to the list/filter queries in blueprints/tasks.py (all sort by due_date)
+    __table_args__ = (
+        db.Index('ix_tasks_assignee_due', 'assignee_id', 'due_date'),  # calendar feed, delete by day
+        db.Index('ix_tasks_due_id', 'due_date', 'id'),                 # admin list keyset order
+        db.Index('ix_tasks_status_due', 'status', 'due_date'),          # status filter + stats
+        db.Index('ix_tasks_area_due', 'area', 'due_date'),              # area filter
+        db.Index('ix_tasks_parent', 'parent_task_id'),                  # recurrence children
+    )
+
     def to_dict(self):
         """Serialize task to a dictionary for JSON responses."""
         return {
@@ -226,6 +259,39 @@ class Task(db.Model):
         return f"<Task {self.title} ({self.status})>"
 
 
+# Columns the per-request checks (active, forced logout, role, tool gates) and
+# the base template read from current_user. Anything else is loaded on access.
+USER_STATE_FIELDS = ('id', 'username', 'email', 'role', 'is_active',
+                     'force_logout', 'allowed_tools', 'area_id')
+
+# Short-lived copy of each logged-in user's state, so requests (chunk uploads,
+# polling) do not each SELECT the users row. TTL is set from
+# USER_STATE_CACHE_TTL in app.py, which also attaches the shared store when
+# one is configured; admin changes call invalidate_user_state().
+user_state_cache = TTLCache(ttl=5.0, namespace='user_state')
+
+
+def invalidate_user_state(user_id):
+    """Drop the cached state so the user's next request reads the database."""
+    user_state_cache.delete(int(user_id))
+
+
+# A recreated users table reuses ids, so nothing cached for the old rows applies
+event.listen(User.__table__, 'after_create', lambda *args, **kw: user_state_cache.clear())
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    state = user_state_cache.get(user_id)
+    if state is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_state_cache.set(user_id, {field: getattr(user, field) for field in USER_STATE_FIELDS})
+        return user
+
+    # Rebuild the row from the cache without a query; columns outside
+    # USER_STATE_FIELDS stay expired and load if something reads them
+    user = User(**state)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
@@ -1,4 +1,5 @@
 import os
+import re
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
@@ -8,6 +9,9 @@ from . import native_charts
 # Configuración de estilo
 FONT_NAME = 'Arial' 
 
+# Inline placeholder inside a longer text, e.g. "Reporte de {{REPORT_CLIENT}}"
+INLINE_TOKEN = re.compile(r'\{\{\s*([A-Za-z0-9_]+)\s*\}\}')
+
 def set_text_style(shape, text, font_name=None, font_size=Pt(14), bold=False, color=RGBColor(0,0,0), alignment=PP_ALIGN.LEFT):
     """Helper para aplicar estilos a cuadros de texto"""
     if not shape.has_text_frame: return
@@ -103,6 +107,80 @@ def add_dataframe_as_table(slide, data_or_shape, headers_or_data=None, left=None
             cell.vertical_anchor = MSO_ANCHOR.MIDDLE
 
 
+def text_placeholder(value, **style):
+    """Handler for apply_placeholders() that writes `value` with set_text_style(**style)."""
+    return lambda slide, shape: set_text_style(shape, value, **style)
+
+
+def _placeholder_key(text):
+    """Key of a shape whose whole text is a placeholder: `KEY` or `{{KEY}}`."""
+    match = INLINE_TOKEN.fullmatch(text)
+    return match.group(1) if match else text
+
+
+def _replace_inline_tokens(shape, values):
+    """Substitute {{KEY}} tokens run by run, keeping each run's formatting."""
+    replaced = set()
+
+    def substitute(match):
+        key = match.group(1)
+        if key not in values:
+            return match.group(0)
+        replaced.add(key)
+        return str(values[key])
+
+    for paragraph in shape.text_frame.paragraphs:
+        runs = paragraph.runs
+        for run in runs:
+            if '{{' in run.text:
+                run.text = INLINE_TOKEN.sub(substitute, run.text)
+        # PowerPoint may split a token across runs: merge them into the first
+        joined = ''.join(run.text for run in runs)
+        if any(m.group(1) in values for m in INLINE_TOKEN.finditer(joined)):
+            runs[0].text = INLINE_TOKEN.sub(substitute, joined)
+            for run in runs[1:]:
+                run._r.getparent().remove(run._r)
+    return replaced
+
+
+def apply_placeholders(prs, handlers, inline_values=None, raise_errors=True):
+    """
+    Fill a template's placeholders in one pass over its shapes.
+
+    Each text shape's text is read once. If the whole (stripped) text is a key
+    of `handlers` — written as `KEY` or `{{KEY}}` — the handler is called with
+    (slide, shape) and may restyle, replace or remove the shape. Otherwise any
+    `{{KEY}}` tokens inside the text are replaced with `inline_values[KEY]`.
+
+    A handler that returns False, or raises when `raise_errors` is False,
+    leaves its key unfilled. Returns the set of keys filled at least once.
+    """
+    inline_values = inline_values or {}
+    filled = set()
+    for slide in prs.slides:
+        # Handlers may remove the placeholder shape while we iterate
+        for shape in list(slide.shapes):
+            if not shape.has_text_frame:
+                continue
+            text = shape.text.strip()
+            if not text:
+                continue
+            key = _placeholder_key(text)
+            handler = handlers.get(key)
+            if handler is not None:
+                try:
+                    ok = handler(slide, shape)
+                except Exception:
+                    if raise_errors:
+                        raise
+                    ok = False
+                if ok is not False:
+                    filled.add(key)
+            elif inline_values and '{{' in text:
+                filled |= _replace_inline_tokens(shape, inline_values)
+    return filled
+
+
 def generate_pptx(json_data, template_path, output_path):
     """Función Maestra V3.1 (Corrección de argumentos)"""
     
@@ -124,43 +202,35 @@ def generate_pptx(json_data, template_path, output_path):
         "CONVERSATION_ANALISIS": analisis_text
     }
 
-    # --- 2. REEMPLAZO DE TEXTO ---
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if shape.has_text_frame:
-                for key, value in text_replacements.items():
-                    if key in shape.text:
-                        if key in ["TOP_NEWS", "CONVERSATION_ANALISIS"]:
-                             set_text_style(shape, value, font_size=Pt(11), bold=False, alignment=PP_ALIGN.LEFT)
-                        elif key.startswith("NUMB_") or key == "EST_REACH":
-                             set_text_style(shape, value, font_size=Pt(28), bold=True, alignment=PP_ALIGN.CENTER)
-                        elif key == "REPORT_DATE":
-                             set_text_style(shape, value, font_size=Pt(24), bold=True, color=RGBColor(255, 255, 255), alignment=PP_ALIGN.CENTER)
-                        else:
-                             set_text_style(shape, value, font_size=Pt(24), bold=True, alignment=PP_ALIGN.CENTER)
-
-    # --- 3. INSERCIÓN DE GRÁFICOS NATIVOS ---
-    for slide in prs.slides:
-        for shape in list(slide.shapes):
-            if shape.has_text_frame:
-                txt = shape.text.strip()
-                if txt == 'SENTIMENT_PIE':
-                    native_charts.add_native_pie_chart(slide, shape, json_data['charts']['sentiment'], width=Inches(5.75), height=Inches(5.09))
-                elif txt == 'CONVERSATION_CHART':
-                    evo = json_data['charts']['evolution']
-                    native_charts.add_native_line_chart(slide, shape, evo['labels'], evo['values'], width=Inches(9.07), height=Inches(5.15))
-
-    # --- 4. TABLAS ---
-    for slide in prs.slides:
-        for shape in list(slide.shapes):
-            if shape.has_text_frame:
-                txt = shape.text
-                if 'TOP_INFLUENCERS_PRENSA_TABLE' in txt:
-                    add_dataframe_as_table(slide, shape, json_data['tables']['top_prensa'], headers=['Influencer', 'Posts', 'Reach'])
-                elif 'TOP_INFLUENCERS_REDES_POSTS_TABLE' in txt:
-                    add_dataframe_as_table(slide, shape, json_data['tables']['top_redes'], headers=['Influencer', 'Posts', 'Reach', 'Source'])
-                elif 'TOP_INFLUENCERS_REDES_REACH_TABLE' in txt:
-                    add_dataframe_as_table(slide, shape, json_data['tables']['top_redes'], headers=['Influencer', 'Posts', 'Reach', 'Source'])
+    # --- 2. TEXTOS, GRÁFICOS NATIVOS Y TABLAS (una sola pasada) ---
+    handlers = {}
+    for key, value in text_replacements.items():
+        if key in ["TOP_NEWS", "CONVERSATION_ANALISIS"]:
+            style = dict(font_size=Pt(11), bold=False, alignment=PP_ALIGN.LEFT)
+        elif key.startswith("NUMB_") or key == "EST_REACH":
+            style = dict(font_size=Pt(28), bold=True, alignment=PP_ALIGN.CENTER)
+        elif key == "REPORT_DATE":
+            style = dict(font_size=Pt(24), bold=True, color=RGBColor(255, 255, 255), alignment=PP_ALIGN.CENTER)
+        else:
+            style = dict(font_size=Pt(24), bold=True, alignment=PP_ALIGN.CENTER)
+        handlers[key] = text_placeholder(value, **style)
+
+    evo = json_data['charts']['evolution']
+    redes_headers = ['Influencer', 'Posts', 'Reach', 'Source']
+    handlers.update({
+        'SENTIMENT_PIE': lambda slide, shape: native_charts.add_native_pie_chart(
+            slide, shape, json_data['charts']['sentiment'], width=Inches(5.75), height=Inches(5.09)),
+        'CONVERSATION_CHART': lambda slide, shape: native_charts.add_native_line_chart(
+            slide, shape, evo['labels'], evo['values'], width=Inches(9.07), height=Inches(5.15)),
+        'TOP_INFLUENCERS_PRENSA_TABLE': lambda slide, shape: add_dataframe_as_table(
+            slide, shape, json_data['tables']['top_prensa'], headers=['Influencer', 'Posts', 'Reach']),
+        'TOP_INFLUENCERS_REDES_POSTS_TABLE': lambda slide, shape: add_dataframe_as_table(
+            slide, shape, json_data['tables']['top_redes'], headers=redes_headers),
+        'TOP_INFLUENCERS_REDES_REACH_TABLE': lambda slide, shape: add_dataframe_as_table(
+            slide, shape, json_data['tables']['top_redes'], headers=redes_headers),
+    })
+
+    apply_placeholders(prs, handlers, inline_values=text_replacements)
 
     prs.save(output_path)
     return output_path
\ No newline at end of file
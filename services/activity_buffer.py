@@ -0,0 +1,161 @@
+"""
+services/activity_buffer.py
+---------------------------
+In-process buffer for audit-log rows.
+
+Requests hand their log row to a bounded queue and return immediately; a
+background thread bulk-inserts the queued rows every `batch_size` rows or
+`flush_interval` seconds, whichever comes first. On SQLite this turns one
+commit (and WAL fsync) per request into one per batch, taken off the request
+path.
+
+- When the queue is full the row is written synchronously by the caller, so
+  a slow database causes backpressure instead of lost rows.
+- flush() writes whatever is queued and waits for the batch the thread is
+  writing, so rows logged before it are in the database when it returns.
+- close() (registered with atexit by the app) stops the thread and writes
+  whatever is still queued.
+- The flusher thread is started lazily and restarted after a fork, so it
+  works under pre-forking servers such as gunicorn.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Queued by close() to wake the flusher without waiting for its timeout
+_WAKE = object()
+
+
+class ActivityLogBuffer:
+    """
+    Parameters
+    ----------
+    write_rows     : callable receiving a list of row dicts; must insert and commit them
+    batch_size     : flush as soon as this many rows are waiting
+    flush_interval : seconds a row may wait before it is flushed
+    max_pending    : queue capacity before callers fall back to synchronous writes
+    """
+
+    def __init__(self, write_rows: Callable[[list[dict]], None], batch_size: int = 200,
+                 flush_interval: float = 0.5, max_pending: int = 10_000):
+        self._write_rows = write_rows
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.001, flush_interval)
+        self.max_pending = max(1, max_pending)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_pending)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self) -> None:
+        if self._pid != os.getpid():
+            # Forked child: the parent's thread and queued rows are not ours
+            self._reset()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            self._reset_after_fork()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-log-flusher', daemon=True)
+                self._thread.start()
+
+    def submit(self, row: dict) -> bool:
+        """Queue a row. Returns False when it had to be written synchronously."""
+        if self._stop.is_set():
+            self._write([row])
+            return False
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self._write([row])
+            return False
+
+    def _take_batch(self, first_timeout: float | None) -> list[dict]:
+        """Wait up to first_timeout for one row, then gather more until full or the interval ends."""
+        try:
+            item = self._queue.get(timeout=first_timeout)
+        except queue.Empty:
+            return []
+        if item is _WAKE:
+            self._queue.task_done()
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _WAKE:
+                self._queue.task_done()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take_batch(first_timeout=self.flush_interval)
+            if batch:
+                self._write(batch)
+                # Lets flush() know this batch is in the database
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, rows: list[dict]) -> None:
+        try:
+            self._write_rows(rows)
+        except Exception:
+            logger.exception("No se pudieron guardar %d registros de actividad", len(rows))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Write every queued row now, in the calling thread, then wait for the flusher's batch."""
+        with self._lock:
+            self._reset_after_fork()
+        while True:
+            rows, taken = [], 0
+            while len(rows) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is not _WAKE:
+                    rows.append(item)
+            if rows:
+                self._write(rows)
+            for _ in range(taken):
+                self._queue.task_done()
+            if not taken:
+                break
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the flusher thread and write the remaining rows."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self._queue.put_nowait(_WAKE)
+            except queue.Full:
+                pass  # the flusher is busy anyway and will see the stop flag
+            thread.join(timeout)
+        self.flush()
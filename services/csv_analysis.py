@@ -1,8 +1,28 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import io
 import os
 import math
+import warnings
+
+from services.stream_stats import CsvProfile, FrequencyCounter, batch_moments, moments_summary
+
+
+# Rows per chunk when streaming a file through analyze_csv
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Sampling mode: files above the threshold are analyzed from a sample
+DEFAULT_SAMPLE_THRESHOLD_MB = 50
+DEFAULT_SAMPLE_ROWS = 100_000
+SAMPLE_BLOCKS = 200
+ANALYSIS_MODES = ('auto', 'exact', 'sample')
+Z_95 = 1.959963984540054
+
+# Text columns with more distinct values than this switch to sketches
+# (HyperLogLog unique count, Space-Saving top values) and are flagged approximate;
+# their top-value counts are then guaranteed lower bounds
+DEFAULT_CARDINALITY_THRESHOLD = 50_000
 
 
 def safe_float(value, decimals=2):
@@ -100,33 +120,43 @@ def missing_analysis(df):
 def numeric_stats(df):
     """
     Calculate statistics for numeric columns.
+    All columns are computed together over one 2-D float block: a single
+    moments pass and a single percentile call, no per-column copies.
     """
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     
     if len(numeric_cols) == 0:
         return {'columns': [], 'stats': []}
     
+    values = df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    moments = batch_moments(values)
+    with warnings.catch_warnings():
+        # All-NaN columns are skipped below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q25, median, q75 = np.nanpercentile(values, [25, 50, 75], axis=0)
+
     stats_list = []
     
-    for col in numeric_cols:
-        series = df[col].dropna()
-        
-        if len(series) == 0:
+    for i, col in enumerate(numeric_cols):
+        count = int(moments['count'][i])
+        if count == 0:
             continue
-        
+
+        summary = moments_summary(count, moments['mean'][i], moments['m2'][i],
+                                  moments['m3'][i], moments['m4'][i])
         # Use safe_float to handle NaN values
         stats_list.append({
             'column': col,
-            'count': int(series.count()),
-            'mean': safe_float(series.mean()),
-            'median': safe_float(series.median()),
-            'std': safe_float(series.std()) if len(series) > 1 else 0,
-            'min': safe_float(series.min()),
-            'max': safe_float(series.max()),
-            'q25': safe_float(series.quantile(0.25)),
-            'q75': safe_float(series.quantile(0.75)),
-            'skewness': safe_float(series.skew()) if len(series) > 1 else 0,
-            'kurtosis': safe_float(series.kurtosis()) if len(series) > 1 else 0
+            'count': count,
+            'mean': safe_float(summary['mean']),
+            'median': safe_float(median[i]),
+            'std': safe_float(summary['std']) if count > 1 else 0,
+            'min': safe_float(moments['min'][i]),
+            'max': safe_float(moments['max'][i]),
+            'q25': safe_float(q25[i]),
+            'q75': safe_float(q75[i]),
+            'skewness': safe_float(summary['skewness']) if count > 1 else 0,
+            'kurtosis': safe_float(summary['kurtosis']) if count > 1 else 0
         })
     
     return {
@@ -135,9 +165,54 @@ def numeric_stats(df):
     }
 
 
-def categorical_stats(df):
+def column_frequencies(series, cardinality_threshold=DEFAULT_CARDINALITY_THRESHOLD,
+                       slice_rows=DEFAULT_CHUNK_SIZE):
+    """
+    Build a FrequencyCounter for one column, feeding it in row slices so the
+    hash table never grows past one slice plus the bounded summary.
+    """
+    counter = FrequencyCounter(cardinality_threshold)
+    for start in range(0, len(series), slice_rows):
+        counter.update(series.iloc[start:start + slice_rows])
+    return counter
+
+
+def _categorical_stat(col, counter):
+    # Approximate counts are guaranteed minimums; with no clear heavy hitter
+    # (e.g. uniformly distributed values) the top list can be empty
+    top_5 = counter.top(5)
+    return {
+        'column': col,
+        'unique_count': counter.unique_count,
+        'most_common': str(top_5[0][0]) if top_5 else None,
+        'most_common_count': int(top_5[0][1]) if top_5 else None,
+        'top_5_values': {str(k): int(v) for k, v in top_5},
+        'approximate': counter.approximate
+    }
+
+
+def _frequency_label(stat):
+    """Summary cell for the most common value's count; approximate counts are minimums."""
+    count = stat['most_common_count']
+    if count is None:
+        return ''
+    return f"≥{count}" if stat.get('approximate') else count
+
+
+def _categorical_bars(col, counter):
+    top_10 = counter.top(10)
+    return {
+        'column': col,
+        'labels': [str(k) for k, _ in top_10],
+        'counts': [int(v) for _, v in top_10],
+        'approximate': counter.approximate
+    }
+
+
+def categorical_stats(df, cardinality_threshold=DEFAULT_CARDINALITY_THRESHOLD):
     """
     Calculate statistics for categorical (object/string) columns.
+    One counting pass per column; high-cardinality columns are sketched.
     """
     categorical_cols = df.select_dtypes(include=['object', 'category']).columns
     
@@ -147,21 +222,10 @@ def categorical_stats(df):
     stats_list = []
     
     for col in categorical_cols:
-        series = df[col].dropna()
-        
-        if len(series) == 0:
+        counter = column_frequencies(df[col], cardinality_threshold)
+        if counter.count == 0:
             continue
-        
-        value_counts = series.value_counts()
-        top_5 = value_counts.head(5).to_dict()
-        
-        stats_list.append({
-            'column': col,
-            'unique_count': int(series.nunique()),
-            'most_common': str(value_counts.index[0]) if len(value_counts) > 0 else None,
-            'most_common_count': int(value_counts.iloc[0]) if len(value_counts) > 0 else 0,
-            'top_5_values': {str(k): int(v) for k, v in top_5.items()}
-        })
+        stats_list.append(_categorical_stat(col, counter))
     
     return {
         'columns': categorical_cols.tolist(),
@@ -227,7 +291,7 @@ def distribution_data(df, max_columns=10):
     return distributions
 
 
-def categorical_distribution(df, max_columns=10):
+def categorical_distribution(df, max_columns=10, cardinality_threshold=DEFAULT_CARDINALITY_THRESHOLD):
     """
     Generate value count data for categorical columns (for Chart.js bar charts).
     """
@@ -236,19 +300,11 @@ def categorical_distribution(df, max_columns=10):
     distributions = []
     
     for col in categorical_cols:
-        series = df[col].dropna()
-        
-        if len(series) == 0:
+        counter = column_frequencies(df[col], cardinality_threshold)
+        if counter.count == 0:
             continue
-        
-        # Get top 10 most frequent values
-        value_counts = series.value_counts().head(10)
-        
-        distributions.append({
-            'column': col,
-            'labels': [str(x) for x in value_counts.index.tolist()],
-            'counts': [int(x) for x in value_counts.values.tolist()]
-        })
+        # Top 10 most frequent values
+        distributions.append(_categorical_bars(col, counter))
     
     return distributions
 
@@ -313,47 +369,436 @@ def generate_insights(df, general_data, missing_data, numeric_data, correlation_
 
     # 5. Top categorical value
     if categorical_data.get('stats'):
-        best = max(categorical_data['stats'], key=lambda s: s.get('most_common_count', 0))
+        best = max(categorical_data['stats'], key=lambda s: s.get('most_common_count') or 0)
         if best.get('most_common') and rows > 0:
             pct = round(best['most_common_count'] / rows * 100, 1)
-            insights.append(f"El valor mas frecuente en '{best['column']}' es '{best['most_common']}' con {best['most_common_count']:,} apariciones ({pct}% del total).")
+            at_least = 'al menos ' if best.get('approximate') else ''
+            insights.append(f"El valor mas frecuente en '{best['column']}' es '{best['most_common']}' con {at_least}{best['most_common_count']:,} apariciones ({pct}% del total).")
             if pct > 50:
                 insights.append(f"La columna '{best['column']}' esta dominada por un solo valor — puede tener baja utilidad analitica.")
 
     return insights
 
 
-def analyze_csv(file_path, encoding='utf-8', separator=','):
+def _csv_source(source):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def profile_csv(source, encoding='utf-8', separator=',', chunksize=DEFAULT_CHUNK_SIZE,
+                cardinality_threshold=DEFAULT_CARDINALITY_THRESHOLD):
+    """
+    Stream a file path (or raw CSV bytes) through a CsvProfile in chunks of
+    *chunksize* rows. Memory stays bounded by the chunk size, not the file size.
+    Raises whatever pandas raises on unreadable input.
+    """
+    profile = CsvProfile(cardinality_threshold=cardinality_threshold)
+    reader = pd.read_csv(_csv_source(source), encoding=encoding, sep=separator, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            profile.update(chunk)
+
+    # Text columns that started out numeric: recount them as raw strings
+    recount = profile.columns_needing_recount()
+    if recount:
+        positions = [profile.columns.index(col) for col in recount]
+        profile.reset_frequencies(recount)
+        reader = pd.read_csv(_csv_source(source), encoding=encoding, sep=separator,
+                             usecols=positions, dtype=str, chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                for col in recount:
+                    profile.recount(col, chunk[col])
+
+    return profile
+
+
+def _general_from_profile(profile):
+    return {
+        'row_count': profile.row_count,
+        'column_count': len(profile.columns),
+        'columns': list(profile.columns),
+        'memory_usage_mb': round(profile.memory_bytes / (1024 * 1024), 2),
+        'dtypes': {col: str(dtype) for col, dtype in profile.dtypes.items()},
+        'numeric_columns': profile.columns_of_kind('numeric'),
+        'categorical_columns': profile.columns_of_kind('categorical'),
+        'datetime_columns': profile.columns_of_kind('datetime')
+    }
+
+
+def _missing_from_profile(profile):
+    rows = profile.row_count
+    total_cells = rows * len(profile.columns)
+
+    missing_details = []
+    for col in profile.columns:
+        count = profile.null_counts[col]
+        pct = safe_float(round(count / rows * 100, 2)) if rows else None
+        missing_details.append({
+            'column': col,
+            'missing_count': count,
+            'missing_percentage': pct
+        })
+    missing_details.sort(key=lambda x: x['missing_count'], reverse=True)
+
+    total_missing = sum(profile.null_counts.values())
+    total_missing_pct = round((total_missing / total_cells * 100), 2) if total_cells > 0 else 0
+
+    return {
+        'total_missing_cells': total_missing,
+        'total_missing_percentage': total_missing_pct,
+        'columns_with_missing': missing_details,
+        'columns_fully_complete': [col for col in profile.columns if profile.null_counts[col] == 0]
+    }
+
+
+def _numeric_from_profile(profile):
+    numeric_cols = profile.columns_of_kind('numeric')
+    stats_list = []
+
+    for col in numeric_cols:
+        moments = profile.moments.get(col)
+        if moments is None or moments['count'] == 0:
+            continue
+
+        count = int(moments['count'])
+        summary = moments_summary(count, moments['mean'], moments['m2'], moments['m3'], moments['m4'])
+        digest = profile.digests[col]
+        stats_list.append({
+            'column': col,
+            'count': count,
+            'mean': safe_float(summary['mean']),
+            'median': safe_float(digest.quantile(0.5)),
+            'std': safe_float(summary['std']) if count > 1 else 0,
+            'min': safe_float(moments['min']),
+            'max': safe_float(moments['max']),
+            'q25': safe_float(digest.quantile(0.25)),
+            'q75': safe_float(digest.quantile(0.75)),
+            'skewness': safe_float(summary['skewness']) if count > 1 else 0,
+            'kurtosis': safe_float(summary['kurtosis']) if count > 1 else 0
+        })
+
+    return {
+        'columns': numeric_cols,
+        'stats': stats_list
+    }
+
+
+def _categorical_from_profile(profile):
+    categorical_cols = profile.columns_of_kind('categorical')
+    stats_list = []
+
+    for col in categorical_cols:
+        counter = profile.frequencies.get(col)
+        if counter is None or counter.count == 0:
+            continue
+        stats_list.append(_categorical_stat(col, counter))
+
+    return {
+        'columns': categorical_cols,
+        'stats': stats_list
+    }
+
+
+def _correlation_from_profile(profile):
+    numeric_cols = profile.columns_of_kind('numeric')
+
+    if len(numeric_cols) < 2:
+        return {
+            'columns': numeric_cols,
+            'matrix': [],
+            'note': 'Need at least 2 numeric columns for correlation'
+        }
+
+    tracked = profile.correlation.columns
+    idx = [tracked.index(col) for col in numeric_cols]
+    corr = profile.correlation.correlation()[np.ix_(idx, idx)]
+
+    matrix_data = []
+    for i, col in enumerate(numeric_cols):
+        matrix_data.append({
+            'column': str(col),
+            'correlations': {str(other): safe_float(corr[i, j], 3) for j, other in enumerate(numeric_cols)}
+        })
+
+    return {
+        'columns': numeric_cols,
+        'matrix': matrix_data
+    }
+
+
+def _distributions_from_profile(profile, max_columns=10):
+    distributions = []
+
+    for col in profile.columns_of_kind('numeric')[:max_columns]:
+        digest = profile.digests.get(col)
+        if digest is None or digest.count == 0:
+            continue
+
+        counts, bin_edges = digest.histogram(bins=20)
+        bin_labels = [(bin_edges[i] + bin_edges[i+1]) / 2 for i in range(len(bin_edges)-1)]
+        distributions.append({
+            'column': col,
+            'bins': [safe_float(x) for x in bin_labels],
+            'counts': [int(x) for x in counts]
+        })
+
+    return distributions
+
+
+def _categorical_distribution_from_profile(profile, max_columns=10):
+    distributions = []
+
+    for col in profile.columns_of_kind('categorical')[:max_columns]:
+        counter = profile.frequencies.get(col)
+        if counter is None or counter.count == 0:
+            continue
+        distributions.append(_categorical_bars(col, counter))
+
+    return distributions
+
+
+# ─────────────────────────────────────────────────────────────
+# Sampling mode
+# ─────────────────────────────────────────────────────────────
+
+def _is_ascii_compatible(encoding):
+    """Byte-offset seeking only works when newlines/separators are single ASCII bytes."""
+    try:
+        return '\n\r,;|\t'.encode(encoding) == b'\n\r,;|\t'
+    except (LookupError, UnicodeError):
+        return False
+
+
+def sample_blocks(file_path, encoding='utf-8', separator=',', sample_rows=DEFAULT_SAMPLE_ROWS,
+                  blocks=SAMPLE_BLOCKS):
+    """
+    Systematic block sample: seek to *blocks* evenly spaced byte offsets and
+    read a run of whole lines at each one. Only the sampled bytes are read.
+    Blocks that do not parse on their own (e.g. the seek landed inside a
+    quoted multi-line field) are dropped.
+    Returns (csv_bytes_with_header, info).
+    """
+    file_size = os.path.getsize(file_path)
+    rows_per_block = max(1, math.ceil(sample_rows / blocks))
+    kept = []
+    rows_kept = bytes_kept = 0
+
+    with open(file_path, 'rb') as fh:
+        header = fh.readline()
+        data_start = fh.tell()
+        span = file_size - data_start
+        step = span / blocks
+        position = data_start
+
+        for i in range(blocks):
+            offset = max(data_start + int(i * step), position)
+            if offset >= file_size:
+                break
+            fh.seek(offset)
+            if offset > position:
+                fh.readline()  # skip the partial line we landed in
+            lines = []
+            for _ in range(rows_per_block):
+                line = fh.readline()
+                if not line:
+                    break
+                lines.append(line)
+            position = fh.tell()
+            if not lines:
+                continue
+
+            block = b''.join(lines)
+            if not block.endswith(b'\n'):
+                block += b'\n'
+            try:
+                parsed = pd.read_csv(io.BytesIO(header + block), encoding=encoding, sep=separator,
+                                     dtype=str, on_bad_lines='error')
+            except (pd.errors.ParserError, UnicodeDecodeError, ValueError):
+                continue
+            kept.append(block)
+            rows_kept += len(parsed)
+            bytes_kept += len(block)
+
+    estimated_rows = int(round(span / (bytes_kept / rows_kept))) if rows_kept else 0
+    return header + b''.join(kept), {
+        'method': 'blocks',
+        'rows_sampled': rows_kept,
+        'estimated_total_rows': max(estimated_rows, rows_kept),
+        'total_rows_exact': False,
+    }
+
+
+def sample_reservoir(file_path, encoding='utf-8', separator=',', sample_rows=DEFAULT_SAMPLE_ROWS,
+                     chunksize=DEFAULT_CHUNK_SIZE, seed=None):
+    """
+    Uniform reservoir sample (Algorithm R, vectorized per chunk). Reads the
+    whole file once but keeps at most *sample_rows* rows; works for any
+    encoding and for quoted multi-line fields.
+    Returns (csv_bytes_with_header, info).
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    seen = 0
+
+    reader = pd.read_csv(file_path, encoding=encoding, sep=separator, dtype=str,
+                         keep_default_na=False, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            chunk = chunk.reset_index(drop=True)
+            if reservoir is None:
+                reservoir = chunk.iloc[:0]
+            fill = max(0, min(sample_rows - len(reservoir), len(chunk)))
+            if fill:
+                reservoir = pd.concat([reservoir, chunk.iloc[:fill]], ignore_index=True)
+
+            rest = chunk.iloc[fill:]
+            if len(rest):
+                # Row t (0-based, global) replaces slot j ~ U[0, t] when j < k
+                t = np.arange(seen + fill, seen + len(chunk))
+                slots = (rng.random(len(t)) * (t + 1)).astype(np.int64)
+                chosen = np.flatnonzero(slots < sample_rows)
+                if chosen.size:
+                    # Later rows overwrite earlier ones, as in the sequential algorithm
+                    slot_rows = pd.Series(chosen, index=slots[chosen])
+                    slot_rows = slot_rows[~slot_rows.index.duplicated(keep='last')]
+                    reservoir.iloc[slot_rows.index.to_numpy()] = rest.iloc[slot_rows.to_numpy()].to_numpy()
+            seen += len(chunk)
+
+    if reservoir is None:
+        reservoir = pd.read_csv(file_path, encoding=encoding, sep=separator, nrows=0)
+
+    buffer = io.StringIO()
+    reservoir.to_csv(buffer, index=False, sep=separator)
+    return buffer.getvalue().encode(encoding), {
+        'method': 'reservoir',
+        'rows_sampled': len(reservoir),
+        'estimated_total_rows': seen,
+        'total_rows_exact': True,
+    }
+
+
+def _proportion_interval(successes, n, population=None):
+    """Percentage, its standard error and a 95% interval (normal approximation + FPC)."""
+    if n == 0:
+        return None, None, None
+    p = successes / n
+    se = math.sqrt(p * (1 - p) / n)
+    if population and population > n:
+        se *= math.sqrt((population - n) / (population - 1))
+    elif population:
+        se = 0.0
+    low, high = max(0.0, p - Z_95 * se), min(1.0, p + Z_95 * se)
+    return safe_float(p * 100), safe_float(se * 100, 3), [safe_float(low * 100), safe_float(high * 100)]
+
+
+def _add_sampling_errors(result, profile, population):
+    """Attach standard errors / 95% intervals to means, missing percentages and top values."""
+    rows = profile.row_count
+    fpc = math.sqrt((population - rows) / (population - 1)) if population > rows else 0.0
+
+    for stat in result['numeric']['stats']:
+        n = stat['count']
+        std = stat['std']
+        if n > 1 and std is not None and stat['mean'] is not None:
+            se = std / math.sqrt(n) * fpc
+            stat['mean_se'] = safe_float(se, 4)
+            stat['mean_ci95'] = [safe_float(stat['mean'] - Z_95 * se), safe_float(stat['mean'] + Z_95 * se)]
+
+    for col in result['missing']['columns_with_missing']:
+        _, se, ci = _proportion_interval(col['missing_count'], rows, population)
+        col['missing_percentage_se'] = se
+        col['missing_percentage_ci95'] = ci
+
+    for stat in result['categorical']['stats']:
+        counter = profile.frequencies[stat['column']]
+        n = counter.count
+        pct, se, _ = _proportion_interval(stat['most_common_count'] or 0, n, population)
+        stat['most_common_percentage'] = pct
+        stat['most_common_percentage_se'] = se
+        stat['top_5_ci95'] = {
+            value: _proportion_interval(count, n, population)[2]
+            for value, count in stat['top_5_values'].items()
+        }
+
+
+def _resolve_mode(mode, file_size, sample_threshold_mb):
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Modo de analisis invalido: {mode}")
+    if mode == 'auto':
+        return 'sample' if file_size > sample_threshold_mb * 1024 * 1024 else 'exact'
+    return mode
+
+
+def analyze_csv(file_path, encoding='utf-8', separator=',', chunksize=DEFAULT_CHUNK_SIZE,
+                mode='auto', sample_threshold_mb=DEFAULT_SAMPLE_THRESHOLD_MB,
+                sample_rows=DEFAULT_SAMPLE_ROWS, seed=None,
+                cardinality_threshold=DEFAULT_CARDINALITY_THRESHOLD):
     """
     Main orchestrator function that runs all analyses.
+    The file is read once, in chunks, and every section is derived from the
+    streaming profile (see services/stream_stats.py), so memory use does not
+    grow with the file size.
+
+    mode='exact' analyzes every row; mode='sample' analyzes a sample of about
+    *sample_rows* rows (byte-offset blocks for ASCII-compatible encodings,
+    otherwise a uniform reservoir) and adds standard errors to the result;
+    mode='auto' samples only files larger than *sample_threshold_mb*.
+    Text columns above *cardinality_threshold* distinct values get sketched
+    unique counts / top values, flagged with 'approximate': True.
     Returns a comprehensive JSON-serializable dictionary.
     """
-    # Load the file
-    df, load_info = load_csv(file_path, encoding, separator)
-    
-    if not load_info['success']:
+    try:
+        file_size = os.path.getsize(file_path)
+        resolved_mode = _resolve_mode(mode, file_size, sample_threshold_mb)
+        sampling = {
+            'enabled': resolved_mode == 'sample',
+            'requested_mode': mode,
+            'threshold_mb': sample_threshold_mb,
+        }
+        if resolved_mode == 'sample':
+            if _is_ascii_compatible(encoding):
+                sample, info = sample_blocks(file_path, encoding, separator, sample_rows)
+            else:
+                sample, info = sample_reservoir(file_path, encoding, separator, sample_rows, chunksize, seed)
+            sampling.update(info)
+            sampling['confidence_level'] = 0.95
+            profile = profile_csv(sample, encoding, separator, chunksize, cardinality_threshold)
+        else:
+            profile = profile_csv(file_path, encoding, separator, chunksize, cardinality_threshold)
+    except Exception as e:
         return {
             'success': False,
-            'error': load_info['error'],
+            'error': str(e),
             'encoding': encoding,
             'separator': separator
         }
-    
+
+    load_info = {
+        'success': True,
+        'file_size_bytes': file_size,
+        'file_size_mb': round(file_size / (1024 * 1024), 2),
+        'encoding_used': encoding,
+        'separator_used': separator,
+        'error': None
+    }
+
     # Run all analyses
     try:
-        gen = general_info(df)
-        miss = missing_analysis(df)
-        num = numeric_stats(df)
-        cat = categorical_stats(df)
-        corr = correlation_matrix(df)
-        dist_num = distribution_data(df)
-        dist_cat = categorical_distribution(df)
-        insights = generate_insights(df, gen, miss, num, corr, cat)
+        gen = _general_from_profile(profile)
+        miss = _missing_from_profile(profile)
+        num = _numeric_from_profile(profile)
+        cat = _categorical_from_profile(profile)
+        corr = _correlation_from_profile(profile)
+        dist_num = _distributions_from_profile(profile)
+        dist_cat = _categorical_distribution_from_profile(profile)
+        insights = generate_insights(None, gen, miss, num, corr, cat)
 
         result = {
             'success': True,
             'version': '1.1.0',
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'analysis_mode': resolved_mode,
+            'sampling': sampling,
             'file_info': load_info,
             'general': gen,
             'missing': miss,
@@ -366,7 +811,16 @@ def analyze_csv(file_path, encoding='utf-8', separator=','):
             },
             'insights': insights
         }
-        
+
+        if sampling['enabled']:
+            _add_sampling_errors(result, profile, sampling['estimated_total_rows'])
+            total = f"{sampling['estimated_total_rows']:,}"
+            total = total if sampling['total_rows_exact'] else f"~{total} (estimado)"
+            insights.insert(0, (
+                f"Analisis por muestreo: se analizaron {sampling['rows_sampled']:,} de {total} filas. "
+                f"Las cifras son aproximadas (intervalos de confianza del 95% incluidos)."
+            ))
+
         return result
         
     except Exception as e:
@@ -393,6 +847,11 @@ def generate_summary_csv(analysis_result, output_path):
     summary_rows.append(['Columnas', analysis_result['general']['column_count']])
     summary_rows.append(['Memoria (MB)', analysis_result['general']['memory_usage_mb']])
     summary_rows.append(['Tamaño archivo (MB)', analysis_result['file_info']['file_size_mb']])
+    sampling = analysis_result.get('sampling') or {}
+    if sampling.get('enabled'):
+        summary_rows.append(['Modo', f"Muestreo ({sampling['method']})"])
+        summary_rows.append(['Filas muestreadas', sampling['rows_sampled']])
+        summary_rows.append(['Filas totales (aprox.)', sampling['estimated_total_rows']])
     summary_rows.append([''])
     
     # Missing values
@@ -423,9 +882,9 @@ def generate_summary_csv(analysis_result, output_path):
         for stat in analysis_result['categorical']['stats']:
             summary_rows.append([
                 stat['column'],
-                stat['unique_count'],
-                stat['most_common'],
-                stat['most_common_count']
+                f"~{stat['unique_count']}" if stat.get('approximate') else stat['unique_count'],
+                stat['most_common'] if stat['most_common'] is not None else '',
+                _frequency_label(stat)
             ])
     
     # Write to CSV
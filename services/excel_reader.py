@@ -0,0 +1,261 @@
+"""
+services/excel_reader.py
+------------------------
+Excel input for the upload tools.
+
+- The engine is chosen from the file's magic bytes (.xlsx is a ZIP package,
+  legacy .xls is an OLE2 compound document), never by trial and error.
+- .xlsx files are streamed with openpyxl's read-only mode and yielded as
+  DataFrame chunks, so full reads never build the workbook object model.
+- Detection only needs the first rows: peek_xlsx() reads them straight from
+  the sheet XML and resolves just the shared strings they use, instead of
+  loading the whole shared-string table up front like openpyxl does.
+- Legacy .xls files still go through pandas + xlrd.
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+
+from services.uploads import buffer_head, open_buffer
+
+
+XLSX_MAGIC = b'PK\x03\x04'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def sniff_excel_type(raw_bytes: bytes) -> str | None:
+    """Return 'xlsx', 'xls' or None from the first bytes of the file."""
+    head = buffer_head(raw_bytes, 8)
+    if head.startswith(XLSX_MAGIC):
+        return 'xlsx'
+    if head.startswith(XLS_MAGIC):
+        return 'xls'
+    return None
+
+
+def _header_names(row: tuple) -> list[str]:
+    """Column names the way pandas builds them: 'Unnamed: i' for blanks, '.n' for repeats."""
+    cells = list(row)
+    while cells and cells[-1] is None:
+        cells.pop()
+
+    names = []
+    seen: dict = {}
+    for i, value in enumerate(cells):
+        name = f'Unnamed: {i}' if value is None or value == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _convert_cell(value):
+    # pandas returns whole-number floats as int (e.g. 5.0 -> 5)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+
+def _first_sheet_path(zf: zipfile.ZipFile, workbook: ET.Element) -> str:
+    rel_id = workbook.find(f'{_NS}sheets/{_NS}sheet').get(f'{_REL_NS}id')
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    target = next(rel.get('Target') for rel in rels if rel.get('Id') == rel_id)
+    return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+
+
+def _date_styles(zf: zipfile.ZipFile) -> set[int]:
+    """Indexes of cell styles whose number format is a date/time."""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+
+    try:
+        styles = ET.fromstring(zf.read('xl/styles.xml'))
+    except KeyError:
+        return set()
+    custom = {int(f.get('numFmtId')): f.get('formatCode')
+              for f in styles.iterfind(f'{_NS}numFmts/{_NS}numFmt')}
+    dates = set()
+    for i, xf in enumerate(styles.iterfind(f'{_NS}cellXfs/{_NS}xf')):
+        fmt_id = int(xf.get('numFmtId', 0))
+        code = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+        if code and is_date_format(code):
+            dates.add(i)
+    return dates
+
+
+def _shared_strings(zf: zipfile.ZipFile, needed: set[int]) -> dict[int, str]:
+    """Stream sharedStrings.xml only as far as the highest index needed."""
+    if not needed:
+        return {}
+    last = max(needed)
+    found = {}
+    with zf.open('xl/sharedStrings.xml') as fh:
+        index = 0
+        for _, elem in ET.iterparse(fh):
+            if elem.tag != f'{_NS}si':
+                continue
+            if index in needed:
+                # Plain <t> or rich-text runs <r><t>; phonetic hints (<rPh>) are skipped
+                parts = elem.findall(f'{_NS}t') + elem.findall(f'{_NS}r/{_NS}t')
+                found[index] = ''.join(t.text or '' for t in parts)
+            elem.clear()
+            if index >= last:
+                break
+            index += 1
+    return found
+
+
+def peek_xlsx(raw_bytes: bytes, nrows: int = 6) -> pd.DataFrame:
+    """
+    First *nrows* data rows of the first worksheet, read directly from the
+    package XML. Same values and column names as the streaming reader.
+    """
+    from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+    with open_buffer(raw_bytes) as buf, zipfile.ZipFile(buf) as zf:
+        workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+        pr = workbook.find(f'{_NS}workbookPr')
+        epoch = (CALENDAR_MAC_1904 if pr is not None and pr.get('date1904') in ('1', 'true')
+                 else CALENDAR_WINDOWS_1900)
+        date_styles = _date_styles(zf)
+
+        rows: dict[int, dict[int, tuple]] = {}
+        with zf.open(_first_sheet_path(zf, workbook)) as fh:
+            for _, elem in ET.iterparse(fh):
+                if elem.tag != f'{_NS}row':
+                    continue
+                row_no = int(elem.get('r', len(rows) + 1))
+                if row_no > nrows + 1:
+                    break
+                cells = {}
+                for col, cell in enumerate(elem.iterfind(f'{_NS}c'), start=1):
+                    ref = cell.get('r')
+                    if ref:
+                        col = column_index_from_string(coordinate_from_string(ref)[0])
+                    kind = cell.get('t', 'n')
+                    if kind == 'inlineStr':
+                        raw = ''.join(t.text or '' for t in cell.iter(f'{_NS}t'))
+                    else:
+                        v = cell.find(f'{_NS}v')
+                        raw = v.text if v is not None else None
+                    if raw is not None:
+                        cells[col] = (kind, raw, int(cell.get('s', 0)))
+                rows[row_no] = cells
+                elem.clear()
+
+        strings = _shared_strings(zf, {int(raw) for cells in rows.values()
+                                       for kind, raw, _ in cells.values() if kind == 's'})
+
+    def value(kind, raw, style):
+        if kind == 's':
+            return strings.get(int(raw))
+        if kind in ('str', 'inlineStr'):
+            return raw
+        if kind == 'b':
+            return raw == '1'
+        if kind == 'e':
+            return np.nan
+        number = float(raw)
+        if style in date_styles:
+            return from_excel(number, epoch)
+        return _convert_cell(number)
+
+    width = max((max(cells) for cells in rows.values() if cells), default=0)
+    grid = []
+    for row_no in range(1, (max(rows) if rows else 0) + 1):
+        cells = rows.get(row_no, {})
+        grid.append(tuple(value(*cells[c]) if c in cells else None for c in range(1, width + 1)))
+
+    return next(_chunks_from_rows(iter(grid), len(grid) + 1, nrows))
+
+
+def _chunks_from_rows(rows: Iterator[tuple], chunksize: int,
+                      nrows: int | None) -> Iterator[pd.DataFrame]:
+    """
+    Turn raw sheet rows (first = header) into DataFrame chunks the way
+    pd.read_excel would: blank rows inside the data are kept as empty rows,
+    trailing blank rows are dropped, *nrows* counts both.
+    """
+    columns = _header_names(next(rows, ()))
+    width = len(columns)
+
+    batch = []
+    blanks = 0
+    emitted = 0
+    yielded = False
+    for row in rows:
+        if nrows is not None and emitted + len(batch) + blanks >= nrows:
+            break
+        if all(v is None for v in row):
+            blanks += 1
+            continue
+        batch.extend([[None] * width] * blanks)
+        blanks = 0
+        values = [_convert_cell(v) for v in row[:width]]
+        values.extend([None] * (width - len(values)))
+        batch.append(values)
+        while len(batch) >= chunksize:
+            yield pd.DataFrame(batch[:chunksize], columns=columns)
+            emitted += chunksize
+            yielded = True
+            batch = batch[chunksize:]
+
+    if batch or not yielded:
+        yield pd.DataFrame(batch, columns=columns)
+
+
+def iter_xlsx_chunks(raw_bytes: bytes, chunksize: int = DEFAULT_CHUNK_ROWS,
+                     nrows: int | None = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream the first worksheet of an .xlsx file as DataFrames of at most
+    *chunksize* rows (first row = header). Stops after
+    *nrows* data rows when given. Always yields at least one (possibly empty)
+    frame so callers get the columns.
+    """
+    from openpyxl import load_workbook
+
+    with open_buffer(raw_bytes) as buf:
+        wb = load_workbook(buf, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            yield from _chunks_from_rows(rows, chunksize, nrows)
+        finally:
+            wb.close()
+
+
+def iter_excel_chunks(raw_bytes: bytes, chunksize: int = DEFAULT_CHUNK_ROWS,
+                      nrows: int | None = None) -> Iterator[pd.DataFrame]:
+    """Chunked reader for either Excel flavour; raises ValueError if it is neither."""
+    kind = sniff_excel_type(raw_bytes)
+    if kind == 'xlsx':
+        yield from iter_xlsx_chunks(raw_bytes, chunksize, nrows)
+    elif kind == 'xls':
+        with open_buffer(raw_bytes) as buf:
+            yield pd.read_excel(buf, engine='xlrd', nrows=nrows)
+    else:
+        raise ValueError('El archivo no es un Excel valido (.xlsx / .xls).')
+
+
+def read_excel_frame(raw_bytes: bytes, nrows: int | None = None) -> pd.DataFrame:
+    """Whole first sheet (or its first *nrows* rows) as one DataFrame."""
+    if nrows is not None and sniff_excel_type(raw_bytes) == 'xlsx':
+        try:
+            return peek_xlsx(raw_bytes, nrows)
+        except (KeyError, StopIteration, ValueError, ET.ParseError, zipfile.BadZipFile):
+            pass  # unusual package layout: let openpyxl handle it
+    chunks = list(iter_excel_chunks(raw_bytes, nrows=nrows))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
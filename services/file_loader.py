@@ -3,11 +3,17 @@ services/file_loader.py
 -----------------------
 Auto-detects encoding, separator, and file type for uploaded tabular files.
 Supports: .csv, .txt (any encoding/separator), .xlsx, .xls
+
+Every function takes the upload as a bytes-like buffer (bytes, or the mmap
+of a services.uploads.SpooledUpload) and parses it in place through
+open_buffer(), without making private copies.
 """
-import io
 import chardet
 import pandas as pd
 
+from services.excel_reader import iter_excel_chunks, read_excel_frame, sniff_excel_type
+from services.uploads import buffer_head, open_buffer
+
 
 # Candidate combinations tried in order
 _ENCODINGS  = ['utf-16', 'utf-8', 'latin-1', 'cp1252']
@@ -17,8 +23,8 @@ _SEPARATORS = ['\t', ',', ';', '|']
 def _try_read_csv(raw_bytes: bytes, encoding: str, sep: str, nrows: int = 6) -> pd.DataFrame | None:
     """Try parsing bytes as CSV with given encoding+separator. Returns None on failure."""
     try:
-        buf = io.BytesIO(raw_bytes)
-        df = pd.read_csv(buf, encoding=encoding, sep=sep, nrows=nrows, on_bad_lines='skip')
+        with open_buffer(raw_bytes) as buf:
+            df = pd.read_csv(buf, encoding=encoding, sep=sep, nrows=nrows, on_bad_lines='skip')
         if df.shape[1] > 1 and len(df) > 0:
             return df
     except Exception:
@@ -27,19 +33,17 @@ def _try_read_csv(raw_bytes: bytes, encoding: str, sep: str, nrows: int = 6) ->
 
 
 def _try_read_excel(raw_bytes: bytes, nrows: int = 6) -> tuple[pd.DataFrame | None, str]:
-    """Try parsing bytes as Excel. Returns (df, sheet_name) or (None, '')."""
-    try:
-        buf = io.BytesIO(raw_bytes)
-        df = pd.read_excel(buf, nrows=nrows, engine='openpyxl')
-        if df.shape[1] > 1 and len(df) > 0:
-            return df, 'xlsx'
-    except Exception:
-        pass
+    """
+    Parse the first rows of an Excel file, choosing the engine from its magic
+    bytes. Returns (df, 'xlsx' | 'xls') or (None, '').
+    """
+    ftype = sniff_excel_type(raw_bytes)
+    if ftype is None:
+        return None, ''
     try:
-        buf = io.BytesIO(raw_bytes)
-        df = pd.read_excel(buf, nrows=nrows, engine='xlrd')
+        df = read_excel_frame(raw_bytes, nrows=nrows)
         if df.shape[1] > 1 and len(df) > 0:
-            return df, 'xls'
+            return df, ftype
     except Exception:
         pass
     return None, ''
@@ -77,7 +81,7 @@ def detect_format(raw_bytes: bytes, filename: str = '') -> dict:
 
     # --- CSV / TXT ---
     # Quick chardet hint for smarter ordering
-    hint = chardet.detect(raw_bytes[:8192]).get('encoding', '') or ''
+    hint = chardet.detect(buffer_head(raw_bytes)).get('encoding', '') or ''
     enc_order = _ENCODINGS[:]
     if hint and hint.lower().replace('-', '') not in [e.lower().replace('-', '') for e in enc_order]:
         enc_order.insert(0, hint)
@@ -98,6 +102,32 @@ def detect_format(raw_bytes: bytes, filename: str = '') -> dict:
     return {'error': 'No se pudo detectar el formato del archivo. Prueba guardando como CSV UTF-8.'}
 
 
+def _iter_full(raw_bytes: bytes, fmt: dict, chunksize: int):
+    """
+    Yield the whole file as DataFrame chunks. CSV values are read as text
+    so they keep their source spelling; .xlsx is streamed read-only.
+    """
+    if fmt['file_type'] in ('xlsx', 'xls'):
+        yield from iter_excel_chunks(raw_bytes, chunksize=chunksize)
+        return
+
+    with open_buffer(raw_bytes) as buf:
+        yield from pd.read_csv(buf, encoding=fmt['encoding'], sep=fmt['sep'], on_bad_lines='skip',
+                               dtype=str, chunksize=chunksize)
+
+
+def _iter_tsv(raw_bytes: bytes, fmt: dict, chunksize: int):
+    """Yield UTF-8 TSV text: the header line first, then one piece per chunk."""
+    header_done = False
+    for chunk in _iter_full(raw_bytes, fmt, chunksize):
+        text = chunk.to_csv(sep='\t', index=False, header=not header_done)
+        if not header_done:
+            header, _, text = text.partition('\n')
+            yield header + '\n'
+            header_done = True
+        yield text
+
+
 def read_full_as_tsv(raw_bytes: bytes, fmt: dict) -> tuple[str, str]:
     """
     Read the entire file and return (header_line, body_text) as UTF-8 TSV strings
@@ -106,20 +136,32 @@ def read_full_as_tsv(raw_bytes: bytes, fmt: dict) -> tuple[str, str]:
     Returns ('', '') on error.
     """
     try:
-        if fmt['file_type'] in ('xlsx', 'xls'):
-            buf = io.BytesIO(raw_bytes)
-            engine = 'openpyxl' if fmt['file_type'] == 'xlsx' else 'xlrd'
-            df = pd.read_excel(buf, engine=engine)
-        else:
-            buf = io.BytesIO(raw_bytes)
-            df = pd.read_csv(buf, encoding=fmt['encoding'], sep=fmt['sep'], on_bad_lines='skip')
-
-        out = io.StringIO()
-        df.to_csv(out, sep='\t', index=False, encoding='utf-8')
-        tsv = out.getvalue()
-        lines = tsv.split('\n')
-        header = lines[0] + '\n'
-        body   = '\n'.join(lines[1:])
+        pieces = _iter_tsv(raw_bytes, fmt, chunksize=50_000)
+        header = next(pieces)
+        body   = ''.join(pieces)
         return header, body
     except Exception as e:
         return '', ''
+
+
+def write_full_as_tsv(raw_bytes: bytes, fmt: dict, output_path: str,
+                      chunksize: int = 50_000) -> tuple[str, int]:
+    """
+    Streaming variant of read_full_as_tsv(): converts the file chunk by chunk
+    straight into *output_path* (UTF-8 TSV) so neither the decoded DataFrame
+    nor the TSV text is ever held whole in memory.
+
+    Returns (header_line, data_row_count), or ('', 0) on error.
+    """
+    total_rows = 0
+    try:
+        pieces = _iter_tsv(raw_bytes, fmt, chunksize)
+        with open(output_path, 'w', encoding='utf-8', newline='') as out:
+            header = next(pieces)
+            out.write(header)
+            for text in pieces:
+                out.write(text)
+                total_rows += sum(1 for line in text.split('\n') if line.strip())
+        return header, total_rows
+    except Exception:
+        return '', 0
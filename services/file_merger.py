@@ -3,11 +3,18 @@ services/file_merger.py
 -----------------------
 Backend logic for the Unir Archivos (File Merge) feature.
 Supports CSV (.csv, .txt) and Excel (.xlsx, .xls) with configurable encoding/separator.
+Optional deduplication drops repeated rows (e.g. overlapping exports) using
+64-bit row fingerprints over configurable key columns.
 """
-import io
+from collections.abc import Iterable, Iterator
+
+import numpy as np
 import pandas as pd
 import chardet
 
+from services.excel_reader import read_excel_frame
+from services.uploads import buffer_head, open_buffer
+
 
 # ─────────────────────────────────────────────────────────────
 # File Reading
@@ -17,7 +24,8 @@ def read_file(raw_bytes: bytes, filename: str,
               encoding: str | None = None,
               sep: str | None = None) -> pd.DataFrame:
     """
-    Read a tabular file from raw bytes.
+    Read a tabular file from raw bytes (or any bytes-like buffer such as the
+    mmap of a SpooledUpload; it is parsed in place, not copied).
     
     If encoding/sep are None, auto-detection is attempted.
     Returns a DataFrame or raises ValueError on failure.
@@ -33,11 +41,9 @@ def read_file(raw_bytes: bytes, filename: str,
 
 
 def _read_excel(raw_bytes: bytes, ext: str) -> pd.DataFrame:
-    """Read Excel file."""
-    engine = 'openpyxl' if ext == 'xlsx' else 'xlrd'
+    """Read Excel file (engine chosen from the magic bytes, .xlsx streamed read-only)."""
     try:
-        buf = io.BytesIO(raw_bytes)
-        df = pd.read_excel(buf, engine=engine)
+        df = read_excel_frame(raw_bytes)
         if df.empty:
             raise ValueError("El archivo Excel esta vacio.")
         return df
@@ -55,8 +61,8 @@ def _read_csv(raw_bytes: bytes, encoding: str | None, sep: str | None) -> pd.Dat
     for enc in encodings:
         for s in separators:
             try:
-                buf = io.BytesIO(raw_bytes)
-                df = pd.read_csv(buf, encoding=enc, sep=s, on_bad_lines='skip')
+                with open_buffer(raw_bytes) as buf:
+                    df = pd.read_csv(buf, encoding=enc, sep=s, on_bad_lines='skip')
                 if df.shape[1] > 1 and len(df) > 0:
                     return df
             except Exception:
@@ -68,20 +74,124 @@ def _read_csv(raw_bytes: bytes, encoding: str | None, sep: str | None) -> pd.Dat
 def _detect_encodings(raw_bytes: bytes) -> list[str]:
     """Return ordered list of candidate encodings."""
     candidates = ['utf-16', 'utf-8', 'latin-1', 'cp1252']
-    hint = chardet.detect(raw_bytes[:8192]).get('encoding', '') or ''
+    hint = chardet.detect(buffer_head(raw_bytes)).get('encoding', '') or ''
     if hint and hint.lower().replace('-', '') not in [e.lower().replace('-', '') for e in candidates]:
         candidates.insert(0, hint)
     return candidates
 
 
+# ─────────────────────────────────────────────────────────────
+# Deduplication
+# ─────────────────────────────────────────────────────────────
+
+# Suggested key columns for Meltwater-style exports
+DEFAULT_DEDUP_COLUMNS = ['URL', 'Date', 'Hit Sentence']
+
+
+def _resolve_key_columns(df: pd.DataFrame, key_columns: list[str] | None) -> list[str]:
+    """
+    Map requested key columns to the DataFrame's actual column names.
+    Matching ignores surrounding whitespace and case. None means all columns.
+    """
+    if not key_columns:
+        return list(df.columns)
+
+    by_norm = {str(c).strip().lower(): c for c in df.columns}
+    resolved, missing = [], []
+    for key in key_columns:
+        col = by_norm.get(str(key).strip().lower())
+        if col is None:
+            missing.append(str(key))
+        elif col not in resolved:
+            resolved.append(col)
+
+    if missing:
+        raise ValueError(f"Columnas clave para deduplicar no encontradas: {', '.join(missing)}")
+    return resolved
+
+
+def _key_text(col: pd.Series) -> pd.Series:
+    """
+    Trimmed text of a key column. Whole floats are written as integers, so an
+    ID column read as int in one file and as float in another (pandas turns
+    it float as soon as one cell is blank) yields the same text: 2 and 2.0 -> "2".
+    """
+    text = col.astype(str).str.strip()
+    if pd.api.types.is_float_dtype(col):
+        whole = col.notna() & (col % 1 == 0) & (col.abs() < 2 ** 63)
+        if whole.any():
+            text[whole] = col[whole].astype('int64').astype(str)
+    return text.where(col.notna(), '')
+
+
+def row_fingerprints(df: pd.DataFrame, key_columns: list[str] | None = None) -> np.ndarray:
+    """
+    Return one 64-bit fingerprint (uint64) per row, hashed over *key_columns*.
+    Values are compared as trimmed text, with whole floats written as
+    integers, so the same key hashes identically even when files were parsed
+    with different dtypes.
+    """
+    cols = _resolve_key_columns(df, key_columns)
+    keys = pd.DataFrame({col: _key_text(df[col]) for col in cols}, index=df.index)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+
+def dedupe_rows(df: pd.DataFrame, key_columns: list[str] | None = None,
+                seen: set[int] | None = None) -> tuple[pd.DataFrame, int]:
+    """
+    Drop rows whose fingerprint was already seen (within *df* or in *seen*).
+
+    Pass the same *seen* set across calls to deduplicate a stream of chunks;
+    only the fingerprints are kept, never the rows themselves.
+    Returns (filtered DataFrame, number of rows dropped).
+    """
+    if df.empty:
+        return df, 0
+    if seen is None:
+        seen = set()
+
+    fps = row_fingerprints(df, key_columns)
+    keep = ~pd.Series(fps).duplicated().to_numpy()
+    if seen:
+        keep &= np.fromiter((int(fp) not in seen for fp in fps), dtype=bool, count=len(fps))
+    seen.update(fps[keep].tolist())
+
+    dropped = int(len(df) - keep.sum())
+    if dropped == 0:
+        return df, 0
+    return df[keep], dropped
+
+
+def dedupe_chunks(chunks: Iterable[pd.DataFrame], key_columns: list[str] | None = None,
+                  stats: dict | None = None) -> Iterator[pd.DataFrame]:
+    """
+    Streaming variant of dedupe_rows: yields each chunk without the rows
+    already seen in earlier chunks. If *stats* is given, its
+    'duplicates_dropped' entry is updated as chunks are consumed.
+    """
+    seen: set[int] = set()
+    if stats is not None:
+        stats.setdefault('duplicates_dropped', 0)
+    for chunk in chunks:
+        chunk, dropped = dedupe_rows(chunk, key_columns, seen)
+        if stats is not None:
+            stats['duplicates_dropped'] += dropped
+        yield chunk
+
+
 # ─────────────────────────────────────────────────────────────
 # Merge Operations
 # ─────────────────────────────────────────────────────────────
 
-def merge_default(dataframes: list[pd.DataFrame]) -> pd.DataFrame:
+def merge_default(dataframes: list[pd.DataFrame],
+                  dedup_columns: list[str] | None = None) -> pd.DataFrame:
     """
     Concatenate DataFrames that share the same column structure.
     Columns are aligned by name; missing columns are filled with NaN.
+
+    If *dedup_columns* is given, repeated rows (same values in those columns)
+    are dropped before concatenation and the count is stored in
+    ``result.attrs['duplicates_dropped']``.
     
     Raises ValueError if fewer than 2 DataFrames are provided.
     """
@@ -92,8 +202,13 @@ def merge_default(dataframes: list[pd.DataFrame]) -> pd.DataFrame:
     for i, df in enumerate(dataframes):
         dataframes[i].columns = [str(c).strip() for c in df.columns]
 
+    stats = {'duplicates_dropped': 0}
+    if dedup_columns:
+        dataframes = list(dedupe_chunks(dataframes, dedup_columns, stats))
+
     # Use pd.concat with alignment — handles mismatched columns gracefully
     result = pd.concat(dataframes, ignore_index=True, sort=False)
+    result.attrs['duplicates_dropped'] = stats['duplicates_dropped']
     return result
 
 
@@ -0,0 +1,51 @@
+"""
+services/lazy.py
+----------------
+Deferred imports for heavy dependencies (pandas, python-pptx and the
+analysis services built on them).
+
+Login, admin and task pages need none of these, so importing them at module
+load only slows down worker boot. The proxies below look like the module or
+function they stand for and import it on first use — the first request of a
+tool that needs it pays the import once per process.
+"""
+import importlib
+
+
+class LazyModule:
+    """Stands in for module `name`; imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            # importlib's module locks make concurrent first uses safe
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def lazy_callable(module_name: str, attr: str):
+    """A function (or class) from `module_name`, imported when first called."""
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, attr)(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = attr
+    call.__doc__ = f'Lazy proxy for {module_name}.{attr}'
+    return call
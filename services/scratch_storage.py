@@ -0,0 +1,201 @@
+"""
+Scratch storage: the index, quota and eviction for temporary files in scratch/.
+
+Every downloadable or reusable file a tool leaves in scratch/ is registered as
+a TempArtifact row carrying its owner, size, creation and last-access time.
+That index answers "how much is in use" with one SUM and "what goes first"
+with one ordered query, so nothing has to walk the directory per request:
+
+- register()      records a file (and its sidecar, if its kind has one).
+- touch()         marks an artifact as used; eviction is least-recently-used.
+- discard()       deletes an artifact's files and row at once, e.g. when a
+                  classification session finalizes or a one-shot download ends.
+- enforce_quota() evicts least-recently-used artifacts until the index fits
+                  the byte quota; called right after registering a file.
+- sweep()         the periodic pass: expires artifacts idle past the TTL,
+                  drops rows whose files are gone, deletes untracked files
+                  older than the TTL, then enforces the quota. The app runs it
+                  from a single elected worker per interval.
+
+Artifacts used within the last EVICTION_GRACE_SECONDS are never evicted for
+quota, so a file is not deleted between its creation and its first download.
+"""
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from extensions import db
+from models import TempArtifact
+
+
+# Extra files stored next to an artifact, by kind (formatted with file_id)
+SIDECARS = {
+    'detect': 'detect_{file_id}.json',
+}
+
+# Recently used artifacts are kept even when the quota is exceeded
+EVICTION_GRACE_SECONDS = 60
+
+# touch() writes at most once per artifact in this window
+TOUCH_RESOLUTION_SECONDS = 30
+
+
+def artifact_files(artifact) -> list[str]:
+    """Names (relative to scratch/) of every file that belongs to an artifact."""
+    names = [artifact.storage_name]
+    sidecar = SIDECARS.get(artifact.kind)
+    if sidecar:
+        names.append(sidecar.format(file_id=artifact.file_id))
+    return names
+
+
+def _files_size(folder: str, names) -> int:
+    size = 0
+    for name in names:
+        try:
+            size += os.path.getsize(os.path.join(folder, name))
+        except OSError:
+            continue
+    return size
+
+
+def _remove_files(folder: str, names) -> int:
+    freed = 0
+    for name in names:
+        path = os.path.join(folder, name)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except OSError:
+            continue
+    return freed
+
+
+def register(folder: str, kind: str, file_id: str, storage_name: str, user_id: int) -> TempArtifact:
+    """Create or replace the index entry for a file already written to scratch/."""
+    now = datetime.utcnow()
+    artifact = TempArtifact.query.filter_by(kind=kind, file_id=file_id).first()
+    if artifact is None:
+        artifact = TempArtifact(kind=kind, file_id=file_id)
+        db.session.add(artifact)
+    artifact.storage_name = storage_name
+    artifact.user_id = user_id
+    artifact.created_at = now
+    artifact.last_access_at = now
+    artifact.size_bytes = _files_size(folder, artifact_files(artifact))
+    db.session.commit()
+    return artifact
+
+
+def touch(artifact) -> None:
+    """Record a use of `artifact`, moving it to the back of the eviction order."""
+    now = datetime.utcnow()
+    last = artifact.last_access_at
+    if last is not None and (now - last).total_seconds() < TOUCH_RESOLUTION_SECONDS:
+        return
+    artifact.last_access_at = now
+    db.session.commit()
+
+
+def discard(folder: str, artifact) -> int:
+    """Delete an artifact's files and index row. Returns the bytes freed."""
+    freed = _remove_files(folder, artifact_files(artifact))
+    # Another worker may have evicted it already
+    db.session.query(TempArtifact).filter_by(id=artifact.id).delete(synchronize_session=False)
+    db.session.commit()
+    return freed
+
+
+def discard_by_id(folder: str, kind: str, file_id: str) -> int:
+    artifact = TempArtifact.query.filter_by(kind=kind, file_id=file_id).first()
+    return discard(folder, artifact) if artifact is not None else 0
+
+
+def usage_bytes() -> int:
+    """Bytes held by indexed artifacts."""
+    return int(db.session.query(func.coalesce(func.sum(TempArtifact.size_bytes), 0)).scalar())
+
+
+def enforce_quota(folder: str, quota_bytes: int) -> dict:
+    """Evict least-recently-used artifacts until the index fits `quota_bytes`."""
+    stats = {'evicted': 0, 'bytes_freed': 0}
+    excess = usage_bytes() - quota_bytes
+    if excess <= 0:
+        return stats
+
+    cutoff = datetime.utcnow() - timedelta(seconds=EVICTION_GRACE_SECONDS)
+    candidates = (TempArtifact.query
+                  .filter(TempArtifact.last_access_at < cutoff)
+                  .order_by(TempArtifact.last_access_at, TempArtifact.id)
+                  .all())
+    victims = []
+    for artifact in candidates:
+        if excess <= 0:
+            break
+        victims.append(artifact)
+        excess -= artifact.size_bytes or 0
+
+    for artifact in victims:
+        size = artifact.size_bytes or 0  # read before the commit expires it
+        discard(folder, artifact)
+        stats['evicted'] += 1
+        stats['bytes_freed'] += size
+    return stats
+
+
+def sweep(folder: str, ttl_seconds: float, quota_bytes: int) -> dict:
+    """Periodic cleanup of scratch/; see the module docstring for the steps."""
+    stats = {'expired': 0, 'missing': 0, 'orphans': 0}
+    now = datetime.utcnow()
+    expired_before = now - timedelta(seconds=ttl_seconds)
+
+    try:
+        entries = {entry.name: entry for entry in os.scandir(folder)}
+    except FileNotFoundError:
+        entries = {}
+
+    indexed = set()
+    expired, missing = [], []
+    for artifact in TempArtifact.query.all():
+        if artifact.storage_name not in entries:
+            missing.append(artifact.id)
+            continue
+        indexed.update(artifact_files(artifact))
+        if (artifact.last_access_at or artifact.created_at or now) < expired_before:
+            expired.append(artifact)
+
+    for artifact in expired:
+        discard(folder, artifact)
+    stats['expired'] = len(expired)
+
+    if missing:
+        (db.session.query(TempArtifact)
+         .filter(TempArtifact.id.in_(missing))
+         .delete(synchronize_session=False))
+        db.session.commit()
+    stats['missing'] = len(missing)
+
+    # Files no artifact owns (report inputs, spools, generated decks) keep the
+    # old rule: deleted once they are older than the TTL
+    expired_mtime = time.time() - ttl_seconds
+    for name, entry in entries.items():
+        if name in indexed or name.startswith('.'):
+            continue
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= expired_mtime:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            stats['orphans'] += 1
+        except OSError:
+            continue
+
+    stats.update(enforce_quota(folder, quota_bytes))
+    stats['bytes_in_use'] = usage_bytes()
+    return stats
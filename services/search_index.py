@@ -0,0 +1,138 @@
+"""
+Substring search for free-text filters (task client, activity action).
+
+A leading-wildcard ILIKE cannot use a B-tree index, so every filter
+keystroke scanned the whole table. Each searchable column gets an index
+that serves `%term%` lookups:
+
+- SQLite: an external-content FTS5 table with the trigram tokenizer
+  (`<table>_<column>_fts`), kept in sync by triggers on the base table.
+  FTS5 answers case-insensitive LIKE patterns from its trigram index.
+- PostgreSQL: a pg_trgm GIN index, which ILIKE uses directly.
+- Anything else, or terms shorter than one trigram: plain ILIKE.
+
+The SQLite objects are created and dropped together with their base table
+(DDL events on create_all/drop_all); ensure_search_indexes() adds them to
+databases created before this module existed.
+"""
+import sqlite3
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from extensions import db
+from models import ActivityLog, Task
+
+
+# (model, column name) pairs served by a search index
+SEARCHABLE_COLUMNS = [
+    (Task, 'client'),
+    (ActivityLog, 'action'),
+]
+
+# Trigram FTS needs at least 3 characters to use the index
+MIN_INDEXED_TERM = 3
+
+_fts_ready: dict[str, bool] = {}
+
+
+def _fts_name(table_name: str, column: str) -> str:
+    return f'{table_name}_{column}_fts'
+
+
+def _sqlite_supports_trigram() -> bool:
+    # Trigram tokenizer shipped with SQLite 3.34
+    return sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def _sqlite_ddl(table_name: str, column: str) -> list[str]:
+    fts = _fts_name(table_name, column)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column}, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+    ]
+
+
+def _register_ddl_events(model, column: str) -> None:
+    table = model.__table__
+    fts = _fts_name(table.name, column)
+    on_sqlite = lambda ddl, target, bind, **kw: bind.dialect.name == 'sqlite' and _sqlite_supports_trigram()  # noqa: E731
+
+    for statement in _sqlite_ddl(table.name, column):
+        event.listen(table, 'after_create', sa.DDL(statement).execute_if(callable_=on_sqlite))
+    # Triggers go away with the base table; the virtual table must be dropped explicitly
+    event.listen(table, 'after_drop', sa.DDL(f'DROP TABLE IF EXISTS {fts}').execute_if(callable_=on_sqlite))
+
+
+for _model, _column in SEARCHABLE_COLUMNS:
+    _register_ddl_events(_model, _column)
+
+
+def ensure_search_indexes(engine=None) -> list[str]:
+    """Create missing search indexes on an existing database (idempotent)."""
+    engine = engine or db.engine
+    created = []
+    existing_tables = set(sa.inspect(engine).get_table_names())
+
+    for model, column in SEARCHABLE_COLUMNS:
+        table_name = model.__table__.name
+        if table_name not in existing_tables:
+            continue
+        name = _fts_name(table_name, column)
+        try:
+            with engine.begin() as conn:
+                if engine.dialect.name == 'sqlite' and _sqlite_supports_trigram():
+                    # IF NOT EXISTS everywhere, so missing triggers are restored too
+                    for statement in _sqlite_ddl(table_name, column):
+                        conn.exec_driver_sql(statement)
+                    if name not in existing_tables:
+                        # Index the rows written before the table existed
+                        conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+                        created.append(name)
+                elif engine.dialect.name == 'postgresql':
+                    conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                    conn.exec_driver_sql(
+                        f'CREATE INDEX IF NOT EXISTS ix_{table_name}_{column}_trgm '
+                        f'ON {table_name} USING gin ({column} gin_trgm_ops)'
+                    )
+                    created.append(f'ix_{table_name}_{column}_trgm')
+        except Exception as e:
+            print(f"[search_index] Aviso al crear indice de busqueda {name}: {e}")
+
+    _fts_ready.clear()
+    return created
+
+
+def _has_fts(bind, name: str) -> bool:
+    key = f'{bind.url}:{name}'
+    if key not in _fts_ready:
+        _fts_ready[key] = name in sa.inspect(bind).get_table_names()
+    return _fts_ready[key]
+
+
+def substring_filter(model, column: str, term: str):
+    """
+    Criterion equivalent to `model.column ILIKE '%term%'`, answered from the
+    search index when the database has one.
+    """
+    attr = getattr(model, column)
+    pattern = f'%{term}%'
+
+    bind = db.session.get_bind(mapper=sa.inspect(model))
+    if bind.dialect.name != 'sqlite' or len(term) < MIN_INDEXED_TERM:
+        return attr.ilike(pattern)
+
+    name = _fts_name(model.__table__.name, column)
+    if not _has_fts(bind, name):
+        return attr.ilike(pattern)
+
+    fts = sa.table(name, sa.column('rowid'), sa.column(column))
+    matching = sa.select(fts.c.rowid).where(fts.c[column].like(pattern))
+    return model.id.in_(matching)
@@ -0,0 +1,175 @@
+"""
+services/shared_state.py
+------------------------
+Key/value store with TTLs and atomic counters, shared by every worker
+process on the host through one SQLite file. No Redis needed.
+
+Under gunicorn each worker has its own memory, so an in-memory rate limiter
+multiplies every limit by the worker count and an in-process cache cannot be
+invalidated for the other workers. Both use this store instead:
+
+- SQLiteStore: get/set/delete with per-key TTL, plus incr(), a single
+  UPSERT ... RETURNING statement that is atomic across processes.
+- SQLiteLimiterStorage: a `limits` storage backend registered under the
+  `sqlite://` scheme, so Flask-Limiter can use
+  RATELIMIT_STORAGE_URI = 'sqlite:///<path>' (fixed-window strategy).
+- TTLCache (services/ttl_cache.py) can be given a SQLiteStore as its backend.
+
+Values go through JSON; counters are stored as SQLite integers. Expired rows
+are deleted when read, and all of them are purged every `purge_interval`
+seconds by whichever process writes next.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS shared_state ("
+    "key TEXT PRIMARY KEY, value NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_shared_state_expires_at ON shared_state (expires_at)",
+]
+
+_INCR = (
+    "INSERT INTO shared_state (key, value, expires_at) VALUES (?1, ?2, ?3) "
+    "ON CONFLICT (key) DO UPDATE SET "
+    "value = CASE WHEN shared_state.expires_at <= ?4 THEN excluded.value "
+    "ELSE shared_state.value + excluded.value END, "
+    "expires_at = CASE WHEN shared_state.expires_at <= ?4 THEN excluded.expires_at "
+    "ELSE shared_state.expires_at END "
+    "RETURNING value"
+)
+
+
+class SQLiteStore:
+    """
+    Parameters
+    ----------
+    path           : SQLite file shared by the processes (created if missing)
+    purge_interval : seconds between sweeps that delete expired rows
+    """
+
+    def __init__(self, path: str, purge_interval: float = 60.0):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._next_purge = 0.0
+        with self._connect() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _maybe_purge(self, conn: sqlite3.Connection, now: float) -> None:
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            conn.execute('DELETE FROM shared_state WHERE expires_at <= ?', (now,))
+
+    def get(self, key: str, default=None):
+        row = self._connect().execute(
+            'SELECT value FROM shared_state WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        value = row[0]
+        return json.loads(value) if isinstance(value, str) else value
+
+    def set(self, key: str, value, ttl: float) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), now + ttl),
+        )
+        self._maybe_purge(conn, now)
+
+    def delete(self, key: str) -> None:
+        self._connect().execute('DELETE FROM shared_state WHERE key = ?', (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: float = 60.0) -> int:
+        """Add `amount` to a counter; a missing or expired counter restarts with a new TTL."""
+        now = time.time()
+        conn = self._connect()
+        value = conn.execute(_INCR, (key, amount, now + ttl, now)).fetchone()[0]
+        self._maybe_purge(conn, now)
+        return int(value)
+
+    def get_counter(self, key: str) -> int:
+        value = self.get(key, 0)
+        return value if isinstance(value, int) else 0
+
+    def expiry(self, key: str) -> float:
+        """Epoch time at which the key expires (now if it does not exist)."""
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT expires_at FROM shared_state WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def clear(self, prefix: str = '') -> int:
+        """Delete every key starting with `prefix`; returns the number removed."""
+        cursor = self._connect().execute(
+            'DELETE FROM shared_state WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)
+        )
+        return cursor.rowcount
+
+    def ping(self) -> bool:
+        try:
+            self._connect().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+def path_from_uri(uri: str) -> str:
+    """'sqlite:///relative.db' or 'sqlite:////absolute.db' (SQLAlchemy convention)."""
+    prefix = 'sqlite:///'
+    if not uri or not uri.startswith(prefix) or uri == prefix:
+        raise ValueError(f'URI de estado compartido invalida: {uri!r}')
+    return uri[len(prefix):]
+
+
+class SQLiteLimiterStorage(Storage):
+    """Flask-Limiter / `limits` storage on top of SQLiteStore."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    _PREFIX = 'limits:'
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, **options):
+        self.store = SQLiteStore(path_from_uri(uri))
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self.store.incr(self._PREFIX + key, amount, expiry)
+
+    def get(self, key: str) -> int:
+        return self.store.get_counter(self._PREFIX + key)
+
+    def get_expiry(self, key: str) -> float:
+        return self.store.expiry(self._PREFIX + key)
+
+    def check(self) -> bool:
+        return self.store.ping()
+
+    def reset(self) -> int | None:
+        return self.store.clear(self._PREFIX)
+
+    def clear(self, key: str) -> None:
+        self.store.delete(self._PREFIX + key)
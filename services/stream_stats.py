@@ -0,0 +1,577 @@
+"""
+services/stream_stats.py
+------------------------
+Streaming accumulators for the CSV analysis tool.
+
+Each accumulator is fed one pandas chunk at a time and keeps bounded state,
+so a file of any size can be profiled in a single pass:
+
+- NumericMoments  : count / mean / M2..M4 (parallel Welford) + min/max
+- QuantileDigest  : exact values for small columns, t-digest beyond that
+- FrequencyCounter: value counts for categorical columns, switching to
+                    HyperLogLog + Space-Saving sketches at high cardinality
+- PairwiseCoMoments: running pairwise-complete co-moments for Pearson r
+- CsvProfile      : per-column orchestration of the above
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+# ─────────────────────────────────────────────────────────────
+# Dtype helpers
+# ─────────────────────────────────────────────────────────────
+
+def dtype_kind(dtype) -> str:
+    """Classify a pandas dtype as 'numeric', 'categorical', 'datetime' or 'other'."""
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'other'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if (pd.api.types.is_object_dtype(dtype)
+            or pd.api.types.is_string_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype)):
+        return 'categorical'
+    return 'other'
+
+
+def merge_dtypes(a, b):
+    """
+    Combine the dtypes pandas inferred for two chunks of the same column into
+    the dtype a whole-file read would have produced.
+    """
+    if a == b:
+        return a
+    kind_a, kind_b = dtype_kind(a), dtype_kind(b)
+    if kind_a == kind_b == 'numeric':
+        return np.dtype('float64')
+    if kind_b == 'categorical':
+        return b
+    if kind_a == 'categorical':
+        return a
+    return np.dtype(object)
+
+
+# ─────────────────────────────────────────────────────────────
+# Numeric moments
+# ─────────────────────────────────────────────────────────────
+
+def batch_moments(values: np.ndarray) -> dict:
+    """
+    Column-wise count, sum-based mean and central moment sums (M2, M3, M4),
+    min and max of a 2-D float array, ignoring NaN. Vectorized over columns.
+    """
+    mask = ~np.isnan(values)
+    count = mask.sum(axis=0)
+    safe_count = np.where(count > 0, count, 1)
+    mean = np.where(mask, values, 0.0).sum(axis=0) / safe_count
+    centered = np.where(mask, values - mean, 0.0)
+    sq = centered * centered
+    with np.errstate(invalid='ignore'):
+        vmin = np.where(count > 0, np.nanmin(np.where(mask, values, np.inf), axis=0), np.nan)
+        vmax = np.where(count > 0, np.nanmax(np.where(mask, values, -np.inf), axis=0), np.nan)
+    return {
+        'count': count.astype(np.int64),
+        'mean': np.where(count > 0, mean, 0.0),
+        'm2': sq.sum(axis=0),
+        'm3': (sq * centered).sum(axis=0),
+        'm4': (sq * sq).sum(axis=0),
+        'min': vmin,
+        'max': vmax,
+    }
+
+
+def combine_moments(a: dict, b: dict) -> dict:
+    """
+    Merge two moment summaries (Chan et al. / Pébay parallel update).
+    Works element-wise on numpy arrays so many columns merge at once.
+    """
+    na, nb = a['count'].astype(np.float64), b['count'].astype(np.float64)
+    n = na + nb
+    safe_n = np.where(n > 0, n, 1.0)
+    delta = b['mean'] - a['mean']
+    d2 = delta * delta
+
+    mean = a['mean'] + delta * nb / safe_n
+    m2 = a['m2'] + b['m2'] + d2 * na * nb / safe_n
+    m3 = (a['m3'] + b['m3']
+          + d2 * delta * na * nb * (na - nb) / safe_n ** 2
+          + 3.0 * delta * (na * b['m2'] - nb * a['m2']) / safe_n)
+    m4 = (a['m4'] + b['m4']
+          + d2 * d2 * na * nb * (na * na - na * nb + nb * nb) / safe_n ** 3
+          + 6.0 * d2 * (na * na * b['m2'] + nb * nb * a['m2']) / safe_n ** 2
+          + 4.0 * delta * (na * b['m3'] - nb * a['m3']) / safe_n)
+
+    return {
+        'count': a['count'] + b['count'],
+        'mean': mean,
+        'm2': m2,
+        'm3': m3,
+        'm4': m4,
+        'min': np.fmin(a['min'], b['min']),
+        'max': np.fmax(a['max'], b['max']),
+    }
+
+
+def moments_summary(count: int, mean: float, m2: float, m3: float, m4: float) -> dict:
+    """
+    Turn moment sums into the statistics pandas reports: sample std (ddof=1),
+    adjusted skewness and excess kurtosis. Returns NaN where pandas would.
+    """
+    n = float(count)
+    std = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+    m2_zero = abs(m2) < 1e-14
+
+    if n < 3:
+        skew = np.nan
+    elif m2_zero:
+        skew = 0.0
+    else:
+        skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+
+    if n < 4:
+        kurt = np.nan
+    elif m2_zero:
+        kurt = 0.0
+    else:
+        adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        kurt = (n * (n + 1) * (n - 1) * m4) / ((n - 2) * (n - 3) * m2 ** 2) - adj
+
+    return {'mean': mean, 'std': std, 'skewness': skew, 'kurtosis': kurt}
+
+
+# ─────────────────────────────────────────────────────────────
+# Quantiles (exact buffer -> t-digest)
+# ─────────────────────────────────────────────────────────────
+
+class QuantileDigest:
+    """
+    Quantile sketch for one numeric column.
+
+    Values are kept verbatim while the column has at most *exact_limit* of
+    them (results then match pandas exactly). Past that, they are folded into
+    a merging t-digest with at most ~*compression* centroids. Low-cardinality
+    columns (codes, ratings, counts) also keep an exact value -> count table
+    up to *max_distinct* values, which takes precedence over the digest.
+    """
+
+    def __init__(self, compression: int = 200, exact_limit: int = 20_000,
+                 max_distinct: int = 2_048):
+        self.compression = compression
+        self.exact_limit = exact_limit
+        self.max_distinct = max_distinct
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._exact: list[np.ndarray] | None = []
+        self._distinct: tuple[np.ndarray, np.ndarray] | None = (np.empty(0), np.empty(0, dtype=np.int64))
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+
+    @property
+    def is_exact(self) -> bool:
+        return self._exact is not None
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self._update_distinct(values)
+
+        if self._exact is not None:
+            self._exact.append(values)
+            if self.count <= self.exact_limit:
+                return
+            values = np.concatenate(self._exact)
+            self._exact = None
+
+        self._compress(values)
+
+    def _update_distinct(self, values: np.ndarray) -> None:
+        if self._distinct is None:
+            return
+        keys, counts = self._distinct
+        new_keys, new_counts = np.unique(values, return_counts=True)
+        merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+        if merged.size > self.max_distinct:
+            self._distinct = None
+            return
+        totals = np.bincount(inverse, weights=np.concatenate([counts, new_counts]))
+        self._distinct = (merged, totals.astype(np.int64))
+
+    def _compress(self, values: np.ndarray) -> None:
+        means = np.concatenate([self._means, values])
+        weights = np.concatenate([self._weights, np.ones(values.size)])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        total = weights.sum()
+        mid_q = (np.cumsum(weights) - weights / 2.0) / total
+        # k1 scale function: small clusters at the tails, large in the middle
+        k = self.compression * (np.arcsin(2.0 * mid_q - 1.0) / np.pi + 0.5)
+        bucket = np.floor(k).astype(np.int64)
+        starts = np.r_[0, np.flatnonzero(np.diff(bucket)) + 1]
+
+        new_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / new_weights
+        self._weights = new_weights
+
+    def _values(self) -> np.ndarray:
+        return np.concatenate(self._exact) if self._exact else np.empty(0)
+
+    def _positions(self):
+        """Centroid centres (cumulative weight) padded with min/max endpoints."""
+        centres = np.cumsum(self._weights) - self._weights / 2.0
+        xs = np.r_[0.0, centres, float(self.count)]
+        ys = np.r_[self.min, self._means, self.max]
+        return xs, ys
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return np.nan
+        if self.is_exact:
+            return float(np.quantile(self._values(), q))
+        if self._distinct is not None:
+            # Linear interpolation between order statistics, as np.quantile does
+            keys, counts = self._distinct
+            position = q * (self.count - 1)
+            ends = np.cumsum(counts)
+            lo = keys[np.searchsorted(ends, np.floor(position), side='right')]
+            hi = keys[np.searchsorted(ends, np.ceil(position), side='right')]
+            return float(lo + (hi - lo) * (position - np.floor(position)))
+        xs, ys = self._positions()
+        return float(np.interp(q * self.count, xs, ys))
+
+    def histogram(self, bins: int = 20) -> tuple[np.ndarray, np.ndarray]:
+        """Same contract as np.histogram(values, bins) over [min, max]."""
+        if self.is_exact:
+            return np.histogram(self._values(), bins=bins)
+        if self._distinct is not None:
+            keys, counts = self._distinct
+            hist, edges = np.histogram(keys, bins=bins, weights=counts)
+            return hist.astype(np.int64), edges
+
+        lo, hi = float(self.min), float(self.max)
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        edges = np.linspace(lo, hi, bins + 1)
+        xs, ys = self._positions()
+        cumulative = np.interp(edges, ys, xs)
+        expected = np.diff(cumulative)
+
+        # Largest-remainder rounding so counts still add up to self.count
+        counts = np.floor(expected).astype(np.int64)
+        short = self.count - int(counts.sum())
+        if short > 0:
+            counts[np.argsort(-(expected - counts), kind='stable')[:short]] += 1
+        return counts, edges
+
+
+# ─────────────────────────────────────────────────────────────
+# Categorical frequencies
+# ─────────────────────────────────────────────────────────────
+
+def hash_values(values) -> np.ndarray:
+    """64-bit hashes of arbitrary values (same hash for equal values)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+_POWERS_OF_TWO = np.array([1 << i for i in range(64)], dtype=np.uint64)
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch with 2**precision one-byte registers
+    (precision=14: 16 KB, ~0.8% standard error).
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        if hashes.size == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        # rank = position of the first 1-bit in the remaining 64 - p bits
+        bit_length = np.searchsorted(_POWERS_OF_TWO, rest, side='right')
+        rank = np.minimum(64 - bit_length + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = float(self.registers.size)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            raw = m * np.log(m / zeros)
+        return int(round(raw))
+
+
+class SpaceSaving:
+    """
+    Heavy-hitter summary keeping at most *capacity* counters (mergeable
+    Space-Saving). Counts are upper bounds; *errors* holds the maximum
+    overestimate of each one.
+    """
+
+    def __init__(self, capacity: int = 2_000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+
+    def update_counts(self, counts: pd.Series) -> None:
+        """Merge exact counts for a batch (value -> count)."""
+        floor = int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+        index = self.counts.index.append(counts.index.difference(self.counts.index, sort=False))
+        merged = (self.counts.reindex(index, fill_value=floor)
+                  + counts.reindex(index, fill_value=0)).astype(np.int64)
+        errors = self.errors.reindex(index, fill_value=floor).astype(np.int64)
+        keep = merged.sort_values(ascending=False, kind='stable').index[:self.capacity]
+        self.counts = merged[keep]
+        self.errors = errors[keep]
+
+    def top(self, n: int) -> list[tuple]:
+        """
+        Up to n (value, count) pairs that are certainly among the n most
+        frequent. Counts are guaranteed lower bounds (count - error). A value
+        is kept only if that bound beats the upper bound of every value left
+        out: the (n+1)-th tracked count, or the summary floor once it is full.
+        """
+        upper = self.counts.sort_values(ascending=False, kind='stable')
+        rival = int(upper.iloc[n]) if len(upper) > n else 0
+        if len(upper) >= self.capacity:
+            rival = max(rival, int(upper.min()))  # bound for untracked values
+        head = upper.head(n)
+        lower = (head - self.errors[head.index]).sort_values(ascending=False, kind='stable')
+        lower = lower[lower > rival]
+        return list(zip(lower.index.tolist(), lower.to_numpy().tolist()))
+
+
+class FrequencyCounter:
+    """
+    Value counts for one categorical column, merged chunk by chunk.
+
+    Counts are exact until the column has more than *cardinality_threshold*
+    distinct values; from then on a HyperLogLog gives unique_count and a
+    Space-Saving summary gives the top values, so memory stays flat however
+    unique the column is. `approximate` tells which mode is in use.
+    """
+
+    def __init__(self, cardinality_threshold: int = 50_000, capacity: int = 2_000):
+        self.cardinality_threshold = cardinality_threshold
+        self.capacity = capacity
+        self.count = 0
+        self._counts: Counter | None = Counter()
+        self._hll: HyperLogLog | None = None
+        self._heavy: SpaceSaving | None = None
+
+    @property
+    def approximate(self) -> bool:
+        return self._counts is None
+
+    def update(self, series: pd.Series) -> None:
+        counts = series.value_counts(dropna=True, sort=False)
+        if counts.empty:
+            return
+        self.count += int(counts.sum())
+
+        if self._counts is not None:
+            self._counts.update(dict(zip(counts.index.tolist(), counts.to_numpy().tolist())))
+            if len(self._counts) > self.cardinality_threshold:
+                self._switch_to_sketches()
+            return
+
+        self._hll.update_hashes(hash_values(counts.index))
+        self._heavy.update_counts(counts)
+
+    def _switch_to_sketches(self) -> None:
+        exact = self._counts
+        self._counts = None
+        self._hll = HyperLogLog()
+        self._hll.update_hashes(hash_values(list(exact.keys())))
+        self._heavy = SpaceSaving(self.capacity)
+        top = exact.most_common(self.capacity)
+        self._heavy.update_counts(pd.Series(
+            [c for _, c in top], index=pd.Index([v for v, _ in top], dtype=object), dtype=np.int64,
+        ))
+
+    @property
+    def unique_count(self) -> int:
+        if self._counts is not None:
+            return len(self._counts)
+        return self._hll.estimate()
+
+    def top(self, n: int) -> list[tuple]:
+        """
+        Most frequent (value, count) pairs, first-seen order breaking ties.
+        Once approximate, counts are lower bounds and only values certain to
+        be in the top n are returned, so there may be fewer than n.
+        """
+        if self._counts is not None:
+            return self._counts.most_common(n)
+        return self._heavy.top(n)
+
+
+# ─────────────────────────────────────────────────────────────
+# Correlation
+# ─────────────────────────────────────────────────────────────
+
+class PairwiseCoMoments:
+    """
+    Running sums for a pairwise-complete Pearson correlation matrix, the same
+    NaN handling as DataFrame.corr(). Values are shifted by a per-column
+    reference (first chunk mean) to limit floating-point cancellation.
+    """
+
+    def __init__(self, columns: list):
+        k = len(columns)
+        self.columns = list(columns)
+        self._shift = None
+        self._n = np.zeros((k, k))
+        self._sum = np.zeros((k, k))
+        self._sum_sq = np.zeros((k, k))
+        self._cross = np.zeros((k, k))
+
+    def update(self, values: np.ndarray) -> None:
+        present = ~np.isnan(values)
+        if self._shift is None:
+            with np.errstate(invalid='ignore'):
+                shift = np.nanmean(np.where(present, values, np.nan), axis=0) if values.size else np.zeros(values.shape[1])
+            self._shift = np.nan_to_num(shift)
+
+        mask = present.astype(np.float64)
+        centred = np.where(present, values - self._shift, 0.0)
+        self._n += mask.T @ mask
+        self._sum += centred.T @ mask
+        self._sum_sq += (centred * centred).T @ mask
+        self._cross += centred.T @ centred
+
+    def correlation(self) -> np.ndarray:
+        n = self._n
+        s = self._sum
+        cov = n * self._cross - s * s.T
+        var_i = n * self._sum_sq - s * s
+        var_j = var_i.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.sqrt(var_i * var_j)
+        corr[(n < 1) | ~np.isfinite(corr)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+# ─────────────────────────────────────────────────────────────
+# Profile orchestration
+# ─────────────────────────────────────────────────────────────
+
+class CsvProfile:
+    """
+    Single-pass profile of a tabular file. Feed chunks with update(); every
+    statistic the analysis tool reports is derived from this state.
+    """
+
+    def __init__(self, exact_quantile_limit: int = 20_000, cardinality_threshold: int = 50_000):
+        self.exact_quantile_limit = exact_quantile_limit
+        self.cardinality_threshold = cardinality_threshold
+        self.columns: list = []
+        self.row_count = 0
+        self.memory_bytes = 0
+        self.dtypes: dict = {}
+        self.null_counts: dict = {}
+        self.moments: dict = {}
+        self.digests: dict = {}
+        self.frequencies: dict = {}
+        self.correlation: PairwiseCoMoments | None = None
+        self._kinds_with_values: dict = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.dtypes = {c: chunk[c].dtype for c in self.columns}
+            self.null_counts = {c: 0 for c in self.columns}
+            self._kinds_with_values = {c: set() for c in self.columns}
+            numeric = [c for c in self.columns if dtype_kind(self.dtypes[c]) == 'numeric']
+            self.correlation = PairwiseCoMoments(numeric)
+
+        self.row_count += len(chunk)
+        self.memory_bytes += int(chunk.memory_usage(deep=True).sum())
+
+        nulls = chunk.isna().sum()
+        non_null = len(chunk) - nulls
+        for col in self.columns:
+            self.null_counts[col] += int(nulls[col])
+            chunk_dtype = chunk[col].dtype
+            self.dtypes[col] = merge_dtypes(self.dtypes[col], chunk_dtype)
+            if non_null[col] > 0:
+                self._kinds_with_values[col].add(dtype_kind(chunk_dtype))
+
+        self._update_numeric(chunk)
+        self._update_categorical(chunk)
+
+    def _update_numeric(self, chunk: pd.DataFrame) -> None:
+        cols = [c for c in self.correlation.columns if dtype_kind(self.dtypes[c]) == 'numeric']
+        if not cols:
+            return
+        # Columns demoted to text since the first chunk are fed as NaN
+        values = np.full((len(chunk), len(self.correlation.columns)), np.nan)
+        for i, col in enumerate(self.correlation.columns):
+            if col in cols and dtype_kind(chunk[col].dtype) == 'numeric':
+                values[:, i] = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        self.correlation.update(values)
+        batch = batch_moments(values)
+        for i, col in enumerate(self.correlation.columns):
+            if col not in cols:
+                continue
+            part = {key: arr[i] for key, arr in batch.items()}
+            if col in self.moments:
+                self.moments[col] = combine_moments(self.moments[col], part)
+            else:
+                self.moments[col] = part
+            digest = self.digests.setdefault(col, QuantileDigest(exact_limit=self.exact_quantile_limit))
+            digest.update(values[:, i])
+
+    def _update_categorical(self, chunk: pd.DataFrame) -> None:
+        for col in self.columns:
+            if dtype_kind(chunk[col].dtype) != 'categorical':
+                continue
+            self._counter(col).update(chunk[col])
+
+    # ── Results ──
+
+    def columns_of_kind(self, kind: str) -> list:
+        return [c for c in self.columns if dtype_kind(self.dtypes[c]) == kind]
+
+    def columns_needing_recount(self) -> list:
+        """
+        Text columns that also had numeric/bool chunks. Those chunks were not
+        counted as text, so their frequencies must be rebuilt from the raw
+        strings in a second (column-restricted) pass.
+        """
+        return [
+            c for c in self.columns_of_kind('categorical')
+            if self._kinds_with_values[c] - {'categorical'}
+        ]
+
+    def _counter(self, column) -> FrequencyCounter:
+        if column not in self.frequencies:
+            self.frequencies[column] = FrequencyCounter(self.cardinality_threshold)
+        return self.frequencies[column]
+
+    def reset_frequencies(self, columns: list) -> None:
+        for col in columns:
+            self.frequencies.pop(col, None)
+
+    def recount(self, column, series: pd.Series) -> None:
+        self._counter(column).update(series)
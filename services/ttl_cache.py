@@ -0,0 +1,86 @@
+"""
+services/ttl_cache.py
+---------------------
+Small thread-safe in-process cache whose entries expire after a fixed TTL.
+
+Used for values that are read on every request but change rarely (the
+logged-in user's state). Entries are copied in and out, so callers cannot
+mutate a cached value by accident. A TTL of 0 (or less) disables the cache:
+get() always misses and set() is a no-op.
+
+Assigning a shared store (services/shared_state.SQLiteStore) to `store` moves
+the entries there, under `namespace:`, so every worker process sees the same
+values and a delete() in one worker invalidates them all. Values must then be
+JSON-serialisable.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Parameters
+    ----------
+    ttl         : seconds an entry stays valid after set()
+    max_entries : entries kept before the oldest ones are evicted (in-process only)
+    namespace   : key prefix used when a shared store is attached
+    store       : optional shared backend with get/set/delete/clear(prefix)
+    """
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 10_000, namespace: str = 'cache', store=None):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.namespace = namespace
+        self.store = store
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store_key(self, key) -> str:
+        return f'{self.namespace}:{key}'
+
+    def get(self, key, default=None):
+        if self.ttl <= 0:
+            return default
+        if self.store is not None:
+            return self.store.get(self._store_key(key), default)
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+        return copy.deepcopy(value)
+
+    def set(self, key, value) -> None:
+        if self.ttl <= 0:
+            return
+        if self.store is not None:
+            self.store.set(self._store_key(key), value, self.ttl)
+            return
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        if self.store is not None:
+            self.store.delete(self._store_key(key))
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        if self.store is not None:
+            self.store.clear(f'{self.namespace}:')
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
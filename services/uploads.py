@@ -0,0 +1,141 @@
+"""
+services/uploads.py
+-------------------
+Upload handling shared by the classification and file-merge routes.
+
+An uploaded file is spooled to the scratch folder once and exposed as a
+read-only mmap buffer, so services can parse it without holding a private
+bytes copy. Pages are loaded on demand by the OS, so per-request memory is
+roughly the page-cache working set instead of the full upload size.
+"""
+import io
+import mmap
+import os
+import uuid
+
+from werkzeug.utils import secure_filename
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over any buffer (bytes, mmap,
+    memoryview) without copying it. Each reader keeps its own position, so
+    several parses can run over the same upload.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"whence invalido: {whence}")
+        if pos < 0:
+            raise ValueError("Posicion negativa")
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            # Release the export so the underlying mmap can be closed
+            self._view.release()
+        super().close()
+
+
+def open_buffer(raw) -> io.BufferedReader:
+    """Return a fresh buffered reader over *raw* positioned at 0 (no copy)."""
+    return io.BufferedReader(BufferReader(raw))
+
+
+def buffer_head(raw, size: int = 8192) -> bytes:
+    """First *size* bytes of *raw* as bytes (copies only that slice)."""
+    with memoryview(raw) as view:
+        return bytes(view[:size])
+
+
+class SpooledUpload:
+    """
+    An uploaded file stored once in scratch.
+
+    Use `buffer` for an mmap view of the contents and `path` when a library
+    prefers a filesystem path. Call close() (or use it as a context manager)
+    to unmap and, unless keep=True was set, delete the spooled file.
+    """
+
+    def __init__(self, path: str, filename: str, keep: bool = False):
+        self.path = path
+        self.filename = filename
+        self.keep = keep
+        self.size = os.path.getsize(path)
+        self._file = None
+        self._mmap = None
+
+    @classmethod
+    def from_storage(cls, storage, folder: str, prefix: str = 'spool',
+                     token: str | None = None, keep: bool = False) -> 'SpooledUpload':
+        """
+        Spool a werkzeug FileStorage into *folder* (streamed, never read into
+        memory). The stored name is '<prefix>_<token>_<filename>'; pass
+        keep=True for uploads that must outlive the request.
+        """
+        os.makedirs(folder, exist_ok=True)
+        name = secure_filename(storage.filename or '') or 'upload'
+        path = os.path.join(folder, f"{prefix}_{token or uuid.uuid4().hex}_{name}")
+        storage.save(path)
+        return cls(path, storage.filename or '', keep=keep)
+
+    @property
+    def buffer(self):
+        """Read-only mmap of the file (b'' for an empty upload)."""
+        if self.size == 0:
+            return b''
+        if self._mmap is None:
+            self._file = open(self.path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A reader still holds a view; the map is released with it
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not self.keep:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Allow importing from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.activity_buffer import ActivityLogBuffer
+
+
+class RecordingWriter:
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.threads = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, rows):
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append(list(rows))
+            self.threads.append(threading.current_thread().name)
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestActivityLogBuffer(unittest.TestCase):
+
+    def test_rows_are_written_in_batches_by_the_flusher(self):
+        writer = RecordingWriter()
+        buffer = ActivityLogBuffer(writer, batch_size=10, flush_interval=0.05)
+
+        for i in range(25):
+            self.assertTrue(buffer.submit({'n': i}))
+
+        self.assertTrue(_wait_for(lambda: len(writer.rows) == 25))
+        self.assertEqual([row['n'] for row in writer.rows], list(range(25)))
+        self.assertLessEqual(max(len(batch) for batch in writer.batches), 10)
+        self.assertEqual(set(writer.threads), {'activity-log-flusher'})
+        buffer.close()
+
+    def test_full_queue_falls_back_to_synchronous_write(self):
+        writer = RecordingWriter(delay=0.2)
+        buffer = ActivityLogBuffer(writer, batch_size=1, flush_interval=0.01, max_pending=1)
+
+        results = [buffer.submit({'n': i}) for i in range(4)]
+
+        self.assertIn(False, results)
+        self.assertIn('MainThread', writer.threads)
+        buffer.close()
+        self.assertEqual(sorted(row['n'] for row in writer.rows), [0, 1, 2, 3])
+
+    def test_close_writes_pending_rows(self):
+        writer = RecordingWriter()
+        buffer = ActivityLogBuffer(writer, batch_size=1000, flush_interval=60)
+
+        for i in range(5):
+            buffer.submit({'n': i})
+        buffer.close(timeout=0.1)
+
+        self.assertEqual([row['n'] for row in writer.rows], list(range(5)))
+        self.assertEqual(buffer.pending(), 0)
+
+        # After close, rows go straight to the writer
+        self.assertFalse(buffer.submit({'n': 5}))
+        self.assertEqual(writer.rows[-1], {'n': 5})
+
+    def test_flush_waits_for_the_batch_being_written(self):
+        writer = RecordingWriter(delay=0.2)
+        buffer = ActivityLogBuffer(writer, batch_size=1, flush_interval=0.01)
+
+        buffer.submit({'n': 0})
+        self.assertTrue(_wait_for(lambda: buffer.pending() == 0))  # taken by the flusher
+        buffer.flush()
+
+        self.assertEqual(writer.rows, [{'n': 0}])
+        buffer.close()
+
+    def test_writer_errors_do_not_stop_the_flusher(self):
+        calls = []
+
+        def flaky(rows):
+            calls.append(rows)
+            if len(calls) == 1:
+                raise RuntimeError('database is locked')
+
+        buffer = ActivityLogBuffer(flaky, batch_size=1, flush_interval=0.01)
+        with self.assertLogs('services.activity_buffer', level='ERROR'):
+            buffer.submit({'n': 0})
+            self.assertTrue(_wait_for(lambda: len(calls) == 1))
+        buffer.submit({'n': 1})
+        self.assertTrue(_wait_for(lambda: len(calls) == 2))
+        buffer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -132,6 +132,28 @@ class TestCSVAnalysis(unittest.TestCase):
         self.assertIsNotNone(salary_stats)
         self.assertEqual(salary_stats['count'], 6)
     
+    def test_numeric_stats_edge_columns(self):
+        """Vectorized numeric stats agree with per-column pandas on edge cases"""
+        df = pd.DataFrame({
+            'constant': [5, 5, 5, 5],
+            'single': [1.5, None, None, None],
+            'pair': [1.0, 3.0, None, None],
+            'empty': [None, None, None, None],
+            'skewed': [1.0, 2.0, 2.0, 40.0],
+        })
+        stats = {s['column']: s for s in csv_analysis.numeric_stats(df)['stats']}
+
+        self.assertNotIn('empty', stats)
+        self.assertEqual(stats['single']['std'], 0)
+        self.assertEqual(stats['single']['skewness'], 0)
+        self.assertIsNone(stats['pair']['skewness'])
+        self.assertEqual(stats['constant']['skewness'], 0)
+        skewed = df['skewed']
+        self.assertEqual(stats['skewed']['median'], round(skewed.median(), 2))
+        self.assertEqual(stats['skewed']['q75'], round(skewed.quantile(0.75), 2))
+        self.assertEqual(stats['skewed']['skewness'], round(skewed.skew(), 2))
+        self.assertEqual(stats['skewed']['kurtosis'], round(skewed.kurtosis(), 2))
+
     def test_categorical_stats(self):
         """Test categorical statistics"""
         temp_file = os.path.join(self.test_dir, "temp_test_categorical.csv")
@@ -150,6 +172,38 @@ class TestCSVAnalysis(unittest.TestCase):
         self.assertEqual(dept_stats['unique_count'], 3)  # Engineering, Marketing, Sales
         self.assertIn(dept_stats['most_common'], ['Engineering', 'Marketing', 'Sales'])
     
+    def test_categorical_stats_switches_to_sketches(self):
+        """High-cardinality columns use sketches and are flagged approximate"""
+        values = ['frecuente'] * 300 + [f'url-{i}' for i in range(3000)] + ['segundo'] * 100
+        df = pd.DataFrame({'URL': values, 'Tipo': ['a', 'b'] * 1700})
+
+        stats = {s['column']: s for s in csv_analysis.categorical_stats(df, cardinality_threshold=500)['stats']}
+
+        self.assertTrue(stats['URL']['approximate'])
+        self.assertFalse(stats['Tipo']['approximate'])
+        self.assertEqual(stats['URL']['most_common'], 'frecuente')
+        self.assertEqual(list(stats['URL']['top_5_values'])[:2], ['frecuente', 'segundo'])
+        self.assertAlmostEqual(stats['URL']['unique_count'], 3002, delta=3002 * 0.05)
+
+        dist = csv_analysis.categorical_distribution(df, cardinality_threshold=500)
+        self.assertTrue(dist[0]['approximate'])
+        self.assertEqual(dist[0]['labels'][0], 'frecuente')
+
+    def test_sketched_top_values_are_guaranteed_counts(self):
+        """Approximate top values never overstate counts or promote uniform noise"""
+        noise = [f'url-{i % 4000}' for i in range(12000)]
+        df = pd.DataFrame({'URL': noise + ['frecuente'] * 500})
+
+        stat = csv_analysis.categorical_stats(df, cardinality_threshold=500)['stats'][0]
+
+        self.assertTrue(stat['approximate'])
+        self.assertEqual(list(stat['top_5_values']), ['frecuente'])
+        self.assertLessEqual(stat['most_common_count'], 500)
+
+        uniform = csv_analysis.categorical_stats(pd.DataFrame({'URL': noise}), cardinality_threshold=500)
+        self.assertEqual(uniform['stats'][0]['top_5_values'], {})
+        self.assertIsNone(uniform['stats'][0]['most_common'])
+
     def test_correlation_matrix(self):
         """Test correlation matrix calculation"""
         temp_file = os.path.join(self.test_dir, "temp_test_correlation.csv")
@@ -193,6 +247,63 @@ class TestCSVAnalysis(unittest.TestCase):
         self.assertIn('numeric', result['distributions'])
         self.assertIn('categorical', result['distributions'])
     
+    def test_analyze_csv_chunked_matches_full_load(self):
+        """Streaming analysis with tiny chunks matches the DataFrame-based functions"""
+        temp_file = os.path.join(self.test_dir, "temp_test_chunked.csv")
+
+        # 'Code' is numeric in the first chunks and text afterwards
+        lines = CSV_UTF8_COMMA.splitlines()
+        codes = ["1", "2", "1", "2", "A", "B", "A"]
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(lines[0] + ",Code\n")
+            f.write("\n".join(f"{line},{code}" for line, code in zip(lines[1:], codes)))
+
+        df, _ = csv_analysis.load_csv(temp_file, encoding='utf-8', separator=',')
+        result = csv_analysis.analyze_csv(temp_file, encoding='utf-8', separator=',', chunksize=2)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['general']['dtypes'], csv_analysis.general_info(df)['dtypes'])
+        self.assertEqual(result['missing'], csv_analysis.missing_analysis(df))
+        self.assertEqual(result['numeric']['stats'], csv_analysis.numeric_stats(df)['stats'])
+        self.assertEqual(result['categorical']['stats'], csv_analysis.categorical_stats(df)['stats'])
+        self.assertEqual(result['correlation']['matrix'], csv_analysis.correlation_matrix(df)['matrix'])
+        self.assertEqual(result['distributions']['numeric'], csv_analysis.distribution_data(df))
+        self.assertEqual(result['distributions']['categorical'], csv_analysis.categorical_distribution(df))
+
+    def test_analyze_csv_sampling_mode(self):
+        """Sampling mode reports itself and adds confidence intervals"""
+        temp_file = os.path.join(self.test_dir, "temp_test_sampling.csv")
+
+        rows = [f"{i},{i % 7},{'ABC'[i % 3]}" for i in range(5000)]
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write("Id,Score,Group\n" + "\n".join(rows) + "\n")
+
+        small = csv_analysis.analyze_csv(temp_file, encoding='utf-8', separator=',')
+        self.assertEqual(small['analysis_mode'], 'exact')
+        self.assertFalse(small['sampling']['enabled'])
+        self.assertNotIn('mean_ci95', small['numeric']['stats'][0])
+
+        for encoding in ('utf-8', 'utf-16'):
+            if encoding == 'utf-16':
+                with open(temp_file, "w", encoding=encoding) as f:
+                    f.write("Id,Score,Group\n" + "\n".join(rows) + "\n")
+            result = csv_analysis.analyze_csv(temp_file, encoding=encoding, separator=',',
+                                              mode='sample', sample_rows=500, seed=7)
+
+            self.assertTrue(result['success'])
+            self.assertEqual(result['analysis_mode'], 'sample')
+            self.assertTrue(result['sampling']['enabled'])
+            self.assertLessEqual(result['general']['row_count'], 600)
+            score = next(s for s in result['numeric']['stats'] if s['column'] == 'Score')
+            low, high = score['mean_ci95']
+            self.assertLess(low, high)
+            group = result['categorical']['stats'][0]
+            self.assertIn('most_common_percentage_se', group)
+            self.assertEqual(set(group['top_5_ci95']), {'A', 'B', 'C'})
+
+        self.assertEqual(result['sampling']['method'], 'reservoir')
+        self.assertEqual(result['sampling']['estimated_total_rows'], 5000)
+
     def test_generate_summary_csv(self):
         """Test summary CSV generation"""
         temp_file = os.path.join(self.test_dir, "temp_test_summary_input.csv")
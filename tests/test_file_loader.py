@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import io
+import datetime
+import tempfile
+
+# Allow importing from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openpyxl
+import pandas as pd
+
+from services import excel_reader, file_loader
+from services.uploads import SpooledUpload, open_buffer
+
+CSV_SEMICOLON = "Fecha;Medio;Mencion\n01/02/2026;Diario A;Texto uno\n02/02/2026;Diario B;007\n"
+
+
+class TestFileLoaderBuffers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'upload.csv')
+        with open(self.path, 'w', encoding='utf-16') as f:
+            f.write(CSV_SEMICOLON)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_detect_format_from_mmap_buffer(self):
+        with SpooledUpload(self.path, 'upload.csv', keep=True) as upload:
+            fmt = file_loader.detect_format(upload.buffer, upload.filename)
+
+        self.assertIsNone(fmt['error'])
+        self.assertEqual(fmt['encoding'], 'utf-16')
+        self.assertEqual(fmt['sep'], ';')
+        self.assertEqual(fmt['columns'], ['Fecha', 'Medio', 'Mencion'])
+
+    def test_write_full_as_tsv_streams_text_values(self):
+        out_path = os.path.join(self.tmp.name, 'out.tsv')
+        fmt = {'file_type': 'csv', 'encoding': 'utf-16', 'sep': ';'}
+
+        with SpooledUpload(self.path, 'upload.csv') as upload:
+            header, rows = file_loader.write_full_as_tsv(upload.buffer, fmt, out_path, chunksize=1)
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(header, 'Fecha\tMedio\tMencion\n')
+        self.assertEqual(rows, 2)
+        with open(out_path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[2], '02/02/2026\tDiario B\t007')
+        self.assertEqual(file_loader.read_full_as_tsv(b'a;b\n1;2\n', fmt | {'encoding': 'utf-8'}),
+                         ('a\tb\n', '1\t2\n'))
+
+    def test_buffer_readers_have_independent_positions(self):
+        data = b'0123456789'
+        with open_buffer(data) as first, open_buffer(data) as second:
+            self.assertEqual(first.read(4), b'0123')
+            self.assertEqual(second.read(2), b'01')
+            first.seek(-2, os.SEEK_END)
+            self.assertEqual(first.read(), b'89')
+
+
+class TestExcelReader(unittest.TestCase):
+
+    def setUp(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(['Fecha', 'Medio', None, 'Medio', 'Alcance', 'Texto'])
+        ws.append([datetime.datetime(2026, 1, 2, 10, 0), 'A', 'x', 'B', 10.0, 'hola'])
+        ws.append([None] * 6)
+        ws.append([datetime.datetime(2026, 1, 3), 'C', None, 'D', 12.5, None])
+        ws.append(['2026-01-04', 'E', 'y', 'F', 7, '007'])
+        ws.append([None] * 6)
+        buf = io.BytesIO()
+        wb.save(buf)
+        self.raw = buf.getvalue()
+
+    def test_engine_is_chosen_by_magic_bytes(self):
+        self.assertEqual(excel_reader.sniff_excel_type(self.raw), 'xlsx')
+        self.assertEqual(excel_reader.sniff_excel_type(excel_reader.XLS_MAGIC + b'\0' * 8), 'xls')
+        self.assertIsNone(excel_reader.sniff_excel_type(b'a,b\n1,2\n'))
+        # A misnamed extension does not matter, the content decides
+        self.assertEqual(file_loader.detect_format(self.raw, 'reporte.xls')['file_type'], 'xlsx')
+
+    def test_chunks_match_pandas(self):
+        chunks = list(excel_reader.iter_xlsx_chunks(self.raw, chunksize=2))
+        self.assertEqual([len(c) for c in chunks], [2, 2])
+
+        ours = pd.concat(chunks, ignore_index=True)
+        ref = pd.read_excel(io.BytesIO(self.raw))
+        self.assertEqual(ours.columns.tolist(), ref.columns.tolist())
+        self.assertEqual(ours.fillna('').astype(str).values.tolist(),
+                         ref.fillna('').astype(str).values.tolist())
+
+    def test_detection_peek_matches_streaming_reader(self):
+        for nrows in (1, 2, 6):
+            peek = excel_reader.peek_xlsx(self.raw, nrows)
+            streamed = next(excel_reader.iter_xlsx_chunks(self.raw, nrows=nrows))
+            ref = pd.read_excel(io.BytesIO(self.raw), nrows=nrows)
+            self.assertTrue(peek.equals(streamed), nrows)
+            self.assertEqual(peek.shape, ref.shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
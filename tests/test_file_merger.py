@@ -0,0 +1,86 @@
+import unittest
+import pandas as pd
+import sys
+import os
+
+# Allow importing from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import file_merger
+
+
+def _export(rows):
+    return pd.DataFrame(rows, columns=['Date', 'URL', 'Hit Sentence', 'Reach'])
+
+
+EXPORT_A = _export([
+    ['01-Feb-2026 10:00AM', 'https://a.com/1', 'Primera mencion', 10],
+    ['02-Feb-2026 11:00AM', 'https://a.com/2', 'Segunda mencion', 20],
+    ['03-Feb-2026 12:00PM', 'https://a.com/3', 'Tercera mencion', 30],
+])
+
+# Overlaps EXPORT_A on the 3rd of February
+EXPORT_B = _export([
+    ['03-Feb-2026 12:00PM', 'https://a.com/3', 'Tercera mencion ', 30.0],
+    ['04-Feb-2026 09:00AM', 'https://a.com/4', 'Cuarta mencion', 40],
+])
+
+
+class TestFileMergerDedup(unittest.TestCase):
+
+    def test_merge_default_without_dedup_keeps_all_rows(self):
+        merged = file_merger.merge_default([EXPORT_A.copy(), EXPORT_B.copy()])
+
+        self.assertEqual(len(merged), 5)
+        self.assertEqual(merged.attrs['duplicates_dropped'], 0)
+
+    def test_merge_default_drops_overlapping_rows(self):
+        merged = file_merger.merge_default(
+            [EXPORT_A.copy(), EXPORT_B.copy()],
+            dedup_columns=['URL', 'Date', 'Hit Sentence'],
+        )
+
+        self.assertEqual(len(merged), 4)
+        self.assertEqual(merged.attrs['duplicates_dropped'], 1)
+        self.assertEqual(merged['URL'].tolist(), [
+            'https://a.com/1', 'https://a.com/2', 'https://a.com/3', 'https://a.com/4',
+        ])
+
+    def test_dedupe_rows_within_single_frame(self):
+        df = pd.concat([EXPORT_A, EXPORT_A.iloc[[0]]], ignore_index=True)
+        result, dropped = file_merger.dedupe_rows(df, ['url'])
+
+        self.assertEqual(dropped, 1)
+        self.assertEqual(len(result), 3)
+
+    def test_dedupe_chunks_streaming_reports_dropped(self):
+        stats = {}
+        chunks = [EXPORT_A.iloc[:2], EXPORT_A.iloc[1:], EXPORT_B]
+        output = list(file_merger.dedupe_chunks(chunks, ['URL'], stats))
+
+        self.assertEqual([len(c) for c in output], [2, 1, 1])
+        self.assertEqual(stats['duplicates_dropped'], 2)
+
+    def test_int_and_float_keys_match_across_files(self):
+        # One blank cell makes pandas read the second file's ID column as float
+        merged = file_merger.merge_default(
+            [pd.DataFrame({'ID': [1, 2]}), pd.DataFrame({'ID': [2.0, None, 3.5]})],
+            dedup_columns=['ID'],
+        )
+
+        self.assertEqual(merged.attrs['duplicates_dropped'], 1)
+        self.assertEqual(len(merged), 4)
+
+    def test_missing_key_column_raises(self):
+        with self.assertRaises(ValueError):
+            file_merger.dedupe_rows(EXPORT_A, ['Headline'])
+
+    def test_row_fingerprints_are_64_bit(self):
+        fps = file_merger.row_fingerprints(EXPORT_A, ['URL'])
+
+        self.assertEqual(str(fps.dtype), 'uint64')
+        self.assertEqual(len(set(fps.tolist())), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('FLASK_ENV', 'development')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///test_backend_security.db')
+os.environ.setdefault('ALLOW_SELF_REGISTRATION', 'false')
+
+import app as app_module  # noqa: E402
+from blueprints import admin as admin_module  # noqa: E402
+from extensions import db  # noqa: E402
+from models import ActivityLog  # noqa: E402
+from services.shared_state import SQLiteStore  # noqa: E402
+
+
+@pytest.fixture
+def app_ctx():
+    # Rows still buffered by earlier tests must not land in the fresh table
+    if admin_module._activity_buffer is not None:
+        admin_module._activity_buffer.flush()
+    with app_module.app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield
+
+
+def _add_logs(count, timestamp):
+    db.session.execute(db.insert(ActivityLog), [
+        {'user_id': 1, 'action': 'page_view', 'detail': '', 'timestamp': timestamp}
+        for _ in range(count)
+    ])
+    db.session.commit()
+
+
+def test_prune_activity_logs_deletes_in_bounded_id_ranges(app_ctx):
+    now = datetime.utcnow()
+    _add_logs(300, now - timedelta(days=200))
+    _add_logs(900, now - timedelta(hours=1))
+
+    deletes = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.startswith('DELETE'):
+            deletes.append((statement, parameters))
+
+    progress = []
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        stats = app_module.prune_activity_logs(
+            retention_days=90, max_rows=500, batch_size=100,
+            progress=lambda phase, last_id, s: progress.append((phase, last_id)),
+        )
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert stats == {'deleted_by_age': 300, 'deleted_by_cap': 400, 'batches': 7}
+    assert progress == [('age', 100), ('age', 200), ('age', 300),
+                        ('cap', 400), ('cap', 500), ('cap', 600), ('cap', 700)]
+    # Every statement is a fixed-size id range, never an IN list of ids
+    assert all(' IN ' not in statement and len(params) <= 3 for statement, params in deletes)
+
+    remaining = [row.id for row in ActivityLog.query.order_by(ActivityLog.id)]
+    assert remaining == list(range(701, 1201))
+    assert app_module.prune_activity_logs(retention_days=90, max_rows=500, batch_size=100)['batches'] == 0
+
+
+def test_scheduled_maintenance_runs_once_per_interval_across_workers(app_ctx, monkeypatch, tmp_path):
+    path = str(tmp_path / 'shared_state.db')
+    monkeypatch.setattr(app_module, 'shared_state', SQLiteStore(path))
+    _add_logs(5, datetime.utcnow() - timedelta(days=400))
+
+    first = app_module._run_scheduled_maintenance()
+    assert first['activity_logs']['deleted_by_age'] == 5
+
+    # Another worker sharing the store skips this interval
+    monkeypatch.setattr(app_module, 'shared_state', SQLiteStore(path))
+    assert app_module._run_scheduled_maintenance() is None
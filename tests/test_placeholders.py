@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Allow importing from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+from pptx_builder import apply_placeholders, generate_pptx, text_placeholder
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TEMPLATE = os.path.join(ROOT, 'powerpoints', 'Reporte_plantilla.pptx')
+
+
+def _deck(*texts):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    for i, text in enumerate(texts):
+        box = slide.shapes.add_textbox(Inches(1), Inches(1 + i), Inches(4), Inches(1))
+        box.text_frame.text = text
+    return prs, slide
+
+
+class TestApplyPlaceholders(unittest.TestCase):
+
+    def test_whole_shape_keys_dispatch_to_their_handler(self):
+        prs, slide = _deck('REPORT_CLIENT', ' {{ NUMB_MENTIONS }} ', 'TABLE', 'Menciones')
+        tables = []
+
+        def table(slide, shape):
+            tables.append(shape.left)
+            shape._element.getparent().remove(shape._element)
+
+        filled = apply_placeholders(prs, {
+            'REPORT_CLIENT': text_placeholder('ACME', font_size=Pt(24)),
+            'NUMB_MENTIONS': text_placeholder('1,204', bold=True),
+            'TABLE': table,
+        })
+
+        self.assertEqual(filled, {'REPORT_CLIENT', 'NUMB_MENTIONS', 'TABLE'})
+        self.assertEqual([shape.text for shape in slide.shapes], ['ACME', '1,204', 'Menciones'])
+        self.assertEqual(tables, [Inches(1)])
+
+    def test_inline_tokens_are_replaced_inside_longer_text(self):
+        prs, slide = _deck('Reporte de {{REPORT_CLIENT}} al {{REPORT_DATE}}', 'Sin {{OTRO}} token')
+        # Token split across runs, as PowerPoint does after editing
+        paragraph = slide.shapes[1].text_frame.paragraphs[0]
+        paragraph.runs[0].text = 'Total: {{NUMB_'
+        paragraph.runs[0].font.bold = True
+        paragraph.add_run().text = 'MENTIONS}} menciones'
+
+        filled = apply_placeholders(prs, {}, inline_values={
+            'REPORT_CLIENT': 'ACME', 'REPORT_DATE': '01-Mar-2026', 'NUMB_MENTIONS': 42,
+        })
+
+        self.assertEqual(filled, {'REPORT_CLIENT', 'REPORT_DATE', 'NUMB_MENTIONS'})
+        self.assertEqual(slide.shapes[0].text, 'Reporte de ACME al 01-Mar-2026')
+        self.assertEqual(slide.shapes[1].text, 'Total: 42 menciones')
+        self.assertEqual(len(paragraph.runs), 1)
+        self.assertTrue(paragraph.runs[0].font.bold)
+
+    def test_failed_handlers_leave_their_key_unfilled(self):
+        prs, slide = _deck('WORDCLOUD', 'SENTIMENT_PIE')
+
+        def broken(slide, shape):
+            raise ValueError('bad data')
+
+        handlers = {'WORDCLOUD': lambda slide, shape: False, 'SENTIMENT_PIE': broken}
+        self.assertEqual(apply_placeholders(prs, handlers, raise_errors=False), set())
+        with self.assertRaises(ValueError):
+            apply_placeholders(prs, handlers)
+
+    @unittest.skipUnless(os.path.exists(TEMPLATE), 'template not available')
+    def test_generate_pptx_fills_the_template_in_one_pass(self):
+        data = {
+            'meta': {'client_name': 'ACME', 'date_generated': '01-Mar-2026'},
+            'kpis': {'total_mentions': 120, 'unique_authors': 45, 'estimated_reach_fmt': '1.2M',
+                     'mentions_prensa': 80, 'mentions_redes': 40},
+            'charts': {
+                'evolution': {'labels': ['01/03', '02/03'], 'values': [70, 50]},
+                'sentiment': [{'label': 'Positivo', 'value': 60, 'color': '#00B050'},
+                              {'label': 'Negativo', 'value': 40, 'color': '#FF0000'}],
+            },
+            'tables': {
+                'top_sentences': ['Primera noticia', 'Segunda noticia'],
+                'top_prensa': [{'Influencer': 'Diario', 'Posts': 10, 'Reach': 1000}],
+                'top_redes': [{'Influencer': '@user', 'Posts': 5, 'Reach': 500, 'Source': 'X'}],
+            },
+            'ai_analysis': {'summary': 'Conversación estable.'},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            output = generate_pptx(data, TEMPLATE, os.path.join(tmp, 'reporte.pptx'))
+            prs = Presentation(output)
+
+        texts = [shape.text for slide in prs.slides for shape in slide.shapes if shape.has_text_frame]
+        for key in ('REPORT_CLIENT', 'NUMB_MENTIONS', 'TOP_NEWS', 'CONVERSATION_CHART',
+                    'SENTIMENT_PIE', 'TOP_INFLUENCERS_PRENSA_TABLE'):
+            self.assertNotIn(key, texts)
+        self.assertIn('ACME', texts)
+        # set_text_style writes the news as line breaks in one paragraph
+        self.assertIn('Primera noticia\x0b\x0bSegunda noticia', texts)
+        shapes = [shape for slide in prs.slides for shape in slide.shapes]
+        self.assertEqual(sum(shape.has_chart for shape in shapes), 2)
+        self.assertEqual(sum(shape.has_table for shape in shapes), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, inspect, text, tuple_
+
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('FLASK_ENV', 'development')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///test_backend_security.db')
+os.environ.setdefault('ALLOW_SELF_REGISTRATION', 'false')
+
+import app as app_module  # noqa: E402
+from extensions import db  # noqa: E402
+from models import Task, ActivityLog  # noqa: E402
+from services import search_index  # noqa: E402
+from services.search_index import substring_filter  # noqa: E402
+
+
+@pytest.fixture
+def app_ctx():
+    with app_module.app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield
+
+
+def _plan(query):
+    """SQLite EXPLAIN QUERY PLAN details for an ORM query or select."""
+    statement = getattr(query, 'statement', query)
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return ' | '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+
+
+@pytest.mark.parametrize('build_query, index_name', [
+    # api_tasks_list: unit scope (assignee IN) + FullCalendar range
+    (lambda: Task.query.filter(Task.assignee_id.in_([1, 2]),
+                               Task.due_date >= date(2026, 1, 1),
+                               Task.due_date <= date(2026, 2, 1)), 'ix_tasks_assignee_due'),
+    # api_tasks_delete_day
+    (lambda: Task.query.filter(Task.due_date == date(2026, 1, 5), Task.assignee_id.in_([1, 2])),
+     'ix_tasks_assignee_due'),
+    # api_admin_tasks keyset page, unfiltered and filtered
+    (lambda: Task.query.order_by(Task.due_date.desc(), Task.id.desc()).limit(101), 'ix_tasks_due_id'),
+    (lambda: Task.query.filter_by(status='Pendiente').order_by(Task.due_date.desc()), 'ix_tasks_status_due'),
+    (lambda: Task.query.filter_by(area='DI').order_by(Task.due_date.desc()), 'ix_tasks_area_due'),
+    (lambda: db.session.query(Task.status, func.count(Task.id)).group_by(Task.status), 'ix_tasks_status_due'),
+    (lambda: Task.query.filter_by(parent_task_id=3), 'ix_tasks_parent'),
+    # per-user activity view
+    (lambda: ActivityLog.query.filter_by(user_id=1).order_by(ActivityLog.timestamp.desc()),
+     'ix_activity_logs_user_timestamp'),
+    # activity log keyset page: (timestamp, id) < cursor, newest first
+    (lambda: ActivityLog.query.filter(tuple_(ActivityLog.timestamp, ActivityLog.id) < tuple_(datetime(2026, 5, 1), 500))
+     .order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).limit(51), 'ix_activity_logs_timestamp (timestamp<'),
+])
+def test_filters_use_composite_indexes(app_ctx, build_query, index_name):
+    plan = _plan(build_query())
+    assert index_name in plan, plan
+
+
+def test_missing_indexes_are_added_to_existing_databases(app_ctx):
+    db.session.execute(text('DROP INDEX ix_tasks_assignee_due'))
+    db.session.execute(text('DROP INDEX ix_activity_logs_user_timestamp'))
+    db.session.commit()
+
+    created = app_module.ensure_model_indexes()
+
+    assert sorted(created) == ['ix_activity_logs_user_timestamp', 'ix_tasks_assignee_due']
+    names = {ix['name'] for ix in inspect(db.engine).get_indexes('tasks')}
+    assert 'ix_tasks_assignee_due' in names
+    assert app_module.ensure_model_indexes() == []
+
+
+def _add_task(client_name):
+    task = Task(title='T', client=client_name, due_date=date(2026, 1, 5), area='DI',
+                creator_id=1, assignee_id=1)
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+
+def _clients_matching(term):
+    return sorted(t.client for t in Task.query.filter(substring_filter(Task, 'client', term)))
+
+
+def test_client_search_uses_trigram_index_and_stays_in_sync(app_ctx):
+    acme = _add_task('ACME Corporación')
+    _add_task('Banco Popular')
+    _add_task(None)
+
+    plan = _plan(Task.query.filter(substring_filter(Task, 'client', 'cme')))
+    assert 'tasks_client_fts VIRTUAL TABLE INDEX' in plan, plan
+
+    assert _clients_matching('acme') == ['ACME Corporación']
+    assert _clients_matching('o') == ['ACME Corporación', 'Banco Popular']  # short term: ILIKE fallback
+
+    acme.client = 'Grupo Ramos'
+    db.session.commit()
+    assert _clients_matching('acme') == []
+    assert _clients_matching('ramos') == ['Grupo Ramos']
+
+    db.session.delete(acme)
+    db.session.commit()
+    assert _clients_matching('ramos') == []
+
+
+def test_search_index_backfills_existing_databases(app_ctx):
+    for trigger in ('ai', 'ad', 'au'):
+        db.session.execute(text(f'DROP TRIGGER tasks_client_fts_{trigger}'))
+    db.session.execute(text('DROP TABLE tasks_client_fts'))
+    db.session.commit()
+    search_index._fts_ready.clear()
+    _add_task('Cliente Antiguo')
+
+    assert _clients_matching('antiguo') == ['Cliente Antiguo']  # ILIKE while the index is missing
+    assert search_index.ensure_search_indexes() == ['tasks_client_fts']
+    assert 'VIRTUAL TABLE' in _plan(Task.query.filter(substring_filter(Task, 'client', 'antiguo')))
+    assert _clients_matching('antiguo') == ['Cliente Antiguo']
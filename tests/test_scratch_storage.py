@@ -0,0 +1,147 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('FLASK_ENV', 'development')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///test_backend_security.db')
+os.environ.setdefault('ALLOW_SELF_REGISTRATION', 'false')
+
+import app as app_module  # noqa: E402
+from services import scratch_storage  # noqa: E402
+from extensions import db  # noqa: E402
+from models import TempArtifact, User  # noqa: E402
+from services.shared_state import SQLiteStore  # noqa: E402
+
+
+@pytest.fixture
+def scratch(tmp_path, monkeypatch):
+    folder = tmp_path / 'scratch'
+    folder.mkdir()
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(folder))
+    app_module.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app_module.app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username='scratch-user', email='scratch@example.com', role='DI',
+                    password=generate_password_hash('test-password-123', method='scrypt'))
+        user.set_allowed_tools(['classification'])
+        db.session.add(user)
+        db.session.commit()
+        yield folder, user.id
+
+
+def _artifact(folder, user_id, kind, file_id, size, idle_minutes):
+    name = f'{kind}_{file_id}.bin'
+    (folder / name).write_bytes(b'x' * size)
+    artifact = scratch_storage.register(str(folder), kind, file_id, name, user_id)
+    artifact.last_access_at = datetime.utcnow() - timedelta(minutes=idle_minutes)
+    db.session.commit()
+    return name
+
+
+def test_quota_evicts_least_recently_used_artifacts_first(scratch):
+    folder, user_id = scratch
+    oldest = _artifact(folder, user_id, 'union', 'a', 400, idle_minutes=30)
+    touched = _artifact(folder, user_id, 'union', 'b', 400, idle_minutes=20)
+    middle = _artifact(folder, user_id, 'union', 'c', 400, idle_minutes=10)
+    fresh = _artifact(folder, user_id, 'union', 'd', 400, idle_minutes=0)
+    assert scratch_storage.usage_bytes() == 1600
+
+    scratch_storage.touch(TempArtifact.query.filter_by(file_id='b').one())
+    stats = scratch_storage.enforce_quota(str(folder), quota_bytes=900)
+
+    # 'a' then 'c' go; 'b' was just used and 'd' is inside the grace period
+    assert stats == {'evicted': 2, 'bytes_freed': 800}
+    assert sorted(os.listdir(folder)) == sorted([touched, fresh])
+    assert {a.file_id for a in TempArtifact.query} == {'b', 'd'}
+    assert oldest not in os.listdir(folder) and middle not in os.listdir(folder)
+
+
+def test_sweep_expires_idle_artifacts_and_old_untracked_files(scratch):
+    folder, user_id = scratch
+    (folder / 'detect_old.json').write_text('{}')
+    _artifact(folder, user_id, 'detect', 'old', 10, idle_minutes=120)
+    kept = _artifact(folder, user_id, 'classified', 'new', 10, idle_minutes=5)
+    _artifact(folder, user_id, 'union', 'gone', 10, idle_minutes=5)
+    os.remove(folder / 'union_gone.bin')
+
+    stale = folder / 'Reporte_viejo.pptx'
+    stale.write_bytes(b'deck')
+    two_hours_ago = (datetime.now() - timedelta(hours=2)).timestamp()
+    os.utime(stale, (two_hours_ago, two_hours_ago))
+    (folder / 'session_live.csv').write_text('in progress')
+
+    stats = scratch_storage.sweep(str(folder), ttl_seconds=3600, quota_bytes=10**9)
+
+    assert (stats['expired'], stats['missing'], stats['orphans'], stats['evicted']) == (1, 1, 1, 0)
+    assert sorted(os.listdir(folder)) == sorted([kept, 'session_live.csv'])
+    assert [a.file_id for a in TempArtifact.query] == ['new']
+    assert stats['bytes_in_use'] == 10
+
+
+def test_scheduled_sweep_runs_once_per_interval_across_workers(scratch, monkeypatch, tmp_path):
+    path = str(tmp_path / 'shared_state.db')
+    monkeypatch.setattr(app_module, 'shared_state', SQLiteStore(path))
+    assert app_module._run_scheduled_scratch_sweep() is not None
+
+    monkeypatch.setattr(app_module, 'shared_state', SQLiteStore(path))
+    assert app_module._run_scheduled_scratch_sweep() is None
+
+
+def test_finalize_deletes_the_upload_session_file(scratch):
+    folder, user_id = scratch
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    upload = client.post(
+        '/clasificacion/upload',
+        data={'csv_file': (io.BytesIO('Medio\tHit Sentence\nA\tuno\nB\tdos\n'.encode('utf-8')), 'menciones.csv')},
+        content_type='multipart/form-data',
+    ).get_json()
+    session_id = upload['session_id']
+    assert TempArtifact.query.filter_by(kind='upload', file_id=session_id).one().size_bytes > 0
+
+    body = client.get(f'/clasificacion/upload_body/{session_id}').get_data(as_text=True)
+    chunk = client.post('/clasificacion/chunk', json={
+        'session_id': session_id, 'header': upload['header'], 'rows': body,
+        'rules': [], 'chunk_index': 0,
+    })
+    assert chunk.get_json()['rows_in_chunk'] == 2
+
+    finalize = client.post('/clasificacion/finalize', json={
+        'session_id': session_id, 'original_name': 'menciones.csv',
+    })
+
+    assert finalize.get_json()['success'] is True
+    assert os.listdir(folder) == [f'classified_{session_id}.csv']
+    assert [a.kind for a in TempArtifact.query] == ['classified']
+
+
+def test_upload_from_a_detect_token_discards_the_raw_spool(scratch):
+    folder, user_id = scratch
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    detect = client.post(
+        '/clasificacion/detect',
+        data={'csv_file': (io.BytesIO('Medio\tHit Sentence\nA\tuno\n'.encode('utf-8')), 'menciones.csv')},
+        content_type='multipart/form-data',
+    ).get_json()
+    token = detect['token']
+    assert len(os.listdir(folder)) == 2  # the spooled upload and its format sidecar
+    assert all(name.startswith(f'detect_{token}') for name in os.listdir(folder))
+
+    upload = client.post('/clasificacion/upload', data={'token': token}).get_json()
+
+    assert upload['success'] is True
+    assert os.listdir(folder) == [f"upload_{upload['session_id']}.tsv"]
+    assert [a.kind for a in TempArtifact.query] == ['upload']
@@ -11,11 +11,19 @@ os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///test_backend_securit
 os.environ.setdefault('ALLOW_SELF_REGISTRATION', 'false')
 
 import app as app_module  # noqa: E402
+from blueprints import admin as admin_module  # noqa: E402
 from extensions import db  # noqa: E402
 from models import User, Report, Area, Task  # noqa: E402
+from blueprints.tasks import TASK_CSV_COLUMNS  # noqa: E402
 from datetime import date  # noqa: E402
 
 
+def _flush_activity_log():
+    # log_activity() writes through the background buffer unless ACTIVITY_LOG_ASYNC=false
+    if admin_module._activity_buffer is not None:
+        admin_module._activity_buffer.flush()
+
+
 def _login_as(client, user_id):
     with client.session_transaction() as session:
         session['_user_id'] = str(user_id)
@@ -66,12 +74,14 @@ def client():
         ALLOW_SELF_REGISTRATION=False,
     )
 
+    _flush_activity_log()
     with app.app_context():
         db.drop_all()
         db.create_all()
 
     with app.test_client() as test_client:
         yield test_client
+    _flush_activity_log()
 
 
 def test_register_disabled_by_default(client):
@@ -227,3 +237,395 @@ def test_non_admin_cannot_delete_tasks_for_other_unit_by_day(client):
     with app_module.app.app_context():
         assert db.session.get(Task, own_task_id) is None
         assert db.session.get(Task, other_task_id) is not None
+
+
+def test_classification_detect_token_is_reused_only_by_its_owner(client):
+    with app_module.app.app_context():
+        owner = _create_user(
+            username='detect-owner',
+            email='detect-owner@example.com',
+            tools=['classification'],
+        )
+        other = _create_user(
+            username='detect-other',
+            email='detect-other@example.com',
+            tools=['classification'],
+        )
+
+    _login_as(client, owner)
+    detect = client.post(
+        '/clasificacion/detect',
+        data={'csv_file': (io.BytesIO('Medio;Texto\nA;uno\nB;dos\n'.encode('utf-16')), 'menciones.csv')},
+        content_type='multipart/form-data',
+    )
+    token = detect.get_json()['token']
+
+    _login_as(client, other)
+    assert client.post('/clasificacion/upload', data={'token': token}).status_code == 404
+
+    _login_as(client, owner)
+    upload = client.post('/clasificacion/upload', data={'token': token})
+    payload = upload.get_json()
+
+    assert upload.status_code == 200
+    assert payload['header'] == 'Medio\tTexto\n'
+    assert payload['total_rows'] == 2
+
+    folder = app_module.app.config['UPLOAD_FOLDER']
+    for name in os.listdir(folder):
+        if token in name or payload['session_id'] in name:
+            os.remove(os.path.join(folder, name))
+
+
+def test_task_csv_preview_resolves_assignees_with_the_prebuilt_index(client):
+    with app_module.app.app_context():
+        admin = _create_user(username='csv-admin', email='csv-admin@example.com', role='admin')
+        _create_user(username='María López', email='mlopez@example.com')
+        _create_user(username='Mario Pérez', email='mperez@example.com')
+        _create_user(username='Inactiva', email='inactiva@example.com', is_active=False)
+
+    def csv_line(title, assignee):
+        values = {'Titulo': title, 'Asignar a': assignee, 'Fecha De entrega': '03/02/2026'}
+        return ','.join(values.get(column, '') for column in TASK_CSV_COLUMNS)
+
+    header = ','.join(TASK_CSV_COLUMNS)
+    lines = [
+        csv_line('Uno', 'MLOPEZ@example.com'),
+        csv_line('Dos', 'maria lopez'),
+        csv_line('Tres', 'perez'),
+        csv_line('Cuatro', 'mari'),
+        csv_line('Cinco', 'inactiva'),
+        csv_line('Seis', ''),
+    ]
+    csv_bytes = '\n'.join([header, *lines]).encode('utf-8')
+
+    _login_as(client, admin)
+    response = client.post(
+        '/api/admin/tasks/import-csv/preview',
+        data={'csv_file': (io.BytesIO(csv_bytes), 'tareas.csv')},
+        content_type='multipart/form-data',
+    )
+    rows = response.get_json()['rows']
+
+    assignee_codes = [
+        [issue['code'] for issue in row['issues'] if issue['column'] == 'Asignar a']
+        for row in rows
+    ]
+    assert assignee_codes[0] == []
+    assert assignee_codes[1] == []
+    assert assignee_codes[2] == ['assignee_partial_match']
+    assert assignee_codes[3] == ['assignee_ambiguous']
+    assert assignee_codes[4] == ['assignee_not_found']
+    assert assignee_codes[5] == ['required']
+
+
+def test_bulk_task_paths_insert_rows_and_link_recurrence_children(client):
+    with app_module.app.app_context():
+        area_id = _create_area('Bulk')
+        admin = _create_user(username='bulk-admin', email='bulk-admin@example.com', role='admin')
+        worker = _create_user(username='bulk-worker', email='bulk-worker@example.com')
+        db.session.get(User, worker).area_id = area_id
+        db.session.commit()
+
+    _login_as(client, admin)
+    recurrent = client.post('/api/tasks', json={
+        'title': 'Reporte semanal',
+        'assignee_id': worker,
+        'due_date': '2026-03-02',
+        'is_recurrent': True,
+        'recurrence_type': 'Semanal',
+        'recurrence_end': '2026-03-23',
+    }).get_json()
+    parent, *children = recurrent['tasks']
+    assert recurrent['count'] == 4
+    assert parent['parent_task_id'] is None
+    assert [c['parent_task_id'] for c in children] == [parent['id']] * 3
+    assert [c['due_date'] for c in children] == ['2026-03-09', '2026-03-16', '2026-03-23']
+    assert {t['area'] for t in recurrent['tasks']} == {'Bulk'}
+
+    bulk = client.post('/api/tasks/bulk-create', json={'tasks': [
+        {'title': 'A', 'due_date': '2026-03-03', 'assignee_id': worker},
+        {'title': 'B', 'due_date': '2026-03-04', 'assignee_id': 999999},
+        {'title': 'C', 'due_date': '2026-03-05', 'assignee_id': str(worker)},
+    ]}).get_json()
+    assert bulk['created'] == 2
+    assert [f['index'] for f in bulk['failures']] == [1]
+    assert [t['title'] for t in bulk['tasks']] == ['A', 'C']
+    assert all(t['id'] and t['assignee_name'] == 'bulk-worker' for t in bulk['tasks'])
+
+    fields = {key: '' for key in ('start_date', 'end_date', 'directorate', 'client', 'requested_by',
+                                  'description', 'budget_type', 'recurrence')}
+    rows = [
+        {'row_number': n + 2, 'fields': fields | {'title': f'CSV {n}', 'assignee': 'bulk-worker',
+                                                  'due_date': '03/10/2026'}}
+        for n in range(3)
+    ]
+    rows.append({'row_number': 5, 'fields': fields | {'title': 'Sin usuario', 'assignee': 'nadie',
+                                                      'due_date': '03/10/2026'}})
+    commit = client.post('/api/admin/tasks/import-csv/commit', json={'rows': rows}).get_json()
+    assert commit['imported_rows'] == 3
+    assert commit['failed_rows'] == 1
+    assert [r['row_number'] for r in commit['remaining_rows']] == [5]
+
+    with app_module.app.app_context():
+        assert Task.query.filter(Task.title.like('CSV %'), Task.area == 'Bulk').count() == 3
+
+
+def test_task_listings_use_a_constant_number_of_queries(client, monkeypatch):
+    from sqlalchemy import event
+
+    # Count every query the listing makes, including loading the user
+    monkeypatch.setattr(app_module.user_state_cache, 'ttl', 0)
+    with app_module.app.app_context():
+        admin = _create_user(username='count-admin', email='count-admin@example.com', role='admin')
+
+    def add_tasks(start, count):
+        with app_module.app.app_context():
+            for n in range(start, start + count):
+                creator = _create_user(username=f'creator-{n}', email=f'creator-{n}@example.com')
+                assignee = _create_user(username=f'assignee-{n}', email=f'assignee-{n}@example.com')
+                _create_task(title=f'T{n}', due_date=date(2026, 3, 2), area='DI',
+                             creator_id=creator, assignee_id=assignee)
+
+    def count_queries(url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with app_module.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        assert response.status_code == 200
+        return len(statements)
+
+    _login_as(client, admin)
+    urls = ['/api/tasks', '/api/admin/tasks', '/api/admin/tasks/export-csv']
+
+    add_tasks(0, 2)
+    baseline = [count_queries(url) for url in urls]
+    add_tasks(2, 8)
+    assert [count_queries(url) for url in urls] == baseline
+
+    names = {t['assignee_name'] for t in client.get('/api/admin/tasks').get_json()['tasks']}
+    assert names == {f'assignee-{n}' for n in range(10)}
+
+
+def test_admin_tasks_pages_with_keyset_cursor_and_sql_stats(client):
+    with app_module.app.app_context():
+        admin = _create_user(username='page-admin', email='page-admin@example.com', role='admin')
+        worker = _create_user(username='page-worker', email='page-worker@example.com')
+        for n in range(7):
+            task_id = _create_task(title=f'P{n}', due_date=date(2026, 3, 1 + n % 3), area='DI',
+                                   creator_id=admin, assignee_id=worker)
+            if n % 2:
+                db.session.get(Task, task_id).status = 'Completado'
+        # Its assignee was deleted afterwards, so the task has no assignee left
+        _create_task(title='Huerfana', due_date=date(2026, 3, 1), area='DI',
+                     creator_id=admin, assignee_id=9999)
+        db.session.commit()
+
+    _login_as(client, admin)
+    first = client.get('/api/admin/tasks?limit=3&group_by=assignee').get_json()
+    assert first['stats'] == {'total': 8, 'pendiente': 5, 'en_progreso': 0, 'completado': 3}
+    assert first['total_filtered'] == 8
+    assert first['distribution'] == [{'label': 'page-worker', 'count': 7}, {'label': 'Sin Asignar', 'count': 1}]
+    assert sum(group['count'] for group in first['distribution']) == first['stats']['total']
+
+    seen = [t['id'] for t in first['tasks']]
+    cursor = first['next_cursor']
+    while cursor:
+        page = client.get(f'/api/admin/tasks?limit=3&cursor={cursor}').get_json()
+        assert 'stats' not in page
+        seen += [t['id'] for t in page['tasks']]
+        cursor = page['next_cursor']
+
+    with app_module.app.app_context():
+        expected = [t.id for t in Task.query.order_by(Task.due_date.desc(), Task.id.desc())]
+    assert seen == expected
+
+    filtered = client.get('/api/admin/tasks?status=Completado').get_json()
+    assert filtered['total_filtered'] == 3
+    assert filtered['stats']['total'] == 8
+    assert client.get('/api/admin/tasks?cursor=nope').status_code == 400
+
+
+def test_admin_task_csv_export_is_streamed_in_batches(client, monkeypatch):
+    import csv
+    from blueprints import tasks as tasks_module
+
+    monkeypatch.setattr(tasks_module, 'TASK_CSV_EXPORT_BATCH', 2)
+    with app_module.app.app_context():
+        admin = _create_user(username='export-admin', email='export-admin@example.com', role='admin')
+        worker = _create_user(username='export-worker', email='export-worker@example.com')
+        for n in range(5):
+            _create_task(title=f'E{n}', due_date=date(2026, 4, 1 + n), area='DI',
+                         creator_id=admin, assignee_id=worker)
+
+    _login_as(client, admin)
+    response = client.get('/api/admin/tasks/export-csv?area=DI')
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'].startswith('attachment; filename=tareas_admin_')
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == TASK_CSV_COLUMNS
+    assert [r[5] for r in rows[1:]] == ['E4', 'E3', 'E2', 'E1', 'E0']
+    assert {r[7] for r in rows[1:]} == {'export-worker'}
+    assert rows[1][2] == '04/05/2026'
+    assert rows[1][10] == 'No'
+
+
+def test_user_state_is_cached_between_requests_and_invalidated_by_admin(client):
+    from sqlalchemy import event
+
+    with app_module.app.app_context():
+        admin = _create_user(username='kick-admin', email='kick-admin@example.com', role='admin')
+        member = _create_user(username='kick-member', email='kick-member@example.com')
+
+    def user_queries(test_client, url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if 'FROM users' in statement:
+                statements.append(statement)
+
+        with app_module.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = test_client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        return response, len(statements)
+
+    member_client = app_module.app.test_client()
+    _login_as(member_client, member)
+    response, first = user_queries(member_client, '/menu')
+    assert response.status_code == 200 and first == 1
+    response, second = user_queries(member_client, '/menu')
+    assert response.status_code == 200 and second == 0
+    assert b'kick-member' in response.data
+
+    admin_client = app_module.app.test_client()
+    _login_as(admin_client, admin)
+    assert admin_client.post(f'/admin/users/{member}/kick').status_code == 302
+
+    response = member_client.get('/menu')
+    assert response.status_code == 302
+    assert '/login' in response.headers.get('Location', '')
+    with app_module.app.app_context():
+        assert db.session.get(User, member).force_logout is False
+
+
+def test_admin_dashboard_stats_use_fixed_queries_and_refresh_after_changes(client):
+    from sqlalchemy import event
+    from models import Role
+
+    with app_module.app.app_context():
+        admin = _create_user(username='dash-admin', email='dash-admin@example.com', role='admin')
+        member = _create_user(username='dash-member', email='dash-member@example.com', role='DI')
+        _create_user(username='dash-off', email='dash-off@example.com', role='MW', is_active=False)
+        for code in ('DI', 'MW', 'QA', 'OPS'):
+            db.session.add(Role(code=code, display_name=code))
+        db.session.commit()
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    _login_as(client, admin)
+    with app_module.app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/admin/')
+        assert response.status_code == 200
+        assert sum('GROUP BY users.role' in s for s in statements) == 1
+        assert not any('WHERE users.role' in s for s in statements)
+
+        statements.clear()
+        assert client.get('/admin/').status_code == 200
+        assert not any('GROUP BY users.role' in s for s in statements)  # memoized
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    from blueprints.admin import _dashboard_stats
+    with app_module.app.test_request_context():
+        stats = _dashboard_stats()
+    assert stats['total_users'] == 3 and stats['active_users'] == 2
+    assert stats['roles_count'] == {'DI': 1, 'MW': 1, 'OPS': 0, 'QA': 0, 'admin': 1}
+    assert stats['total_roles'] == 4
+
+    assert client.post(f'/admin/users/{member}/toggle').status_code == 302
+    with app_module.app.test_request_context():
+        assert _dashboard_stats()['active_users'] == 1
+
+
+def test_activity_log_pages_with_keyset_cursors(client):
+    import re
+    from datetime import datetime, timedelta
+    from models import ActivityLog
+
+    with app_module.app.app_context():
+        admin = _create_user(username='log-admin', email='log-admin@example.com', role='admin')
+        base = datetime(2026, 5, 1, 12, 0, 0)
+        # Pairs of rows share a timestamp, so pages must break ties on id
+        db.session.execute(db.insert(ActivityLog), [
+            {'user_id': admin, 'action': f'accion_{n}', 'detail': '', 'timestamp': base + timedelta(seconds=n // 2)}
+            for n in range(120)
+        ])
+        db.session.commit()
+
+    _login_as(client, admin)
+
+    def page(url):
+        response = client.get(url)
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        actions = re.findall(r'>(accion_\d+)</span>', html)
+        links = dict(re.findall(r'<a href="([^"]+)" class="btn btn-outline btn-sm">\s*(?:<i[^>]*></i>\s*)?(Anterior|Siguiente)', html))
+        return actions, {label: href.replace('&amp;', '&') for href, label in links.items()}, html
+
+    seen = []
+    url = '/admin/activity'
+    pages = []
+    while url:
+        actions, links, html = page(url)
+        pages.append((url, actions))
+        seen.extend(actions)
+        url = links.get('Siguiente')
+    assert [len(actions) for _, actions in pages] == [50, 50, 20]
+    assert seen == [f'accion_{n}' for n in range(119, -1, -1)]
+    assert '~120' in page('/admin/activity')[2]
+
+    # Going back from the last page returns the previous page unchanged
+    _, links, _ = page(pages[2][0])
+    assert page(links['Anterior'])[0] == pages[1][1]
+
+    filtered, _, html = page('/admin/activity?action=accion_11')
+    assert sorted(filtered) == ['accion_11', 'accion_110', 'accion_111', 'accion_112', 'accion_113',
+                                'accion_114', 'accion_115', 'accion_116', 'accion_117', 'accion_118',
+                                'accion_119']
+    assert '11 de 11 registros' in html
+
+
+def test_log_activity_writes_through_the_background_buffer(client):
+    from models import ActivityLog
+
+    with app_module.app.app_context():
+        user = _create_user(username='buffered-user', email='buffered@example.com', tools=['classification'])
+
+    assert admin_module._activity_buffer is not None
+    _login_as(client, user)
+    response = client.post('/clasificacion/presets', json={'name': 'Buffered', 'rules': []})
+    assert response.get_json()['success'] is True
+
+    _flush_activity_log()
+    with app_module.app.app_context():
+        logs = ActivityLog.query.filter_by(user_id=user).all()
+        assert [(log.action, log.detail) for log in logs] == [('preset_create', 'Preset guardado: Buffered')]
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+from multiprocessing import get_context
+
+# Allow importing from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from services.shared_state import SQLiteLimiterStorage, SQLiteStore
+from services.ttl_cache import TTLCache
+
+
+def _increment_many(path, count):
+    store = SQLiteStore(path)
+    for _ in range(count):
+        store.incr('hits', ttl=60)
+
+
+class TestSQLiteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'shared_state.db')
+        self.store = SQLiteStore(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_values_expire_after_their_ttl(self):
+        self.store.set('user_state:1', {'role': 'DI', 'is_active': True}, ttl=0.05)
+        self.assertEqual(self.store.get('user_state:1'), {'role': 'DI', 'is_active': True})
+        time.sleep(0.1)
+        self.assertIsNone(self.store.get('user_state:1'))
+
+    def test_counters_restart_once_expired(self):
+        self.assertEqual(self.store.incr('c', ttl=0.05), 1)
+        self.assertEqual(self.store.incr('c', amount=2, ttl=0.05), 3)
+        time.sleep(0.1)
+        self.assertEqual(self.store.get_counter('c'), 0)
+        self.assertEqual(self.store.incr('c', ttl=60), 1)
+
+    def test_increments_are_atomic_across_processes(self):
+        ctx = get_context('spawn')
+        workers = [ctx.Process(target=_increment_many, args=(self.path, 50)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        self.assertEqual(self.store.get_counter('hits'), 200)
+
+    def test_cache_instances_share_entries_through_the_store(self):
+        worker_a = TTLCache(ttl=30, namespace='user_state', store=self.store)
+        worker_b = TTLCache(ttl=30, namespace='user_state', store=SQLiteStore(self.path))
+
+        worker_a.set(7, {'force_logout': False})
+        self.assertEqual(worker_b.get(7), {'force_logout': False})
+        worker_b.delete(7)
+        self.assertIsNone(worker_a.get(7))
+
+        worker_a.set(8, {'role': 'MW'})
+        self.store.set('other:8', 'kept', ttl=30)
+        worker_b.clear()
+        self.assertIsNone(worker_a.get(8))
+        self.assertEqual(self.store.get('other:8'), 'kept')
+
+    def test_limiter_storage_counts_hits_for_every_instance(self):
+        uri = f'sqlite:///{self.path}'
+        storage_a = storage_from_string(uri)
+        storage_b = storage_from_string(uri)
+        self.assertIsInstance(storage_a, SQLiteLimiterStorage)
+
+        limit = RateLimitItemPerMinute(3)
+        limiter_a = FixedWindowRateLimiter(storage_a)
+        limiter_b = FixedWindowRateLimiter(storage_b)
+        results = [limiter_a.hit(limit, 'login', '127.0.0.1'),
+                   limiter_b.hit(limit, 'login', '127.0.0.1'),
+                   limiter_a.hit(limit, 'login', '127.0.0.1'),
+                   limiter_b.hit(limit, 'login', '127.0.0.1')]
+
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(limiter_a.get_window_stats(limit, 'login', '127.0.0.1').remaining, 0)
+        self.assertTrue(storage_b.check())
+        storage_b.reset()
+        self.assertTrue(limiter_a.hit(limit, 'login', '127.0.0.1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Startup benchmark: boots app.py in fresh interpreters against a new database.
+
+The first boot migrates the schema; later boots must only look up the
+recorded schema fingerprint. `python -X importtime` checks that heavy
+dependencies stay out of the import path. Timings are printed (run with -s
+to see them) so regressions in worker boot time are visible; they are only
+asserted against a budget when STARTUP_BOOT_BUDGET / STARTUP_IMPORT_BUDGET
+are set, since wall-clock limits fail on loaded machines for unrelated reasons.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('FLASK_ENV', 'development')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///test_backend_security.db')
+os.environ.setdefault('ALLOW_SELF_REGISTRATION', 'false')
+
+import app as app_module  # noqa: E402
+from extensions import db  # noqa: E402
+from models import AppMeta  # noqa: E402
+from services.shared_state import SQLiteStore  # noqa: E402
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _budget(name):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+# Opt-in: seconds spent in app.py after its imports (config, extensions, startup phase, routes)
+BOOT_BUDGET_SECONDS = _budget('STARTUP_BOOT_BUDGET')
+
+# Opt-in: cumulative `-X importtime` budget for `import app`, in seconds
+IMPORT_BUDGET_SECONDS = _budget('STARTUP_IMPORT_BUDGET')
+
+# Only the report, classification, merge and CSV tools need these
+HEAVY_MODULES = ('pandas', 'numpy', 'pptx', 'matplotlib', 'wordcloud', 'openpyxl', 'chardet',
+                 'requests', 'services.calculation', 'services.csv_analysis',
+                 'services.groq_analysis', 'services.classifier', 'pptx_builder.engine')
+
+_BOOT_SCRIPT = """
+import json, time
+from sqlalchemy import event
+from sqlalchemy import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda conn, cur, stmt, *a: statements.append(stmt.strip()))
+import app
+print(json.dumps({'timings': app.STARTUP_TIMINGS, 'statements': statements}))
+"""
+
+
+def _environ(db_path, **env):
+    environ = dict(os.environ)
+    environ.update({
+        'SECRET_KEY': 'test-secret-key',
+        'FLASK_ENV': 'development',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'RUN_STARTUP_MAINTENANCE': 'false',
+        **env,
+    })
+    environ.pop('DATABASE_URL', None)
+    return environ
+
+
+def _boot(db_path, **env):
+    result = subprocess.run([sys.executable, '-c', _BOOT_SCRIPT], cwd=ROOT, env=_environ(db_path, **env),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _report(label, boot):
+    timings = boot['timings']
+    print(f"\n[startup] {label}: imports {timings['imports'] * 1000:.0f} ms, "
+          f"migrations {timings['migrations'] * 1000:.0f} ms, total {timings['total'] * 1000:.0f} ms, "
+          f"{len(boot['statements'])} SQL statements")
+
+
+@pytest.mark.parametrize('mode', ['auto', 'skip'])
+def test_worker_boot_skips_migrations_once_schema_is_current(tmp_path, mode):
+    db_path = tmp_path / 'startup.db'
+
+    first = _boot(db_path)
+    _report('first boot', first)
+    assert first['timings']['migrated'] is True
+    assert any(s.startswith('CREATE TABLE') for s in first['statements'])
+
+    warm = _boot(db_path, STARTUP_MIGRATIONS=mode)
+    _report(f'warm boot ({mode})', warm)
+    assert warm['timings']['migrated'] is False
+    assert not any(s.startswith(('CREATE', 'ALTER', 'PRAGMA main.table_info')) for s in warm['statements'])
+    assert len(warm['statements']) <= 1
+
+    if BOOT_BUDGET_SECONDS is not None:
+        after_imports = warm['timings']['total'] - warm['timings']['imports']
+        assert after_imports < BOOT_BUDGET_SECONDS, warm['timings']
+
+
+def test_app_import_leaves_heavy_dependencies_unloaded(tmp_path):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                            env=_environ(tmp_path / 'startup.db', STARTUP_MIGRATIONS='skip'),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+    # Lines look like "import time:   self [us] | cumulative | <indent>module"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, total, name = line.split('|')
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total) / 1_000_000
+
+    loaded = sorted(m for m in HEAVY_MODULES if m in cumulative)
+    print(f"\n[startup] import app: {cumulative['app'] * 1000:.0f} ms")
+    assert loaded == [], f'imported at module load: {loaded}'
+    if IMPORT_BUDGET_SECONDS is not None:
+        assert cumulative['app'] < IMPORT_BUDGET_SECONDS
+
+
+def test_lazy_proxies_load_the_tool_modules_on_first_use():
+    script = (
+        "import sys, app\n"
+        "assert 'pandas' not in sys.modules and 'pptx' not in sys.modules\n"
+        "assert app.Pt(12) == 152400 and 'pptx' in sys.modules\n"
+        "assert app.csv_analysis.ANALYSIS_MODES and 'pandas' in sys.modules\n"
+        "print(app.Pt.__name__)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT,
+                            env=_environ('unused.db', STARTUP_MIGRATIONS='skip'),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[0] == 'Pt'
+
+
+@pytest.fixture
+def stale_schema_locked_elsewhere(tmp_path, monkeypatch):
+    """Schema fingerprint missing, and another worker already holds the migration lock."""
+    with app_module.app.app_context():
+        db.drop_all()
+        db.create_all()
+    store = SQLiteStore(str(tmp_path / 'shared_state.db'))
+    store.incr(f'startup:migrate:{app_module.SCHEMA_FINGERPRINT}', ttl=300)
+    monkeypatch.setattr(app_module, 'shared_state', store)
+
+    migrations = []
+    monkeypatch.setattr(app_module, 'run_startup_migrations', lambda: migrations.append(True))
+    return migrations
+
+
+def _record_current_schema():
+    with app_module.app.app_context():
+        db.session.merge(AppMeta(key='schema_fingerprint', value=app_module.SCHEMA_FINGERPRINT))
+        db.session.commit()
+
+
+def test_worker_waits_for_the_lock_holder_to_migrate(stale_schema_locked_elsewhere, monkeypatch):
+    monkeypatch.setattr(app_module, 'STARTUP_MIGRATION_WAIT', 30.0)
+    holder = threading.Timer(0.3, _record_current_schema)
+    holder.start()
+    try:
+        assert app_module._migrate_at_startup('auto') is False
+    finally:
+        holder.cancel()
+
+    assert stale_schema_locked_elsewhere == []
+    assert app_module._schema_is_current()
+
+
+def test_worker_migrates_itself_when_the_lock_holder_never_finishes(stale_schema_locked_elsewhere, monkeypatch):
+    monkeypatch.setattr(app_module, 'STARTUP_MIGRATION_WAIT', 0.3)
+
+    assert app_module._migrate_at_startup('auto') is True
+    assert stale_schema_locked_elsewhere == [True]